@@ -1,6 +1,8 @@
+from setuptools import Extension
 from setuptools import find_packages
 from setuptools import setup
 import os
+import platform
 
 
 def read_file(name):
@@ -15,6 +17,16 @@ longdesc = '\n\n'.join([read_file(name) for name in [
     'LICENSE.rst'
 ]])
 
+# the compiled accelerator is optional, the pure Python implementation is
+# used if it fails to build
+ext_modules = []
+if platform.python_implementation() == 'CPython':
+    ext_modules.append(Extension(
+        'bda.intellidatetime._speedups',
+        ['src/bda/intellidatetime/_speedups.c'],
+        optional=True
+    ))
+
 
 setup(
     name='bda.intellidatetime',
@@ -25,6 +37,8 @@ setup(
         'Development Status :: 5 - Production/Stable',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
+        'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Utilities',
     ],
     keywords='',
@@ -34,9 +48,11 @@ setup(
     license='Simplified BSD',
     packages=find_packages('src'),
     package_dir={'': 'src'},
+    ext_modules=ext_modules,
     namespace_packages=['bda'],
     include_package_data=True,
     zip_safe=False,
+    python_requires='>=3.9',
     install_requires=[
         'setuptools',
         'zope.interface',
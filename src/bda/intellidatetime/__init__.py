@@ -1,6 +1,45 @@
-from bda.intellidatetime.converter import IntelliDateTime
-from bda.intellidatetime.converter import LocalePattern
-from bda.intellidatetime.converter import convert
-from bda.intellidatetime.interfaces import DateTimeConversionError
-from bda.intellidatetime.interfaces import IIntelliDateTime
-from bda.intellidatetime.interfaces import ILocalePattern
+"""Names are imported lazily on first access, thus importing the package
+does not import ``zope.interface`` unless the interfaces are used.
+"""
+import importlib
+
+
+_exports = {
+    'CachedClock': 'bda.intellidatetime.clock',
+    'ConversionCache': 'bda.intellidatetime.cache',
+    'ConversionResult': 'bda.intellidatetime.converter',
+    'DateTimeConversionError': 'bda.intellidatetime.errors',
+    'IIntelliDateTime': 'bda.intellidatetime.interfaces',
+    'ILocalePattern': 'bda.intellidatetime.interfaces',
+    'Instrumentation': 'bda.intellidatetime.instrument',
+    'IntelliDateTime': 'bda.intellidatetime.converter',
+    'LocalePattern': 'bda.intellidatetime.converter',
+    'LocaleRegistry': 'bda.intellidatetime.locales',
+    'PackedTables': 'bda.intellidatetime.tables',
+    'convert': 'bda.intellidatetime.converter',
+    'convert_datetime': 'bda.intellidatetime.converter',
+    'convert_many': 'bda.intellidatetime.converter',
+    'format_datetime': 'bda.intellidatetime.converter',
+    'format_datetimes': 'bda.intellidatetime.converter',
+    'shared': 'bda.intellidatetime.converter',
+    'try_convert': 'bda.intellidatetime.converter',
+    'validate': 'bda.intellidatetime.converter',
+}
+
+__all__ = sorted(_exports)
+
+
+def __getattr__(name):
+    # PEP 562
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name)
+        )
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports))
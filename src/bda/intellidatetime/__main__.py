@@ -0,0 +1,5 @@
+from bda.intellidatetime.stream import main
+import sys
+
+
+sys.exit(main())
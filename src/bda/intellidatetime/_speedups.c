@@ -0,0 +1,540 @@
+/* Optional accelerator of ``bda.intellidatetime.converter``.
+ *
+ * Implements splitting, date and time mapping, range checking and datetime
+ * creation of ``IntelliDateTime`` for ``str`` input. Results and error
+ * messages equal the ones of the pure Python implementation. Input not
+ * handled here, e.g. buffers or numbers with more than 16 digits, returns
+ * ``NotImplemented`` and is converted by the pure Python implementation.
+ */
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <datetime.h>
+#include <stdio.h>
+
+/* ``errors.DateTimeConversionError`` */
+static PyObject *ConversionError = NULL;
+
+/* ``ParsePlan.params`` */
+typedef struct {
+    int ys, ye, ms, me, ds, de;
+    int year, month, day;
+    int daymonth;
+    int hour, minute;
+} Plan;
+
+/* longer numbers are converted by the pure Python implementation */
+#define MAXDIGITS 16
+
+/* split results */
+#define PARTS 0
+#define PACKED 1
+
+typedef struct {
+    int kind;
+    /* number of parts, only the first three are kept */
+    Py_ssize_t count;
+    long long parts[3];
+    /* digits of the kept parts */
+    int digits[3];
+    /* stripped value of ``PACKED`` */
+    int kindof;
+    const void *data;
+    Py_ssize_t start;
+} Split;
+
+static const char DAYS_IN_MONTH[] = {
+    0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31
+};
+
+/* returns 1 on success, 0 if not supported, -1 with exception set */
+static int
+split(PyObject *value, Split *out)
+{
+    int kind = PyUnicode_KIND(value);
+    const void *data = PyUnicode_DATA(value);
+    Py_ssize_t start = 0;
+    Py_ssize_t end = PyUnicode_GET_LENGTH(value);
+    Py_ssize_t i;
+    int numeric;
+
+    while (start < end && Py_UNICODE_ISSPACE(PyUnicode_READ(kind, data, start)))
+        start++;
+    while (end > start && Py_UNICODE_ISSPACE(PyUnicode_READ(kind, data, end - 1)))
+        end--;
+    numeric = end > start;
+    for (i = start; i < end; i++) {
+        Py_UCS4 ch = PyUnicode_READ(kind, data, i);
+        if (ch < '0' || ch > '9') {
+            numeric = 0;
+            break;
+        }
+    }
+    out->kind = PARTS;
+    out->count = 0;
+    if (numeric) {
+        Py_ssize_t size = end - start;
+        Py_ssize_t width;
+        if (size == 8) {
+            out->kind = PACKED;
+            out->kindof = kind;
+            out->data = data;
+            out->start = start;
+            return 1;
+        }
+        if (size != 1 && size != 2 && size != 4 && size != 6) {
+            PyErr_SetString(ConversionError,
+                            "Numeric value given, but not parseable.");
+            return -1;
+        }
+        width = size < 2 ? size : 2;
+        for (i = start; i < end; i += width) {
+            long long number = 0;
+            Py_ssize_t j;
+            for (j = i; j < i + width; j++)
+                number = number * 10 + (PyUnicode_READ(kind, data, j) - '0');
+            out->parts[out->count] = number;
+            out->digits[out->count] = (int)width;
+            out->count++;
+        }
+        return 1;
+    }
+    /* any non numeric character is a limiter */
+    i = start;
+    while (i < end) {
+        Py_UCS4 ch = PyUnicode_READ(kind, data, i);
+        long long number = 0;
+        int digits = 0;
+        if (ch < '0' || ch > '9') {
+            i++;
+            continue;
+        }
+        while (i < end) {
+            ch = PyUnicode_READ(kind, data, i);
+            if (ch < '0' || ch > '9')
+                break;
+            if (digits < MAXDIGITS)
+                number = number * 10 + (ch - '0');
+            digits++;
+            i++;
+        }
+        if (out->count < 3) {
+            if (digits > MAXDIGITS)
+                return 0;
+            out->parts[out->count] = number;
+            out->digits[out->count] = digits;
+        }
+        out->count++;
+    }
+    return 1;
+}
+
+static int
+number_digits(long long number)
+{
+    int ret = 1;
+    while (number >= 10) {
+        number /= 10;
+        ret++;
+    }
+    return ret;
+}
+
+static long long
+packed_slice(const Split *value, int start, int end)
+{
+    long long ret = 0;
+    int i;
+    for (i = start; i < end; i++)
+        ret = ret * 10 + (PyUnicode_READ(value->kindof, value->data,
+                                         value->start + i) - '0');
+    return ret;
+}
+
+/* fetches year and month of ``now()`` once */
+typedef struct {
+    PyObject *callable;
+    int fetched;
+    long year;
+    long month;
+} Now;
+
+static int
+fetch_now(Now *now)
+{
+    PyObject *dt, *value;
+    if (now->fetched)
+        return 0;
+    dt = PyObject_CallNoArgs(now->callable);
+    if (dt == NULL)
+        return -1;
+    value = PyObject_GetAttrString(dt, "year");
+    if (value == NULL)
+        goto error;
+    now->year = PyLong_AsLong(value);
+    Py_DECREF(value);
+    if (now->year == -1 && PyErr_Occurred())
+        goto error;
+    value = PyObject_GetAttrString(dt, "month");
+    if (value == NULL)
+        goto error;
+    now->month = PyLong_AsLong(value);
+    Py_DECREF(value);
+    if (now->month == -1 && PyErr_Occurred())
+        goto error;
+    Py_DECREF(dt);
+    now->fetched = 1;
+    return 0;
+error:
+    Py_DECREF(dt);
+    return -1;
+}
+
+/* ``IntelliDateTime._mapDate``, returns 1, 0 or -1 like ``split`` */
+static int
+map_date(const Split *date, const Plan *plan, Now *now, long long *defs)
+{
+    if (date->kind == PACKED) {
+        defs[0] = packed_slice(date, plan->ys, plan->ye);
+        defs[1] = packed_slice(date, plan->ms, plan->me);
+        defs[2] = packed_slice(date, plan->ds, plan->de);
+        return 1;
+    }
+    if (date->count == 1) {
+        if (fetch_now(now) < 0)
+            return -1;
+        defs[0] = now->year;
+        defs[1] = now->month;
+        defs[2] = date->parts[0];
+        return 1;
+    }
+    if (date->count == 2) {
+        if (fetch_now(now) < 0)
+            return -1;
+        defs[0] = now->year;
+        if (plan->daymonth) {
+            defs[1] = date->parts[1];
+            defs[2] = date->parts[0];
+        }
+        else {
+            defs[1] = date->parts[0];
+            defs[2] = date->parts[1];
+        }
+        return 1;
+    }
+    if (date->count == 3) {
+        long long year = date->parts[plan->year];
+        int digits = number_digits(year);
+        char buffer[64];
+        char century[32];
+        if (digits != 3 && digits != 4) {
+            /* year in the current century */
+            if (fetch_now(now) < 0)
+                return -1;
+            snprintf(century, sizeof(century), "%ld", now->year);
+            century[2] = '\0';
+            if (strlen(century) + (digits == 1 ? 2 : digits) > 18)
+                return 0;
+            snprintf(buffer, sizeof(buffer), digits == 1 ? "%s0%lld"
+                     : "%s%lld", century, year);
+            if (century[0] == '-')
+                return 0;
+            year = strtoll(buffer, NULL, 10);
+        }
+        defs[0] = year;
+        defs[1] = date->parts[plan->month];
+        defs[2] = date->parts[plan->day];
+        return 1;
+    }
+    PyErr_SetString(ConversionError, "Invalid number of parts for date.");
+    return -1;
+}
+
+/* ``IntelliDateTime._parsePlannedDate`` and ``_parsePlannedTime``. Fills
+ * defs with year, month, day, hour and minute */
+static int
+parse(PyObject *date, PyObject *time, const Plan *plan, PyObject *now,
+      long long *defs)
+{
+    Split value;
+    Now current = {now, 0, 0, 0};
+    int ret;
+
+    if (!PyUnicode_CheckExact(date))
+        return 0;
+    if (time != Py_None && !PyUnicode_CheckExact(time))
+        return 0;
+    if (PyUnicode_GET_LENGTH(date) == 0) {
+        PyErr_SetString(ConversionError, "Invalid date input.");
+        return -1;
+    }
+    ret = split(date, &value);
+    if (ret <= 0)
+        return ret;
+    ret = map_date(&value, plan, &current, defs);
+    if (ret <= 0)
+        return ret;
+    if (time == Py_None || PyUnicode_GET_LENGTH(time) == 0) {
+        defs[3] = 0;
+        defs[4] = 0;
+        return 1;
+    }
+    ret = split(time, &value);
+    if (ret <= 0)
+        return ret;
+    if (value.kind == PACKED || value.count < 1 || value.count > 2) {
+        PyErr_SetString(ConversionError, "Invalid number of parts for time.");
+        return -1;
+    }
+    if (value.count == 1) {
+        defs[3] = value.parts[0];
+        defs[4] = 0;
+    }
+    else {
+        defs[3] = value.parts[plan->hour];
+        defs[4] = value.parts[plan->minute];
+    }
+    return 1;
+}
+
+static int
+isleap(long long year)
+{
+    return year % 4 == 0 && (year % 100 != 0 || year % 400 == 0);
+}
+
+/* ``IntelliDateTime._datetime`` without tzinfo */
+static PyObject *
+create(const long long *defs)
+{
+    long long year = defs[0], month = defs[1], day = defs[2];
+    long long hour = defs[3], minute = defs[4];
+    PyObject *ret;
+
+    if (1 <= year && year <= 9999 && 1 <= month && month <= 12
+            && 1 <= day && day <= DAYS_IN_MONTH[month]
+            && (month != 2 || day < 29 || isleap(year))
+            && 0 <= hour && hour < 24 && 0 <= minute && minute < 60) {
+        return PyDateTimeAPI->DateTime_FromDateAndTime(
+            (int)year, (int)month, (int)day, (int)hour, (int)minute, 0, 0,
+            Py_None, PyDateTimeAPI->DateTimeType);
+    }
+    /* raises with the message of ``datetime`` */
+    ret = PyObject_CallFunction((PyObject *)PyDateTimeAPI->DateTimeType,
+                                "LLLLL", year, month, day, hour, minute);
+    if (ret == NULL && (PyErr_ExceptionMatches(PyExc_ValueError)
+                        || PyErr_ExceptionMatches(PyExc_OverflowError))) {
+        PyObject *type, *value, *traceback, *error;
+        PyErr_Fetch(&type, &value, &traceback);
+        PyErr_NormalizeException(&type, &value, &traceback);
+        error = PyObject_CallOneArg(ConversionError, value);
+        Py_XDECREF(type);
+        Py_XDECREF(value);
+        Py_XDECREF(traceback);
+        if (error != NULL) {
+            PyErr_SetObject(ConversionError, error);
+            Py_DECREF(error);
+        }
+    }
+    return ret;
+}
+
+static int
+plan_params(PyObject *params, Plan *plan)
+{
+    return PyArg_ParseTuple(
+        params, "iiiiiiiiiiii;invalid plan parameters",
+        &plan->ys, &plan->ye, &plan->ms, &plan->me, &plan->ds, &plan->de,
+        &plan->year, &plan->month, &plan->day, &plan->daymonth,
+        &plan->hour, &plan->minute);
+}
+
+static PyObject *
+convert_one(PyObject *date, PyObject *time, const Plan *plan, PyObject *now)
+{
+    long long defs[5];
+    int ret = parse(date, time, plan, now, defs);
+    if (ret < 0)
+        return NULL;
+    if (ret == 0)
+        Py_RETURN_NOTIMPLEMENTED;
+    return create(defs);
+}
+
+PyDoc_STRVAR(convert_doc,
+"convert(date, time, params, now)\n\n"
+"Convert date and time to a naive datetime. Returns NotImplemented for\n"
+"input not supported.");
+
+static PyObject *
+convert(PyObject *module, PyObject *args)
+{
+    PyObject *date, *time, *params, *now;
+    Plan plan;
+    if (!PyArg_ParseTuple(args, "OOOO:convert", &date, &time, &params, &now))
+        return NULL;
+    if (!plan_params(params, &plan))
+        return NULL;
+    return convert_one(date, time, &plan, now);
+}
+
+PyDoc_STRVAR(parse_doc,
+"parse(date, time, params, now)\n\n"
+"Return ``[year, month, day, hour, minute]`` of date and time without\n"
+"range checks. Returns NotImplemented for input not supported.");
+
+static PyObject *
+parse_defs(PyObject *module, PyObject *args)
+{
+    PyObject *date, *time, *params, *now;
+    Plan plan;
+    long long defs[5];
+    int ret;
+    if (!PyArg_ParseTuple(args, "OOOO:parse", &date, &time, &params, &now))
+        return NULL;
+    if (!plan_params(params, &plan))
+        return NULL;
+    ret = parse(date, time, &plan, now, defs);
+    if (ret < 0)
+        return NULL;
+    if (ret == 0)
+        Py_RETURN_NOTIMPLEMENTED;
+    return Py_BuildValue("[LLLLL]", defs[0], defs[1], defs[2], defs[3],
+                         defs[4]);
+}
+
+PyDoc_STRVAR(convert_many_doc,
+"convert_many(dates, times, params, now, onerror, fallback)\n\n"
+"Convert a batch to naive datetimes. Failed rows are None, onerror is\n"
+"called with index and error if not None. Rows not supported are\n"
+"converted by ``fallback(date, time)``.");
+
+static PyObject *
+convert_many(PyObject *module, PyObject *args)
+{
+    PyObject *dates, *times, *params, *now, *onerror, *fallback;
+    PyObject *iterdates = NULL, *itertimes = NULL, *ret = NULL;
+    Plan plan;
+    Py_ssize_t index = 0;
+
+    if (!PyArg_ParseTuple(args, "OOOOOO:convert_many", &dates, &times,
+                          &params, &now, &onerror, &fallback))
+        return NULL;
+    if (!plan_params(params, &plan))
+        return NULL;
+    iterdates = PyObject_GetIter(dates);
+    if (iterdates == NULL)
+        return NULL;
+    if (times != Py_None) {
+        itertimes = PyObject_GetIter(times);
+        if (itertimes == NULL)
+            goto error;
+    }
+    ret = PyList_New(0);
+    if (ret == NULL)
+        goto error;
+    for (;; index++) {
+        PyObject *date, *time, *dt;
+        int appended;
+        date = PyIter_Next(iterdates);
+        if (date == NULL) {
+            if (PyErr_Occurred())
+                goto error;
+            break;
+        }
+        if (itertimes != NULL) {
+            time = PyIter_Next(itertimes);
+            if (time == NULL) {
+                Py_DECREF(date);
+                if (PyErr_Occurred())
+                    goto error;
+                break;
+            }
+        }
+        else {
+            time = Py_None;
+            Py_INCREF(time);
+        }
+        dt = convert_one(date, time, &plan, now);
+        if (dt == Py_NotImplemented) {
+            Py_DECREF(dt);
+            dt = PyObject_CallFunctionObjArgs(fallback, date, time, NULL);
+        }
+        Py_DECREF(date);
+        Py_DECREF(time);
+        if (dt == NULL) {
+            PyObject *type, *value, *traceback;
+            if (!PyErr_ExceptionMatches(ConversionError))
+                goto error;
+            PyErr_Fetch(&type, &value, &traceback);
+            PyErr_NormalizeException(&type, &value, &traceback);
+            if (onerror != Py_None) {
+                PyObject *result = PyObject_CallFunction(onerror, "nO",
+                                                         index, value);
+                Py_XDECREF(result);
+                if (result == NULL) {
+                    Py_XDECREF(type);
+                    Py_XDECREF(value);
+                    Py_XDECREF(traceback);
+                    goto error;
+                }
+            }
+            Py_XDECREF(type);
+            Py_XDECREF(value);
+            Py_XDECREF(traceback);
+            dt = Py_None;
+            Py_INCREF(dt);
+        }
+        appended = PyList_Append(ret, dt);
+        Py_DECREF(dt);
+        if (appended < 0)
+            goto error;
+    }
+    Py_DECREF(iterdates);
+    Py_XDECREF(itertimes);
+    return ret;
+error:
+    Py_XDECREF(iterdates);
+    Py_XDECREF(itertimes);
+    Py_XDECREF(ret);
+    return NULL;
+}
+
+static PyMethodDef methods[] = {
+    {"convert", convert, METH_VARARGS, convert_doc},
+    {"parse", parse_defs, METH_VARARGS, parse_doc},
+    {"convert_many", convert_many, METH_VARARGS, convert_many_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT,
+    "bda.intellidatetime._speedups",
+    "Optional accelerator of bda.intellidatetime.converter.",
+    -1,
+    methods
+};
+
+PyMODINIT_FUNC
+PyInit__speedups(void)
+{
+    PyObject *errors, *ret;
+    PyDateTime_IMPORT;
+    if (PyDateTimeAPI == NULL)
+        return NULL;
+    errors = PyImport_ImportModule("bda.intellidatetime.errors");
+    if (errors == NULL)
+        return NULL;
+    ConversionError = PyObject_GetAttrString(errors,
+                                             "DateTimeConversionError");
+    Py_DECREF(errors);
+    if (ConversionError == NULL)
+        return NULL;
+    ret = PyModule_Create(&module);
+#ifdef Py_GIL_DISABLED
+    /* no shared mutable state, keep the GIL disabled on free-threaded
+     * builds */
+    if (ret != NULL)
+        PyUnstable_Module_SetGIL(ret, Py_MOD_GIL_NOT_USED);
+#endif
+    return ret;
+}
@@ -0,0 +1,182 @@
+"""Conversion from asyncio code with micro-batching.
+
+Concurrent ``await AsyncConverter.convert(...)`` calls are collected for a
+short ``window`` or until ``batchsize`` calls are pending and converted
+together through ``IntelliDateTime.convert_many``, optionally in an
+executor off the event loop. Each call gets its own result or
+``DateTimeConversionError``.
+"""
+from bda.intellidatetime.converter import DATETIME
+from bda.intellidatetime.converter import IntelliDateTime
+from collections import deque
+import asyncio
+
+
+class AsyncConverter(object):
+    """Coalesce concurrent conversions into batches.
+
+    Use as async context manager to wait for pending conversions on exit::
+
+        async with AsyncConverter() as converter:
+            dt = await converter.convert('1.1.2008', locale='de')
+    """
+
+    def __init__(self, converter=None, window=0.001, batchsize=256,
+                 executor=None, limit=10000):
+        """@param converter - the ``IntelliDateTime`` instance to use
+        @param window - seconds calls are collected before a batch is
+                        converted
+        @param batchsize - number of pending calls converted immediately
+        @param executor - optional ``concurrent.futures.Executor`` batches
+                          are converted in. If None, batches are converted
+                          on the event loop
+        @param limit - maximum number of calls in progress, further calls
+                       wait until earlier ones are done
+        """
+        self.converter = converter if converter is not None \
+            else IntelliDateTime()
+        self.window = window
+        self.batchsize = batchsize
+        self.executor = executor
+        self.limit = limit
+        self.batches = 0
+        # ``(tzinfo, locale, output)`` -> list of ``(date, time, future)``
+        self._pending = dict()
+        self._size = 0
+        self._timer = None
+        self._tasks = set()
+        # calls in progress and futures of calls waiting for a slot
+        self._active = 0
+        self._waiters = deque()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.flush()
+
+    @property
+    def pending(self):
+        """Number of calls waiting for their batch to be converted.
+        """
+        return self._size
+
+    async def convert(self, date, time=None, tzinfo=None, locale='iso',
+                      output=DATETIME):
+        """See ``interfaces.IIntelliDateTime.convert``.
+        """
+        self.converter._checkOutput(output)
+        loop = asyncio.get_running_loop()
+        await self._acquire(loop)
+        try:
+            future = loop.create_future()
+            key = (tzinfo, locale, output)
+            calls = self._pending.get(key)
+            if calls is None:
+                calls = self._pending[key] = list()
+            calls.append((date, time, future))
+            self._size += 1
+            if self._size >= self.batchsize:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+            return await future
+        finally:
+            self._release()
+
+    async def _acquire(self, loop):
+        # ``asyncio.Semaphore`` wakes waiters in linear time on some Python
+        # versions, which does not scale to thousands of waiting calls
+        if self._active < self.limit:
+            self._active += 1
+            return
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # slot has been handed over already
+                self._release()
+            raise
+
+    def _release(self):
+        # hand the slot over to the next waiting call
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    async def flush(self):
+        """Convert pending calls now and wait until all batches are done.
+        """
+        self._flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = dict()
+        self._size = 0
+        for key, calls in pending.items():
+            self.batches += 1
+            if self.executor is None:
+                try:
+                    values, errors = self._convertBatch(calls, *key)
+                except Exception as e:
+                    self._fail(calls, e)
+                    continue
+                self._resolve(calls, values, errors)
+                continue
+            task = asyncio.ensure_future(self._convertOffLoop(calls, key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _convertOffLoop(self, calls, key):
+        loop = asyncio.get_running_loop()
+        try:
+            values, errors = await loop.run_in_executor(
+                self.executor,
+                self._convertBatch,
+                calls,
+                *key
+            )
+        except Exception as e:
+            self._fail(calls, e)
+            return
+        self._resolve(calls, values, errors)
+
+    def _convertBatch(self, calls, tzinfo, locale, output):
+        errors = dict()
+        values = self.converter.convert_many(
+            [date for date, _, _ in calls],
+            [time for _, time, _ in calls],
+            tzinfo=tzinfo,
+            locale=locale,
+            onerror=errors.__setitem__,
+            output=output
+        )
+        return values, errors
+
+    def _resolve(self, calls, values, errors):
+        for index, (_, _, future) in enumerate(calls):
+            if future.done():
+                # cancelled by the caller
+                continue
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(values[index])
+
+    def _fail(self, calls, error):
+        # unexpected errors fail the whole batch
+        for _, _, future in calls:
+            if not future.done():
+                future.set_exception(error)
@@ -0,0 +1,774 @@
+"""Benchmarks and regression harness for the converter hot paths.
+
+Run with ``python -m bda.intellidatetime.benchmarks``. See ``--help`` for
+available options.
+
+The suite generates input corpora for every locale in
+``LocalePattern.PATTERNS`` and measures ``convert`` as well as the parsing
+stages ``_splitValue``, ``_parseDate``, ``_parseTime`` and ``_splitDate``.
+Results can be saved as JSON and compared against a stored baseline.
+"""
+from bda.intellidatetime.converter import DATE_PATTERNS
+from bda.intellidatetime.converter import IntelliDateTime
+from bda.intellidatetime.converter import LocalePattern
+from bda.intellidatetime.converter import OUTPUTS
+from bda.intellidatetime.converter import convert
+from bda.intellidatetime.formatter import SEPARATORS
+from bda.intellidatetime.locales import registry
+from bda.intellidatetime.tables import PackedTables
+from datetime import datetime
+import argparse
+import fnmatch
+import json
+import multiprocessing
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
+
+
+try:
+    from zoneinfo import ZoneInfo
+    TIMEZONE = ZoneInfo('Europe/Vienna')
+except ImportError:  # pragma: no cover
+    try:
+        import pytz
+        TIMEZONE = pytz.timezone('Europe/Vienna')
+    except ImportError:
+        TIMEZONE = None
+
+# sample input per date pattern, all denoting 2008-02-01
+SAMPLES = {
+    'Y M D': ['20080201', '2008-02-01', '08.2.1'],
+    'D M Y': ['01022008', '01.02.2008', '1.2.08'],
+    'M D Y': ['02012008', '02/01/2008', '2/1/08'],
+}
+
+# limiter used for delimited input per date pattern
+LIMITERS = {
+    'Y M D': '-',
+    'D M Y': '.',
+    'M D Y': '/',
+}
+
+DATE_SHAPES = [
+    'delimited',
+    'short_year',
+    'packed8',
+    'packed6',
+    'packed4',
+    'day',
+    'noisy',
+]
+
+TIME_SHAPES = [
+    'delimited',
+    'packed4',
+    'hour',
+]
+
+NOISE = [' ', '  ', '%_', ' abcde ', ' --- ', ':_; ', 'AEIOU']
+
+CORPUS_SIZE = 100
+
+
+def _parts(pattern, dt, year):
+    values = {'Y': year, 'M': dt.month, 'D': dt.day}
+    return [values[name] for name in pattern.split(' ')]
+
+
+def date_corpus(pattern, shape, size=CORPUS_SIZE, seed=0):
+    """Generate date input.
+
+    @param pattern - the date pattern
+    @param shape - one of ``DATE_SHAPES``
+    @param size - number of values
+    @param seed - random seed
+    @return list - the date strings
+    """
+    rand = random.Random(seed)
+    limiter = LIMITERS[pattern]
+    names = pattern.split(' ')
+    ret = list()
+    for i in range(size):
+        dt = datetime.fromordinal(rand.randint(
+            datetime(1950, 1, 1).toordinal(),
+            datetime(2049, 12, 31).toordinal()
+        ))
+        if shape == 'delimited':
+            parts = _parts(pattern, dt, dt.year)
+            value = limiter.join(str(part) for part in parts)
+        elif shape == 'short_year':
+            parts = _parts(pattern, dt, dt.year % 100)
+            value = limiter.join(str(part) for part in parts)
+        elif shape == 'packed8':
+            value = ''.join(
+                '%04d' % part if name == 'Y' else '%02d' % part
+                for name, part in zip(names, _parts(pattern, dt, dt.year))
+            )
+        elif shape == 'packed6':
+            value = ''.join(
+                '%02d' % part for part in _parts(pattern, dt, dt.year % 100)
+            )
+        elif shape == 'packed4':
+            value = ''.join(
+                '%02d' % part
+                for name, part in zip(names, _parts(pattern, dt, dt.year))
+                if name != 'Y'
+            )
+        elif shape == 'day':
+            value = str(min(dt.day, 28))
+        elif shape == 'noisy':
+            value = rand.choice(NOISE).join(
+                str(part) for part in _parts(pattern, dt, dt.year)
+            )
+            value = rand.choice(NOISE) + value + rand.choice(NOISE)
+        else:
+            raise ValueError('Unknown date shape {}'.format(shape))
+        ret.append(value)
+    return ret
+
+
+def time_corpus(shape, size=CORPUS_SIZE, seed=0):
+    """Generate time input.
+
+    @param shape - one of ``TIME_SHAPES``
+    @param size - number of values
+    @param seed - random seed
+    @return list - the time strings
+    """
+    rand = random.Random(seed)
+    ret = list()
+    for i in range(size):
+        hour = rand.randint(0, 23)
+        minute = rand.randint(0, 59)
+        if shape == 'delimited':
+            value = '{}:{:02d}'.format(hour, minute)
+        elif shape == 'packed4':
+            value = '{:02d}{:02d}'.format(hour, minute)
+        elif shape == 'hour':
+            value = str(hour)
+        else:
+            raise ValueError('Unknown time shape {}'.format(shape))
+        ret.append(value)
+    return ret
+
+
+class Case(object):
+    """A benchmark case calling ``func`` with each corpus entry as
+    arguments.
+    """
+
+    def __init__(self, name, func, corpus):
+        self.name = name
+        self.func = func
+        self.corpus = corpus
+
+
+def cases(converter=None):
+    """Generate all benchmark cases.
+
+    @param converter - the ``IntelliDateTime`` instance to benchmark
+    @return list - the ``Case`` instances
+    """
+    if converter is None:
+        converter = IntelliDateTime()
+    pattern = converter.pattern
+    ret = list()
+    times = dict((shape, time_corpus(shape)) for shape in TIME_SHAPES)
+    timezones = [('naive', None)]
+    if TIMEZONE is not None:
+        timezones.append(('tz', TIMEZONE))
+    for shape in DATE_SHAPES:
+        ret.append(Case(
+            '_splitValue/{}'.format(shape),
+            converter._splitValue,
+            [(value,) for value in date_corpus('Y M D', shape)]
+        ))
+    for shape in TIME_SHAPES:
+        ret.append(Case(
+            '_parseTime/{}'.format(shape),
+            converter._parseTime,
+            [(value, 'iso') for value in times[shape]]
+        ))
+    for datepattern in sorted(LIMITERS):
+        datemap = converter._dateMap(datepattern)
+        ret.append(Case(
+            '_splitDate/{}'.format(datepattern.replace(' ', '')),
+            converter._splitDate,
+            [
+                (value, datemap)
+                for value in date_corpus(datepattern, 'packed8')
+            ]
+        ))
+    for locale in sorted(LocalePattern.PATTERNS['date']):
+        datepattern = pattern.date(locale)
+        for shape in DATE_SHAPES:
+            dates = date_corpus(datepattern, shape)
+            ret.append(Case(
+                '_parseDate/{}/{}'.format(locale, shape),
+                converter._parseDate,
+                [(value, locale) for value in dates]
+            ))
+            for timeshape in [None] + TIME_SHAPES:
+                if timeshape is None:
+                    timevalues = [None] * len(dates)
+                else:
+                    timevalues = times[timeshape]
+                for tzname, tzinfo in timezones:
+                    ret.append(Case(
+                        'convert/{}/{}/{}/{}'.format(
+                            locale,
+                            shape,
+                            timeshape or 'notime',
+                            tzname
+                        ),
+                        converter.convert,
+                        [
+                            (date, time, tzinfo, locale)
+                            for date, time in zip(dates, timevalues)
+                        ]
+                    ))
+    tabled = IntelliDateTime(clock=converter.clock, tables=PackedTables())
+    for shape in ['packed8', 'packed6', 'packed4']:
+        dates = date_corpus('D M Y', shape)
+        for name, instance in [('plain', converter), ('tables', tabled)]:
+            ret.append(Case(
+                'packed/{}/{}'.format(shape, name),
+                instance.convert,
+                [
+                    (date, time, None, 'de')
+                    for date, time in zip(dates, times['packed4'])
+                ]
+            ))
+    dates = date_corpus('Y M D', 'delimited')
+    for output in OUTPUTS:
+        if output == 'datetime64':
+            # numpy scalars, not relevant for batches
+            continue
+        for tzname, tzinfo in timezones:
+            ret.append(Case(
+                'output/{}/{}'.format(output, tzname),
+                converter.convert,
+                [
+                    (date, time, tzinfo, 'iso', output)
+                    for date, time in zip(dates, times['delimited'])
+                ]
+            ))
+    return ret
+
+
+def _noop(*args):
+    pass
+
+
+def _peak(func, corpus, calls):
+    # average peak of traced bytes allocated per call
+    if not calls:
+        return 0.0
+    peaks = 0
+    for i in range(calls):
+        args = corpus[i % len(corpus)]
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        peaks += tracemalloc.get_traced_memory()[1] - current
+    return peaks / float(calls)
+
+
+def measure(case, min_time=0.05, samples=1000, allocations=100):
+    """Measure a benchmark case.
+
+    @param case - the ``Case`` to measure
+    @param min_time - minimum seconds spent per throughput timing run
+    @param samples - number of single calls timed for latency percentiles
+    @param allocations - number of single calls traced for allocations
+    @return dict - ``ops`` per second, latency percentiles ``p50``, ``p90``
+                   and ``p99`` in microseconds and ``alloc``, the average
+                   peak of bytes allocated per call
+    """
+    func = case.func
+    corpus = case.corpus
+
+    def run():
+        for args in corpus:
+            func(*args)
+
+    # throughput
+    timer = timeit.Timer(run)
+    start = time.perf_counter()
+    run()
+    elapsed = time.perf_counter() - start
+    loops = max(1, int(min_time / elapsed)) if elapsed else 1
+    best = min(timer.repeat(repeat=3, number=loops))
+    ops = loops * len(corpus) / best
+    # latency
+    clock = time.perf_counter
+    latencies = list()
+    for i in range(samples):
+        args = corpus[i % len(corpus)]
+        start = clock()
+        func(*args)
+        latencies.append(clock() - start)
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    # allocations
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        alloc = _peak(func, corpus, allocations) - _peak(
+            _noop,
+            corpus,
+            allocations
+        )
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return {
+        'ops': ops,
+        'p50': percentile(0.5) * 1e6,
+        'p90': percentile(0.9) * 1e6,
+        'p99': percentile(0.99) * 1e6,
+        'alloc': max(alloc, 0.0),
+    }
+
+
+def selected(name, patterns):
+    return not patterns or any(
+        fnmatch.fnmatch(name, pattern) for pattern in patterns
+    )
+
+
+def run_suite(patterns=None, min_time=0.05, samples=1000, allocations=100,
+              out=None):
+    """Run benchmark cases.
+
+    @param patterns - list of ``fnmatch`` patterns selecting cases by name,
+                      all cases if None
+    @param min_time - see ``measure``
+    @param samples - see ``measure``
+    @param allocations - see ``measure``
+    @param out - stream progress gets written to or None
+    @return dict - JSON serializable results
+    """
+    results = dict()
+    for case in cases():
+        if not selected(case.name, patterns):
+            continue
+        result = results[case.name] = measure(
+            case,
+            min_time=min_time,
+            samples=samples,
+            allocations=allocations
+        )
+        if out is not None:
+            out.write(format_result(case.name, result) + '\n')
+            out.flush()
+    return {
+        'meta': {
+            'python': sys.version,
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'created': datetime.now().isoformat(),
+        },
+        'results': results,
+    }
+
+
+def format_result(name, result):
+    return (
+        '{:<40}{:>10.0f} ops/s  p50 {:6.2f}  p90 {:6.2f}  p99 {:6.2f} usec'
+        '  {:6.0f} B/call'
+    ).format(
+        name,
+        result['ops'],
+        result['p50'],
+        result['p90'],
+        result['p99'],
+        result['alloc']
+    )
+
+
+def compare(baseline, current, threshold=0.1):
+    """Compare results against a baseline.
+
+    @param baseline - results as returned by ``run_suite``
+    @param current - results as returned by ``run_suite``
+    @param threshold - relative throughput loss considered a regression
+    @return list - ``(name, baseline ops, current ops, ratio, regressed)``
+                   tuples of cases contained in both results
+    """
+    ret = list()
+    base = baseline['results']
+    for name, result in sorted(current['results'].items()):
+        if name not in base:
+            continue
+        ratio = result['ops'] / base[name]['ops']
+        ret.append((
+            name,
+            base[name]['ops'],
+            result['ops'],
+            ratio,
+            ratio < 1.0 - threshold
+        ))
+    return ret
+
+
+def bench_plans(number=100000, repeat=5):
+    """Measure the locale dependent setup done per call, once with the
+    parse plan cached on the converter and once derived from scratch as
+    done before parse plans were introduced.
+
+    @param number - number of setups per timing run
+    @param repeat - number of timing runs, the best one is taken
+    @return list - ``(locale, cached usec, derived usec)`` tuples
+    """
+    converter = IntelliDateTime()
+    pattern = converter.pattern
+    ret = list()
+    for locale in sorted(LocalePattern.PATTERNS['date']):
+        cached = timeit.Timer(lambda: converter._plan(locale))
+        derived = timeit.Timer(lambda: converter._compilePlan(
+            pattern.date(locale),
+            pattern.time(locale)
+        ))
+        ret.append((
+            locale,
+            min(cached.repeat(repeat=repeat, number=number)) / number * 1e6,
+            min(derived.repeat(repeat=repeat, number=number)) / number * 1e6
+        ))
+    return ret
+
+
+def bench_format(number=100000, repeat=5):
+    """Measure ``format_datetime`` against ``strftime`` rendering the same
+    form per date pattern.
+
+    @param number - number of formatted datetimes per timing run
+    @param repeat - number of timing runs, the best one is taken
+    @return list - ``(date pattern, format_datetime usec, strftime usec)``
+                   tuples
+    """
+    converter = IntelliDateTime()
+    dt = datetime(2008, 4, 3, 10, 30)
+    directives = {'Y': '%Y', 'M': '%m', 'D': '%d'}
+    ret = list()
+    for pattern in DATE_PATTERNS:
+        template = SEPARATORS[pattern].join(
+            directives[field] for field in pattern.split()
+        ) + ' %H:%M'
+        formatted = timeit.Timer(
+            lambda: converter.format_datetime(dt, pattern, time=True)
+        )
+        strftime = timeit.Timer(lambda: dt.strftime(template))
+        ret.append((
+            pattern,
+            min(formatted.repeat(repeat=repeat, number=number)) / number * 1e6,
+            min(strftime.repeat(repeat=repeat, number=number)) / number * 1e6
+        ))
+    return ret
+
+
+def bench_workers(rows=500000, max_workers=None, chunksize=10000):
+    """Measure the throughput of ``convert_many`` with 1 up to
+    ``max_workers`` worker processes.
+
+    @param rows - number of rows converted per run
+    @param max_workers - maximum number of workers, defaults to CPU count
+    @param chunksize - number of rows per chunk sent to a worker
+    @return list - ``(workers, rows per second)`` tuples
+    """
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    converter = IntelliDateTime()
+    samples = SAMPLES['D M Y']
+    dates = [samples[i % len(samples)] for i in range(rows)]
+    ret = list()
+    for workers in range(1, max_workers + 1):
+        start = time.time()
+        converter.convert_many(
+            dates,
+            locale='de',
+            workers=workers,
+            chunksize=chunksize
+        )
+        ret.append((workers, rows / (time.time() - start)))
+    return ret
+
+
+def gil_enabled():
+    """Return whether the interpreter runs with the GIL enabled.
+    """
+    check = getattr(sys, '_is_gil_enabled', None)
+    return check is None or check()
+
+
+def _convert_calls(barrier, calls, errors):
+    dates = SAMPLES['D M Y']
+    barrier.wait()
+    try:
+        for index in range(calls):
+            dt = convert(dates[index % len(dates)], '10:30', locale='de')
+            if dt.month != 2:
+                raise AssertionError(dt)
+    except Exception as e:  # pragma: no cover
+        errors.append(e)
+
+
+def _register_calls(barrier, stop, errors):
+    barrier.wait()
+    try:
+        index = 0
+        while not stop.is_set():
+            # copy on write, concurrent lookups are not blocked
+            registry.register('x-bench', DATE_PATTERNS[index % 3])
+            LocalePattern.register('x-bench', DATE_PATTERNS[index % 3])
+            index += 1
+            time.sleep(0.001)
+    except Exception as e:  # pragma: no cover
+        errors.append(e)
+
+
+def bench_threads(calls=50000, max_threads=None, register=True):
+    """Measure the throughput of the module level ``convert`` sharing one
+    converter with 1 up to ``max_threads`` threads.
+
+    Each thread converts ``calls`` values. If ``register`` is true, another
+    thread concurrently registers locales. Throughput scales with threads
+    on free-threaded Python only, see ``gil_enabled``.
+
+    @param calls - number of conversions per thread
+    @param max_threads - maximum number of threads, defaults to CPU count
+    @param register - whether to register locales concurrently
+    @return list - ``(threads, calls per second)`` tuples
+    @raise AssertionError - if a conversion or registration failed
+    """
+    if max_threads is None:
+        max_threads = multiprocessing.cpu_count()
+    ret = list()
+    for count in range(1, max_threads + 1):
+        errors = list()
+        stop = threading.Event()
+        barrier = threading.Barrier(count + (1 if register else 0) + 1)
+        threads = [
+            threading.Thread(
+                target=_convert_calls,
+                args=(barrier, calls, errors)
+            ) for _ in range(count)
+        ]
+        if register:
+            registrar = threading.Thread(
+                target=_register_calls,
+                args=(barrier, stop, errors)
+            )
+            registrar.start()
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        start = time.time()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+        stop.set()
+        if register:
+            registrar.join()
+        if errors:
+            raise AssertionError(errors)
+        ret.append((count, count * calls / elapsed))
+    return ret
+
+
+IMPORT_SCENARIOS = [
+    ('import', 'import bda.intellidatetime'),
+    ('convert', (
+        'import bda.intellidatetime as m\n'
+        'm.convert("1.1.2008", "10:00", locale="de")'
+    )),
+    ('interfaces', (
+        'import bda.intellidatetime as m\n'
+        'm.convert("1.1.2008", "10:00", locale="de")\n'
+        'm.IIntelliDateTime'
+    )),
+]
+
+
+def _import_time(code):
+    # sum of the cumulative import times of top level imports in usec as
+    # reported by ``python -X importtime``
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        stderr=subprocess.PIPE,
+        check=True,
+        universal_newlines=True
+    ).stderr
+    total = 0
+    modules = set()
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            cumulative, name = line.split('|')[1:]
+            cumulative = int(cumulative)
+        except ValueError:
+            # header
+            continue
+        modules.add(name.strip())
+        if not name.startswith('  '):
+            total += cumulative
+    return total, modules
+
+
+def bench_import(repeat=5):
+    """Measure the cold start cost of importing the package in fresh
+    interpreters.
+
+    Times are the best of ``repeat`` runs with the interpreter startup
+    subtracted.
+
+    @param repeat - number of interpreter runs per scenario
+    @return list - ``(scenario, usec, modules)`` tuples, where modules are
+                   the number of modules imported beyond interpreter startup
+    """
+    startup, startup_modules = min(
+        _import_time('pass') for _ in range(repeat)
+    )
+    ret = list()
+    for scenario, code in IMPORT_SCENARIOS:
+        usec, modules = min(_import_time(code) for _ in range(repeat))
+        ret.append((
+            scenario,
+            max(usec - startup, 0),
+            len(modules - startup_modules)
+        ))
+    return ret
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m bda.intellidatetime.benchmarks',
+        description='Benchmark the converter hot paths.'
+    )
+    parser.add_argument(
+        'benchmark',
+        nargs='?',
+        choices=['suite', 'plans', 'workers', 'threads', 'import', 'format'],
+        default='suite',
+        help='benchmark to run, defaults to suite'
+    )
+    parser.add_argument(
+        '-k', '--select', action='append', default=None,
+        help='fnmatch pattern selecting suite cases, e.g. "convert/de/*". '
+             'May be given multiple times'
+    )
+    parser.add_argument(
+        '--list', action='store_true',
+        help='list suite cases and exit'
+    )
+    parser.add_argument(
+        '--quick', action='store_true',
+        help='less precise but faster suite run'
+    )
+    parser.add_argument(
+        '--save', default=None,
+        help='save suite results as JSON to given file'
+    )
+    parser.add_argument(
+        '--compare', default=None,
+        help='compare suite results against given JSON baseline and exit '
+             'with status 1 on regressions'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=0.1,
+        help='relative throughput loss considered a regression, '
+             'defaults to 0.1'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help='maximum number of workers or threads, defaults to CPU count'
+    )
+    return parser
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    if args.benchmark == 'plans':
+        print('Per call locale setup (cached plan / derived maps):')
+        for locale, cached, derived in bench_plans():
+            print('  {:<8}{:8.3f} / {:8.3f} usec/call'.format(
+                locale, cached, derived
+            ))
+        return 0
+    if args.benchmark == 'workers':
+        print('Batch conversion scaling:')
+        for workers, rate in bench_workers(max_workers=args.workers):
+            print('  {:>3} workers {:12.0f} rows/sec'.format(workers, rate))
+        return 0
+    if args.benchmark == 'threads':
+        print('Shared converter scaling (GIL {}):'.format(
+            'enabled' if gil_enabled() else 'disabled'
+        ))
+        for threads, rate in bench_threads(max_threads=args.workers):
+            print('  {:>3} threads {:12.0f} calls/sec'.format(threads, rate))
+        return 0
+    if args.benchmark == 'format':
+        print('Formatting (format_datetime / strftime):')
+        for pattern, formatted, strftime in bench_format():
+            print('  {:<8}{:8.3f} / {:8.3f} usec/call'.format(
+                pattern, formatted, strftime
+            ))
+        return 0
+    if args.benchmark == 'import':
+        print('Cold start (python -X importtime):')
+        for scenario, usec, modules in bench_import():
+            print('  {:<12}{:10.1f} msec {:5} modules'.format(
+                scenario, usec / 1000., modules
+            ))
+        return 0
+    if args.list:
+        for case in cases():
+            if selected(case.name, args.select):
+                print(case.name)
+        return 0
+    kwargs = dict()
+    if args.quick:
+        kwargs = dict(min_time=0.01, samples=200, allocations=20)
+    results = run_suite(args.select, out=sys.stdout, **kwargs)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = 0
+        print('Comparison against {}:'.format(args.compare))
+        for name, before, after, ratio, regressed in compare(
+            baseline,
+            results,
+            args.threshold
+        ):
+            regressions += regressed
+            print('{:<40}{:>10.0f} -> {:>10.0f} ops/s  {:5.2f}x{}'.format(
+                name,
+                before,
+                after,
+                ratio,
+                '  REGRESSION' if regressed else ''
+            ))
+        if regressions:
+            print('{} regressions'.format(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
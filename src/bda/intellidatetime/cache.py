@@ -0,0 +1,91 @@
+from collections import OrderedDict
+import threading
+
+
+# Scopes of relative date input. Results of one part dates depend on the
+# current month, of two part dates on the current year and of two digit years
+# on the current century.
+MONTH = 'month'
+YEAR = 'year'
+CENTURY = 'century'
+
+
+def stamp(scope, now):
+    """Return the stamp of ``now`` for given scope.
+
+    @param scope - one of ``MONTH``, ``YEAR`` or ``CENTURY``
+    @param now - the datetime relative input gets resolved against
+    @return tuple - the stamp
+    """
+    if scope == MONTH:
+        return (MONTH, now.year, now.month)
+    if scope == YEAR:
+        return (YEAR, now.year)
+    return (CENTURY, now.year // 100)
+
+
+class ConversionCache(object):
+    """Bounded LRU cache for conversion results.
+
+    Entries resolved relative to the current date carry a stamp of the scope
+    they depend on and expire as soon as this scope rolls over.
+    """
+
+    def __init__(self, maxsize=1024):
+        """@param maxsize - maximum number of cached results
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, now):
+        """Return the cached value for key or None.
+
+        @param key - the cache key
+        @param now - callable returning the current datetime, only called if
+                     the entry depends on the current date
+        @return object - the cached value or None
+        @raise TypeError - if key is not hashable
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, valid = entry
+            if valid is not None and valid != stamp(valid[0], now()):
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, valid=None):
+        """Cache value for key.
+
+        @param key - the cache key
+        @param value - the value to cache
+        @param valid - the stamp the value was resolved against, if any
+        """
+        with self._lock:
+            self._data[key] = (value, valid)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
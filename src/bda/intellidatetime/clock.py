@@ -0,0 +1,49 @@
+from datetime import datetime
+from datetime import timedelta
+import time
+
+
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+class CachedClock(object):
+    """Coarse clock returning the current datetime, fetched from its source
+    at most once per ``resolution`` seconds.
+
+    The fetched datetime is returned unchanged while cached, thus its time of
+    day lags behind by up to ``resolution`` seconds. Relative input only
+    depends on the current month, year or century. A fetched datetime is
+    never reused beyond the following midnight, thus the date is current
+    unless the system clock is set.
+
+    Adjusting the fetched datetime by the elapsed monotonic time on each call
+    would cost more than calling ``datetime.now``.
+    """
+
+    def __init__(self, resolution=1.0, source=datetime.now,
+                 monotonic=monotonic):
+        """@param resolution - seconds a fetched datetime is reused at most
+        @param source - callable returning the current datetime
+        @param monotonic - callable returning monotonic seconds
+        """
+        self.resolution = resolution
+        self.source = source
+        self.monotonic = monotonic
+        self._now = None
+        self._expires = None
+
+    def __call__(self):
+        current = self.monotonic()
+        if self._expires is None or current >= self._expires:
+            now = self._now = self.source()
+            midnight = now.replace(
+                hour=0,
+                minute=0,
+                second=0,
+                microsecond=0
+            ) + timedelta(days=1)
+            self._expires = current + min(
+                self.resolution,
+                (midnight - now).total_seconds()
+            )
+        return self._now
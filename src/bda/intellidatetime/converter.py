@@ -1,131 +1,1080 @@
-from bda.intellidatetime.interfaces import DateTimeConversionError
-from bda.intellidatetime.interfaces import IIntelliDateTime
-from bda.intellidatetime.interfaces import ILocalePattern
+from array import array
+from bda.intellidatetime.cache import CENTURY
+from bda.intellidatetime.cache import ConversionCache
+from bda.intellidatetime.cache import MONTH
+from bda.intellidatetime.cache import YEAR
+from bda.intellidatetime.cache import stamp
+from bda.intellidatetime.errors import DATE_PARTS
+from bda.intellidatetime.errors import DAY_RANGE
+from bda.intellidatetime.errors import DateTimeConversionError
+from bda.intellidatetime.errors import EMPTY
+from bda.intellidatetime.errors import HOUR_RANGE
+from bda.intellidatetime.errors import MESSAGES
+from bda.intellidatetime.errors import MINUTE_RANGE
+from bda.intellidatetime.errors import MONTH_RANGE
+from bda.intellidatetime.errors import NUMERIC_LENGTH
+from bda.intellidatetime.errors import SECOND_RANGE
+from bda.intellidatetime.errors import TIME_PARTS
+from bda.intellidatetime.errors import WALL_TIME
+from bda.intellidatetime.errors import YEAR_RANGE
+from bda.intellidatetime.grammar import TimeGrammar
+from bda.intellidatetime.locales import BUILTIN
+from bda.intellidatetime.locales import registry
+from bda.intellidatetime.tz import Localizer
+from bda.intellidatetime.tz import RAISE
+from contextlib import contextmanager
 from datetime import datetime
-from zope.interface import implementer
+from types import MappingProxyType
+import contextvars
+import itertools
+import os
+import re
 import sys
-import types
 
 
-IS_PY2 = sys.version_info[0] < 3
-STRING_TYPES = types.StringTypes if IS_PY2 else (str,)
+STRING_TYPES = (str,)
+# ASCII encoded values are parsed from buffers without decoding
+BUFFER_TYPES = (bytes, bytearray, memoryview)
+VALUE_TYPES = STRING_TYPES + BUFFER_TYPES
+WHITESPACE = frozenset(b' \t\n\r\x0b\x0c')
 
+# only ASCII digits are considered numeric
+DIGITS = re.compile(r'[0-9]+')
+NUMERIC = re.compile(r'[0-9]+\Z')
+DIGITS_BYTES = re.compile(br'[0-9]+')
+NUMERIC_BYTES = re.compile(br'[0-9]+\Z')
+# lengths of parseable numeric values
+NUMERIC_LENGTHS = frozenset([1, 2, 4, 6, 8])
 
-def convert(date, time=None, tzinfo=None, locale='iso'):
-    return IntelliDateTime().convert(date, time, tzinfo, locale)
+# compiled accelerator of the parse routine, set ``BDA_INTELLIDATETIME_PURE``
+# to use the pure Python implementation
+if os.environ.get('BDA_INTELLIDATETIME_PURE'):
+    native = None
+else:
+    try:
+        from bda.intellidatetime import _speedups as native
+    except ImportError:  # pragma: no cover
+        native = None
 
+# date patterns, see ``interfaces.ILocalePattern.date``
+DATE_PATTERNS = ('Y M D', 'D M Y', 'M D Y')
+# locales of ``LocalePattern.PATTERNS``
+PATTERN_LOCALES = ('iso', 'cs', 'de', 'de-at', 'de-ch', 'de-de', 'en', 'es',
+                   'fr', 'it', 'uk')
 
-@implementer(ILocalePattern)
-class LocalePattern(object):
-    """See ``interfaces.ILocalePattern``.
+# the locale name requesting inference of the date pattern
+INFER = 'infer'
+
+# output formats
+DATETIME = 'datetime'
+EPOCH_SECONDS = 'epoch_seconds'
+EPOCH_MINUTES = 'epoch_minutes'
+ORDINAL = 'ordinal'
+DATETIME64 = 'datetime64'
+OUTPUTS = (DATETIME, EPOCH_SECONDS, EPOCH_MINUTES, ORDINAL, DATETIME64)
+
+# marks failed rows of integer batch results, equals the integer value of
+# numpy's ``NaT``
+NAT = -2 ** 63
+EPOCH_ORDINAL = 719163
+
+DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+DAYS_BEFORE_MONTH = (0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+# ``(year, month)`` -> ``month_range`` result
+MONTHS = dict()
+
+
+def isarray(value):
+    """Check whether value is a numpy array.
+
+    numpy is not imported here. If value is an array, numpy has been
+    imported already by whoever created it.
+    """
+    numpy = sys.modules.get('numpy')
+    return numpy is not None and isinstance(value, numpy.ndarray)
+
+
+def isleap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+
+def ordinal(year, month, day):
+    """Return the proleptic Gregorian ordinal of a date, see
+    ``datetime.date.toordinal``. Arguments are not validated.
+    """
+    before = year - 1
+    days = DAYS_BEFORE_MONTH[month] + day
+    if month > 2 and isleap(year):
+        days += 1
+    return before * 365 + before // 4 - before // 100 + before // 400 + days
+
+
+def month_range(year, month):
+    """Return days since the epoch of the day before the first of a month
+    and the number of days of the month.
 
-    XXX: complete language codes
+    Results are memoized in ``MONTHS``.
+
+    @raise DateTimeConversionError - if year or month are out of range
     """
-    __date_I = 'Y M D'
-    __date_II = 'D M Y'
-    __date_III = 'M D Y'
-    __time_I = 'H M'
-    __time_II = 'M H'  # ever used ??
+    if not (1 <= year <= 9999 and 1 <= month <= 12):
+        # raise with the message of ``datetime``
+        try:
+            datetime(year, month, 1)
+        except (ValueError, OverflowError) as e:
+            raise DateTimeConversionError(e)
+    length = DAYS_IN_MONTH[month]
+    if month == 2 and not isleap(year):
+        length -= 1
+    ret = MONTHS[year, month] = (
+        ordinal(year, month, 1) - 1 - EPOCH_ORDINAL,
+        length
+    )
+    return ret
+
+
+def convert(date, time=None, tzinfo=None, locale='iso', output=DATETIME):
+    return shared.convert(date, time, tzinfo, locale, output)
+
+
+def convert_many(dates, times=None, tzinfo=None, locale='iso', onerror=None,
+                 workers=None, chunksize=10000, output=DATETIME):
+    return shared.convert_many(
+        dates,
+        times,
+        tzinfo,
+        locale,
+        onerror=onerror,
+        workers=workers,
+        chunksize=chunksize,
+        output=output
+    )
+
+
+def convert_datetime(value, tzinfo=None, locale='iso', output=DATETIME):
+    return shared.convert_datetime(value, tzinfo, locale, output)
+
+
+def validate(date, time=None, tzinfo=None, locale='iso'):
+    return shared.validate(date, time, tzinfo, locale)
+
+
+def try_convert(date, time=None, tzinfo=None, locale='iso', output=DATETIME):
+    return shared.try_convert(date, time, tzinfo, locale, output)
+
+
+def format_datetime(value, locale='iso', time=False, packed=False,
+                    short=False, separator=None):
+    return shared.format_datetime(
+        value,
+        locale,
+        time,
+        packed,
+        short,
+        separator
+    )
+
+
+def format_datetimes(values, locale='iso', time=False, packed=False,
+                     short=False, separator=None, onerror=None):
+    return shared.format_datetimes(
+        values,
+        locale,
+        time,
+        packed,
+        short,
+        separator,
+        onerror=onerror
+    )
 
-    PATTERNS = {
-        'date': dict(),
-        'time': dict(),
-    }
-    PATTERNS['date']['iso'] = __date_I
 
-    for locale in ['de', 'de-de', 'de-at', 'de-ch',
-                   'es', 'fr', 'uk', 'it', 'cs']:
-        PATTERNS['date'][locale] = __date_II
+class LocalePattern(object):
+    """See ``interfaces.ILocalePattern``.
 
-    for locale in ['en']:
-        PATTERNS['date'][locale] = __date_III
+    Patterns are looked up in ``locales.registry``, which contains the
+    built-in ``PATTERNS``. A date pattern like ``D M Y`` may be given as
+    locale as well.
+    """
 
-    for locale in ['iso', 'en', 'de', 'de-de', 'de-at', 'de-ch',
-                   'es', 'fr', 'uk', 'it', 'cs']:
-        PATTERNS['time'][locale] = __time_I
+    # built-in patterns, read only. Use ``register`` to add or override
+    # patterns
+    PATTERNS = MappingProxyType(dict(
+        (kind, MappingProxyType(dict(
+            (locale, BUILTIN[locale.split('-')[0]][index])
+            for locale in PATTERN_LOCALES
+        ))) for index, kind in enumerate(['date', 'time'])
+    ))
 
     def __init__(self, context=None):
         """BBB signature.
         """
         pass
 
+    @classmethod
+    def register(cls, locale, date=None, time=None):
+        """Register or override the patterns of a locale in
+        ``locales.registry``.
+
+        @param locale - the locale name
+        @param date - the date pattern or None to keep the current one
+        @param time - the time pattern or None to keep the current one
+        @raise ValueError - if a pattern is invalid
+        """
+        registry.register(locale, date, time)
+
     def date(self, locale):
-        return self.PATTERNS['date'].get(locale, self.__date_I)
+        if locale in DATE_PATTERNS:
+            return locale
+        return registry.resolve(locale)[0]
 
     def time(self, locale):
-        return self.PATTERNS['time'].get(locale, self.__time_I)
+        return registry.resolve(locale)[1]
+
+
+class ParsePlan(object):
+    """Precompiled date and time mapping of a date and time pattern pair.
+    """
+
+    def __init__(self, datemap, slices, timemap, grammar=None):
+        self.datemap = datemap
+        # ``(start, end)`` offsets of year, month and day in 8 digit dates
+        self.slices = tuple(slices)
+        self.year, self.month, self.day = datemap
+        # whether day is given before month in two part dates
+        self.daymonth = datemap[1] == 1 and datemap[2] == 0
+        self.timemap = timemap
+        self.hour, self.minute = timemap
+        # ``grammar.TimeGrammar`` of extended converters
+        self.grammar = grammar
+        # parameters of the compiled accelerator or None if not available
+        self.params = None
+        if native is not None and grammar is None:
+            self.params = self.slices[0] + self.slices[1] + self.slices[2] \
+                + tuple(datemap) + (int(self.daymonth),) + tuple(timemap)
+
+
+class ConversionResult(object):
+    """Result of ``IntelliDateTime.validate`` and ``try_convert``.
+
+    True if the input is valid. ``code`` is one of the codes in ``errors``
+    or None, ``value`` the converted value or None.
+    """
+    __slots__ = ('value', 'code', '_defs', '_message')
+
+    def __init__(self, value=None, code=None, defs=None, message=None):
+        self.value = value
+        self.code = code
+        self._defs = defs
+        self._message = message
+
+    def __bool__(self):
+        return self.code is None
+
+    def __repr__(self):
+        if self.code is None:
+            return '<ConversionResult {!r}>'.format(self.value)
+        return '<ConversionResult {}: {}>'.format(self.code, self.message)
+
+    @property
+    def message(self):
+        """The message ``convert`` raises with, None if valid.
+        """
+        if self.code is None:
+            return None
+        if self._message is None:
+            message = MESSAGES.get(self.code)
+            if message is None:
+                # range messages are the ones of ``datetime``, computed on
+                # demand only
+                try:
+                    datetime(*self._defs)
+                except (ValueError, OverflowError) as e:
+                    message = str(e)
+            self._message = message
+        return self._message
 
 
-@implementer(IIntelliDateTime)
 class IntelliDateTime(object):
     """See ``interfaces.IIntelliDateTime``.
-    """
-    _numbers = [str(n) for n in range(10)]
 
-    def __init__(self, context=None):
+    Instances are thread safe and reentrant, conversions take no lock unless
+    a ``cache``, an ``instrument`` or a timezone is given. Plans are memoized
+    in dicts, UTC offset tables in the bounded cache of the ``localizer``,
+    concurrent misses compute equal values.
+    """
+    def __init__(self, context=None, cache=None, clock=None, localizer=None,
+                 instrument=None, tables=None, extended=False):
         """B/C context kwarg.
+
+        @param cache - optional ``ConversionCache`` or maximum number of
+                       results to cache
+        @param clock - optional callable returning the current datetime,
+                       defaults to ``datetime.now``
+        @param localizer - optional ``tz.Localizer`` defining the DST gap and
+                           fold policies
+        @param instrument - optional ``Instrumentation`` collecting stage
+                            timings and counters of conversions
+        @param tables - optional ``tables.PackedTables`` used to look up
+                        packed numeric input
+        @param extended - parse times with ``grammar.TimeGrammar``, which
+                          accepts seconds, fractional seconds, meridiem
+                          markers and UTC offsets. Batches of extended
+                          converters are always converted inline
         """
         self.pattern = LocalePattern()
+        if cache is not None and not isinstance(cache, ConversionCache):
+            cache = ConversionCache(maxsize=cache)
+        self.cache = cache
+        self.clock = clock if clock is not None else datetime.now
+        self.localizer = localizer if localizer is not None else Localizer()
+        self.instrument = instrument
+        self.tables = tables
+        self.extended = extended
+        self._plans = dict()
+        self._templates = dict()
+        # a context variable is local to threads and to asyncio tasks
+        self._reference = contextvars.ContextVar('reference', default=None)
 
-    def convert(self, date, time=None, tzinfo=None, locale='iso'):
-        datedefs = self._parseDate(date, locale)
-        timedefs = self._parseTime(time, locale)
-        datetimedefs = datedefs + timedefs
-        kwargs = {
-            'tzinfo': tzinfo
-        }
+    @contextmanager
+    def reference(self, now=None):
+        """Context manager fixing the datetime relative input gets resolved
+        against for the current thread or asyncio task.
+
+        @param now - the reference datetime, defaults to the current one
+        """
+        now = now if now is not None else self._now()
+        token = self._reference.set(now)
+        try:
+            yield now
+        finally:
+            self._reference.reset(token)
+
+    def stats(self):
+        """Return statistics of the instrumentation and the cache.
+        """
+        ret = dict()
+        if self.instrument is not None:
+            ret.update(self.instrument.stats())
+        cache = self.cache
+        if cache is not None:
+            ret['cache'] = {
+                'size': len(cache),
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'evictions': cache.evictions,
+                'expirations': cache.expirations,
+            }
+        return ret
+
+    def _now(self):
+        now = self._reference.get()
+        if now is None:
+            return self.clock()
+        return now
+
+    def convert(self, date, time=None, tzinfo=None, locale='iso',
+                output=DATETIME):
+        if output == DATETIME:
+            return self._convertPlanned(date, time, tzinfo, self._plan(locale))
+        self._checkOutput(output)
+        value = self._convertCompact(
+            date,
+            time,
+            tzinfo,
+            self._plan(locale),
+            output
+        )
+        if output == DATETIME64:
+            import numpy
+            return numpy.datetime64(value, 'm')
+        return value
+
+    def convert_datetime(self, value, tzinfo=None, locale='iso',
+                         output=DATETIME):
+        self._checkOutput(output)
+        plan = self._plan(locale)
+        cache = self.cache
+        if cache is None:
+            value = self._convertCombined(value, tzinfo, plan, output)[0]
+        else:
+            # keys of ``convert`` end with the plan or have five items
+            key = (value, tzinfo, plan, output)
+            try:
+                ret = cache.get(key, self._now)
+            except TypeError:
+                # unhashable input
+                ret = None
+                key = None
+            if ret is not None:
+                value = ret
+            else:
+                value, valid = self._convertCombined(
+                    value,
+                    tzinfo,
+                    plan,
+                    output
+                )
+                if key is not None:
+                    cache.set(key, value, valid)
+        if output == DATETIME64:
+            import numpy
+            return numpy.datetime64(value, 'm')
+        return value
+
+    def convert_many(self, dates, times=None, tzinfo=None, locale='iso',
+                     onerror=None, workers=None, chunksize=10000,
+                     output=DATETIME):
+        self._checkOutput(output)
+        if locale == INFER:
+            locale, dates = self._infer(dates)
+        if workers is not None and workers > 1 and not self.extended \
+                and self.instrument is None:
+            from bda.intellidatetime import parallel
+            return parallel.convert_many(
+                self,
+                dates,
+                times,
+                tzinfo=tzinfo,
+                locale=locale,
+                onerror=onerror,
+                workers=workers,
+                chunksize=chunksize,
+                output=output
+            )
+        if output != DATETIME:
+            return self._convertManyCompact(
+                dates,
+                times,
+                tzinfo,
+                locale,
+                onerror,
+                output
+            )
+        as_array = isarray(dates)
+        if as_array:
+            # numpy string scalars are no ``str`` instances
+            dates = dates.tolist()
+        if times is None:
+            times = itertools.repeat(None)
+        elif isarray(times):
+            times = times.tolist()
+        # locale dependent setup and fetching the current datetime is done
+        # once per batch
+        plan = self._plan(locale)
+        ret = list()
+        with self.reference():
+            if not tzinfo and self._native(plan):
+                ret = native.convert_many(
+                    dates,
+                    times,
+                    plan.params,
+                    self._now,
+                    onerror,
+                    lambda date, time: self._convertParsed(
+                        date,
+                        time,
+                        None,
+                        plan
+                    )
+                )
+            else:
+                for index, (date, time) in enumerate(zip(dates, times)):
+                    try:
+                        dt = self._convertPlanned(date, time, tzinfo, plan)
+                    except DateTimeConversionError as e:
+                        if onerror is not None:
+                            onerror(index, e)
+                        dt = None
+                    ret.append(dt)
+        if as_array:
+            return self._datetime64(ret)
+        return ret
+
+    def format_datetime(self, value, locale='iso', time=False,
+                        packed=False, short=False, separator=None):
+        return self._template(locale, time, packed, short, separator).render(
+            value
+        )
+
+    def format_datetimes(self, values, locale='iso', time=False,
+                         packed=False, short=False, separator=None,
+                         onerror=None):
+        if isarray(values):
+            if values.dtype.kind == 'M':
+                # ``tolist`` returns integers for units below microseconds
+                values = values.astype('datetime64[us]')
+            values = values.tolist()
+        elif not isinstance(values, (list, tuple)):
+            values = list(values)
+        render = self._template(locale, time, packed, short, separator).render
+        try:
+            return [
+                render(value) if value is not None else None
+                for value in values
+            ]
+        except DateTimeConversionError:
+            if onerror is None:
+                raise
+        ret = list()
+        for index, value in enumerate(values):
+            try:
+                ret.append(render(value) if value is not None else None)
+            except DateTimeConversionError as e:
+                onerror(index, e)
+                ret.append(None)
+        return ret
+
+    def validate(self, date, time=None, tzinfo=None, locale='iso'):
+        result = self._validate(date, time, tzinfo, self._plan(locale))
+        if result.code is None:
+            result._defs = None
+        return result
+
+    def try_convert(self, date, time=None, tzinfo=None, locale='iso',
+                    output=DATETIME):
+        self._checkOutput(output)
+        result = self._validate(date, time, tzinfo, self._plan(locale))
+        if result.code is not None:
+            return result
+        defs = result._defs
+        result._defs = None
+        if output == DATETIME:
+            result.value = self._datetime(defs, tzinfo)
+        else:
+            result.value = self._encode(defs, tzinfo, output)
+            if output == DATETIME64:
+                import numpy
+                result.value = numpy.datetime64(result.value, 'm')
+        return result
+
+    def _validate(self, date, time, tzinfo, plan):
+        # checks input like ``_convertPlanned`` would parse it and returns a
+        # ``ConversionResult`` holding the parsed values if valid. Nothing is
+        # raised and no datetime is created
+        if not date or not type(date) in VALUE_TYPES:
+            return ConversionResult(code=EMPTY)
+        parts = self._splitChecked(date)
+        if parts is None:
+            return ConversionResult(code=NUMERIC_LENGTH)
+        if type(parts) is list and not 0 < len(parts) < 4:
+            return ConversionResult(code=DATE_PARTS)
+        defs = self._mapDate(parts, plan)[0]
+        if not time or not type(time) in VALUE_TYPES:
+            defs += [0, 0]
+        elif plan.grammar is not None:
+            timedefs, code = plan.grammar.scan(time)
+            if code is not None:
+                return ConversionResult(code=code)
+            defs += timedefs
+        else:
+            parts = self._splitChecked(time)
+            if parts is None:
+                return ConversionResult(code=NUMERIC_LENGTH)
+            if type(parts) is not list or len(parts) not in [1, 2]:
+                return ConversionResult(code=TIME_PARTS)
+            defs += self._mapTime(parts, plan)
+        year, month, day, hour, minute = defs[:5]
+        # checked in the order of ``datetime``
+        if not 1 <= year <= 9999:
+            return ConversionResult(code=YEAR_RANGE, defs=defs)
+        if not 1 <= month <= 12:
+            return ConversionResult(code=MONTH_RANGE, defs=defs)
+        length = DAYS_IN_MONTH[month]
+        if month == 2 and not isleap(year):
+            length -= 1
+        if not 1 <= day <= length:
+            return ConversionResult(code=DAY_RANGE, defs=defs)
+        if not 0 <= hour < 24:
+            return ConversionResult(code=HOUR_RANGE, defs=defs)
+        if not 0 <= minute < 60:
+            return ConversionResult(code=MINUTE_RANGE, defs=defs)
+        if len(defs) > 5:
+            if not 0 <= defs[5] < 60:
+                return ConversionResult(code=SECOND_RANGE, defs=defs)
+            if defs[7] is not None:
+                # given UTC offset, no wall time
+                return ConversionResult(defs=defs)
+        localizer = self.localizer
+        if tzinfo and (localizer.gap == RAISE or localizer.fold == RAISE):
+            seconds = (ordinal(year, month, day) - EPOCH_ORDINAL) * 86400 \
+                + hour * 3600 + minute * 60
+            try:
+                localizer.wall_offset(year, seconds, tzinfo)
+            except DateTimeConversionError as e:
+                return ConversionResult(code=WALL_TIME, message=str(e))
+        return ConversionResult(defs=defs)
+
+    def _splitChecked(self, value):
+        # ``_splitValue`` returning None instead of raising for numeric
+        # values of unparseable length
+        if type(value) in STRING_TYPES:
+            value = value.strip()
+            if NUMERIC.match(value) is None:
+                return [int(p) for p in DIGITS.findall(value)]
+            if len(value) not in NUMERIC_LENGTHS:
+                return None
+        else:
+            stripped = bytes(value).strip()
+            if NUMERIC_BYTES.match(stripped) is not None \
+                    and len(stripped) not in NUMERIC_LENGTHS:
+                return None
+        return self._splitValue(value)
+
+    def _infer(self, dates):
+        # returns the inferred date pattern and the dates including the ones
+        # consumed by inference
+        from bda.intellidatetime.infer import PatternInference
+        from bda.intellidatetime.infer import prefetch
+        inference = PatternInference(self)
+        if isarray(dates):
+            inference.feed_many(dates[:inference.sample].tolist())
+        elif isinstance(dates, (list, tuple)):
+            inference.feed_many(dates)
+        else:
+            dates = prefetch(dates, inference)
+        return inference.pattern, dates
+
+    def _convertManyCompact(self, dates, times, tzinfo, locale, onerror,
+                            output):
+        as_array = isarray(dates)
+        if as_array:
+            dates = dates.tolist()
+        elif not hasattr(dates, '__len__'):
+            dates = list(dates)
+        if times is None:
+            times = itertools.repeat(None)
+        elif isarray(times):
+            times = times.tolist()
+        plan = self._plan(locale)
+        ret = array('q', [NAT]) * len(dates)
+        with self.reference():
+            for index, (date, time) in enumerate(zip(dates, times)):
+                try:
+                    ret[index] = self._convertCompact(
+                        date,
+                        time,
+                        tzinfo,
+                        plan,
+                        output
+                    )
+                except DateTimeConversionError as e:
+                    if onerror is not None:
+                        onerror(index, e)
+        return self._compactResult(ret, as_array, output)
+
+    def _compactResult(self, values, as_array, output):
+        # wrap ``array('q')`` batch results into numpy arrays without copying
+        if output == DATETIME64:
+            import numpy
+            return numpy.frombuffer(values, dtype='int64').view(
+                'datetime64[m]'
+            )
+        if as_array:
+            import numpy
+            return numpy.frombuffer(values, dtype='int64')
+        return values
+
+    def _checkOutput(self, output):
+        if output not in OUTPUTS:
+            raise ValueError('Unknown output {!r}, expected one of {}'.format(
+                output,
+                ', '.join(OUTPUTS)
+            ))
+
+    def _native(self, plan):
+        # whether the compiled accelerator converts with plan
+        return plan.params is not None and self.cache is None \
+            and self.instrument is None and self.tables is None
+
+    def _convertPlanned(self, date, time, tzinfo, plan):
+        cache = self.cache
+        if cache is None:
+            if self.instrument is None:
+                if plan.params is not None and self.tables is None:
+                    dt = native.convert(date, time, plan.params, self._now)
+                    if dt is not NotImplemented:
+                        if tzinfo:
+                            dt = self._attach(dt, tzinfo)
+                        return dt
+                return self._convertParsed(date, time, tzinfo, plan)
+            return self._convertResolved(date, time, tzinfo, plan)[0]
+        # the plan is part of the key, changed locale patterns never hit
+        key = (date, time, tzinfo, plan)
+        try:
+            dt = cache.get(key, self._now)
+        except TypeError:
+            # unhashable input
+            return self._convertResolved(date, time, tzinfo, plan)[0]
+        if dt is not None:
+            return dt
+        dt, valid = self._convertResolved(date, time, tzinfo, plan)
+        cache.set(key, dt, valid)
+        return dt
+
+    def _convertParsed(self, date, time, tzinfo, plan):
+        datedefs = self._parsePlannedDate(date, plan)
+        timedefs = self._parsePlannedTime(time, plan)
+        return self._datetime(datedefs + timedefs, tzinfo)
+
+    def _convertResolved(self, date, time, tzinfo, plan):
+        # returns the datetime and the stamp of the current date it was
+        # resolved against
+        if self.instrument is not None:
+            return self._convertInstrumented(date, time, tzinfo, plan)
+        datedefs, valid = self._resolveDate(date, plan)
+        timedefs = self._parsePlannedTime(time, plan)
+        return self._datetime(datedefs + timedefs, tzinfo), valid
+
+    def _convertCompact(self, date, time, tzinfo, plan, output):
+        cache = self.cache
+        if cache is None:
+            if self.instrument is None:
+                if plan.params is not None and self.tables is None:
+                    defs = native.parse(date, time, plan.params, self._now)
+                    if defs is not NotImplemented:
+                        return self._encode(defs, tzinfo, output)
+                datedefs = self._parsePlannedDate(date, plan)
+                timedefs = self._parsePlannedTime(time, plan)
+                return self._encode(datedefs + timedefs, tzinfo, output)
+            return self._compactResolved(date, time, tzinfo, plan, output)[0]
+        key = (date, time, tzinfo, plan, output)
+        try:
+            value = cache.get(key, self._now)
+        except TypeError:
+            # unhashable input
+            return self._compactResolved(date, time, tzinfo, plan, output)[0]
+        if value is not None:
+            return value
+        value, valid = self._compactResolved(date, time, tzinfo, plan, output)
+        cache.set(key, value, valid)
+        return value
+
+    def _compactResolved(self, date, time, tzinfo, plan, output):
+        if self.instrument is not None:
+            dt, valid = self._convertInstrumented(date, time, tzinfo, plan)
+            return self._encodeDatetime(dt, output), valid
+        datedefs, valid = self._resolveDate(date, plan)
+        timedefs = self._parsePlannedTime(time, plan)
+        return self._encode(datedefs + timedefs, tzinfo, output), valid
+
+    def _convertCombined(self, value, tzinfo, plan, output):
+        defs, valid = self._resolveCombined(value, plan)
+        if output == DATETIME:
+            return self._datetime(defs, tzinfo), valid
+        return self._encode(defs, tzinfo, output), valid
+
+    def _resolveCombined(self, value, plan):
+        # returns the datetime defs of a combined date and time value and the
+        # stamp of the current date they were resolved against. The value is
+        # tokenized once, the first three numbers are the date unless it is
+        # given packed
+        if not value or not type(value) in VALUE_TYPES:
+            raise DateTimeConversionError(u"Invalid date input.")
+        if type(value) in STRING_TYPES:
+            digits = DIGITS
+            numeric = NUMERIC
+        else:
+            if type(value) is not bytes:
+                value = bytes(value)
+            digits = DIGITS_BYTES
+            numeric = NUMERIC_BYTES
+        stripped = value.strip()
+        if numeric.match(stripped) is not None:
+            size = len(stripped)
+            if size == 12 or (size == 14 and plan.grammar is not None):
+                datedefs, valid = self._mapDate(int(stripped[:8]), plan)
+                return datedefs + self._parsePlannedTime(
+                    stripped[8:],
+                    plan
+                ), valid
+            datedefs, valid = self._mapDate(self._splitValue(stripped), plan)
+            return datedefs + [0, 0], valid
+        if plan.grammar is not None:
+            return self._resolveCombinedExtended(value, plan, digits)
+        parts = digits.findall(value)
+        if parts and len(parts[0]) in [6, 8]:
+            # packed date
+            datedefs, valid = self._mapDate(self._splitValue(parts[0]), plan)
+            parts = parts[1:]
+        else:
+            datedefs, valid = self._mapDate(
+                [int(part) for part in parts[:3]],
+                plan
+            )
+            parts = parts[3:]
+        if not parts:
+            return datedefs + [0, 0], valid
+        if len(parts) == 1:
+            return datedefs + self._mapTime(
+                self._splitValue(parts[0]),
+                plan
+            ), valid
+        return datedefs + self._mapTime(
+            [int(part) for part in parts],
+            plan
+        ), valid
+
+    def _resolveCombinedExtended(self, value, plan, digits):
+        # the time is parsed from the remainder by the grammar
+        parts = list(digits.finditer(value))
+        if parts and parts[0].end() - parts[0].start() in [6, 8]:
+            date = self._splitValue(parts[0].group())
+            parts = parts[1:]
+        else:
+            date = [int(part.group()) for part in parts[:3]]
+            parts = parts[3:]
+        datedefs, valid = self._mapDate(date, plan)
+        if not parts:
+            return datedefs + [0, 0], valid
+        return datedefs + plan.grammar.parse(
+            value[parts[0].start():]
+        ), valid
+
+    def _encode(self, datetimedefs, tzinfo, output, offset=0):
+        # integer representation of parsed values without creating a
+        # datetime. Output ``datetime64`` is encoded as epoch minutes
+        if len(datetimedefs) != 5:
+            # extended grammar
+            return self._encodeDatetime(
+                self._datetime(datetimedefs, tzinfo),
+                output
+            )
+        year, month, day, hour, minute = datetimedefs
         try:
-            dt = datetime(*datetimedefs, **kwargs)
-        except ValueError as e:
+            start, length = MONTHS[year, month]
+        except KeyError:
+            start, length = month_range(year, month)
+        if not (0 < day <= length and 0 <= hour < 24 and 0 <= minute < 60):
+            # raises with the message of ``datetime``
+            self._datetime(datetimedefs, None)
+        if output == ORDINAL:
+            return EPOCH_ORDINAL + start + day
+        seconds = (start + day) * 86400 + hour * 3600 + minute * 60
+        if tzinfo:
+            offset = self.localizer.wall_offset(year, seconds, tzinfo)
+        if output == EPOCH_SECONDS:
+            return seconds - offset
+        return (seconds - offset) // 60
+
+    def _encodeDatetime(self, dt, output):
+        # ``_encode`` of a datetime
+        days = dt.toordinal()
+        if output == ORDINAL:
+            return days
+        seconds = (days - EPOCH_ORDINAL) * 86400 + dt.hour * 3600 \
+            + dt.minute * 60 + dt.second
+        offset = dt.utcoffset()
+        if offset is not None:
+            seconds -= offset.days * 86400 + offset.seconds
+        if output == EPOCH_SECONDS:
+            return seconds
+        return seconds // 60
+
+    def _convertInstrumented(self, date, time, tzinfo, plan):
+        instrument = self.instrument
+        timer = instrument.timer
+        instrument.count('calls')
+        try:
+            start = timer()
+            if not date or not type(date) in VALUE_TYPES:
+                raise DateTimeConversionError(u"Invalid date input.")
+            parts = self._splitValue(date)
+            split = timer()
+            instrument.timing('split', split - start)
+            instrument.count('date.' + self._shape(date, parts))
+            datedefs, valid = self._mapDate(parts, plan)
+            instrument.timing('date_map', timer() - split)
+            if valid is not None:
+                instrument.count('now.' + valid[0])
+            if not time or not type(time) in VALUE_TYPES:
+                timedefs = [0, 0]
+            elif plan.grammar is not None:
+                start = timer()
+                timedefs = plan.grammar.parse(time)
+                instrument.count('time.grammar')
+                instrument.timing('time_map', timer() - start)
+            else:
+                start = timer()
+                parts = self._splitValue(time)
+                split = timer()
+                instrument.timing('split', split - start)
+                instrument.count('time.' + self._shape(time, parts))
+                timedefs = self._mapTime(parts, plan)
+                instrument.timing('time_map', timer() - split)
+            start = timer()
+            try:
+                dt = datetime(*(datedefs + timedefs))
+            except (ValueError, OverflowError) as e:
+                raise DateTimeConversionError(e)
+            constructed = timer()
+            instrument.timing('datetime', constructed - start)
+            if tzinfo:
+                dt = self._attach(dt, tzinfo)
+                instrument.timing('tz', timer() - constructed)
+        except DateTimeConversionError as e:
+            instrument.error(str(e))
+            raise
+        return dt, valid
+
+    def _shape(self, value, parts):
+        if type(value) in STRING_TYPES:
+            value = value.strip()
+            numeric = NUMERIC.match(value) is not None
+        else:
+            value = bytes(value).strip()
+            numeric = NUMERIC_BYTES.match(value) is not None
+        if numeric:
+            return 'numeric.%i' % len(value)
+        return 'parts.%i' % len(parts)
+
+    def _plan(self, locale):
+        # plans are keyed by the patterns and not by the locale, thus
+        # registered patterns never hit a stale plan
+        return self._patternPlan(
+            self.pattern.date(locale),
+            self.pattern.time(locale)
+        )
+
+    def _patternPlan(self, datepattern, timepattern):
+        key = (datepattern, timepattern)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = self._compilePlan(*key)
+        return plan
+
+    def _template(self, locale, time, packed, short, separator):
+        # templates are keyed by the patterns like plans
+        key = (
+            self.pattern.date(locale),
+            self.pattern.time(locale),
+            time,
+            packed,
+            short,
+            separator
+        )
+        template = self._templates.get(key)
+        if template is None:
+            from bda.intellidatetime.formatter import Template
+            template = self._templates[key] = Template(*key)
+        return template
+
+    def _compilePlan(self, datepattern, timepattern):
+        datemap = self._dateMap(datepattern)
+        timemap = self._timeMap(timepattern)
+        return ParsePlan(
+            datemap,
+            self._dateSlices(datemap),
+            timemap,
+            TimeGrammar(timemap) if self.extended else None
+        )
+
+    def _datetime(self, datetimedefs, tzinfo):
+        try:
+            dt = datetime(*datetimedefs)
+        except (ValueError, OverflowError) as e:
             raise DateTimeConversionError(e)
         if tzinfo:
-            # set to normalized tz (in case of DST), keep input in tz and DST
-            # aware time -> dont add one hour
-            dt = dt.replace(tzinfo=tzinfo.normalize(dt).tzinfo)
+            dt = self._attach(dt, tzinfo)
         return dt
 
+    def _attach(self, dt, tzinfo):
+        if dt.tzinfo is not None:
+            # UTC offset given by input
+            return dt.astimezone(tzinfo)
+        return self._localize(dt, tzinfo)
+
+    def _localize(self, dt, tzinfo):
+        # keep input as wall time in tz, DST aware -> dont add one hour
+        return self.localizer.localize(dt, tzinfo)
+
+    def _datetime64(self, values):
+        import numpy
+        # datetime64 is timezone naive, aware values are stored as UTC
+        for i, dt in enumerate(values):
+            if dt is not None and dt.tzinfo is not None:
+                values[i] = (dt - dt.utcoffset()).replace(tzinfo=None)
+        return numpy.array(values, dtype='datetime64[m]')
+
     def _parseDate(self, date, locale):
-        if not date or not type(date) in STRING_TYPES:
+        return self._parsePlannedDate(date, self._plan(locale))
+
+    def _parsePlannedDate(self, date, plan):
+        return self._resolveDate(date, plan)[0]
+
+    def _resolveDate(self, date, plan):
+        # returns the date defs and the stamp of the current date they were
+        # resolved against or None if the date was given absolute
+        if not date or not type(date) in VALUE_TYPES:
             raise DateTimeConversionError(u"Invalid date input.")
-        date = self._splitValue(date)
-        pattern = self.pattern.date(locale)
-        map = self._dateMap(pattern)
+        tables = self.tables
+        if tables is not None and type(date) in STRING_TYPES:
+            ret = tables.date(date, plan, self._now)
+            if ret is not None:
+                return ret
+        return self._mapDate(self._splitValue(date), plan)
+
+    def _mapDate(self, date, plan):
         if type(date) in STRING_TYPES:
-            return self._splitDate(date, map)
+            (ys, ye), (ms, me), (ds, de) = plan.slices
+            return [
+                int(date[ys:ye]),
+                int(date[ms:me]),
+                int(date[ds:de])
+            ], None
+        if type(date) is int:
+            # eight digits parsed from a buffer
+            return [
+                date // 10 ** (8 - end) % 10 ** (end - start)
+                for start, end in plan.slices
+            ], None
         if len(date) == 1:
-            dt = datetime.now()
-            return [dt.year, dt.month, date[0]]
+            dt = self._now()
+            return [dt.year, dt.month, date[0]], stamp(MONTH, dt)
         if len(date) == 2:
-            dt = datetime.now()
-            if map[1] == 1 and map[2] == 0:
-                return [dt.year, date[1], date[0]]
-            else:
-                return [dt.year, date[0], date[1]]
+            dt = self._now()
+            valid = stamp(YEAR, dt)
+            if plan.daymonth:
+                return [dt.year, date[1], date[0]], valid
+            return [dt.year, date[0], date[1]], valid
         if len(date) == 3:
-            year = str(date[map[0]])
+            year = str(date[plan.year])
             if len(year) in [3, 4]:
-                return [int(year), date[map[1]], date[map[2]]]
+                return [int(year), date[plan.month], date[plan.day]], None
             if len(year) == 1:
                 year = '0%s' % year
-            dt = datetime.now()
+            dt = self._now()
             year = int('%s%s' % (str(dt.year)[:2], year))
-            return [year, date[map[1]], date[map[2]]]
+            return [
+                year,
+                date[plan.month],
+                date[plan.day]
+            ], stamp(CENTURY, dt)
         raise DateTimeConversionError(u"Invalid number of parts for date.")
 
     def _parseTime(self, time, locale):
-        if not time or not type(time) in STRING_TYPES:
+        if not time or not type(time) in VALUE_TYPES:
             return [0, 0]
-        time = self._splitValue(time)
-        if len(time) not in [1, 2]:
+        return self._parsePlannedTime(time, self._plan(locale))
+
+    def _parsePlannedTime(self, time, plan):
+        if not time or not type(time) in VALUE_TYPES:
+            return [0, 0]
+        if plan.grammar is not None:
+            return plan.grammar.parse(time)
+        tables = self.tables
+        if tables is not None and type(time) in STRING_TYPES:
+            timedefs = tables.time(time, plan)
+            if timedefs is not None:
+                return timedefs
+        return self._mapTime(self._splitValue(time), plan)
+
+    def _mapTime(self, time, plan):
+        if type(time) is not list or len(time) not in [1, 2]:
             raise DateTimeConversionError(u"Invalid number of parts for time.")
-        pattern = self.pattern.time(locale)
-        map = self._timeMap(pattern)
         if len(time) == 1:
             return [time[0], 0]
-        ret = [0, 0]
-        for i in range(2):
-            ret[i] = time[map[i]]
-        return ret
+        return [time[plan.hour], time[plan.minute]]
 
     def _dateMap(self, pattern):
         pattern = pattern.split(' ')
@@ -146,6 +1095,9 @@ class IntelliDateTime(object):
         return [1, 0]
 
     def _splitDate(self, date, map):
+        return [int(date[start:end]) for start, end in self._dateSlices(map)]
+
+    def _dateSlices(self, map):
         ret = list()
         for i in range(3):
             if i == 0 and map[0] > 1:
@@ -160,16 +1112,18 @@ class IntelliDateTime(object):
             else:
                 start = map[i] * 2
                 end = start + 2
-            ret.append(int(date[start:end]))
+            ret.append((start, end))
         return ret
 
     def _splitValue(self, value):
         if not value or not type(value) in STRING_TYPES:
+            if value and type(value) in BUFFER_TYPES:
+                return self._splitBuffer(value)
             raise DateTimeConversionError(
                 u"Empty value or unknown value type."
             )
         value = value.strip()
-        if self._isNumeric(value):
+        if NUMERIC.match(value) is not None:
             vl = len(value)
             if vl in [1, 2]:
                 return [int(value)]  # case D or H
@@ -182,19 +1136,54 @@ class IntelliDateTime(object):
             raise DateTimeConversionError(
                 u"Numeric value given, but not parseable."
             )
-        parts = list()
-        pointer = 0
-        for i in range(len(value)):
-            if not self._isNumeric(value[i]):
-                parts.append(value[pointer:i])
-                pointer = i + 1
-        parts.append(value[pointer:])
-        return [int(p) for p in parts if self._isNumeric(p.strip())]
+        # any non numeric character is a limiter
+        return [int(p) for p in DIGITS.findall(value)]
+
+    def _splitBuffer(self, value, start=0, end=None):
+        # ``_splitValue`` for ASCII encoded bytes in ``value[start:end]``.
+        # Numbers are parsed from memoryview slices, thus the buffer is
+        # neither copied nor decoded. Eight digit values are returned as
+        # integer
+        if type(value) is not memoryview:
+            value = memoryview(value)
+        if end is None:
+            end = len(value)
+        while start < end and value[start] in WHITESPACE:
+            start += 1
+        while end > start and value[end - 1] in WHITESPACE:
+            end -= 1
+        if NUMERIC_BYTES.match(value, start, end) is not None:
+            vl = end - start
+            number = int(value[start:end])
+            if vl in [1, 2]:
+                return [number]
+            elif vl == 4:
+                return [number // 100, number % 100]
+            elif vl == 6:
+                return [number // 10000, number // 100 % 100, number % 100]
+            elif vl == 8:
+                return number
+            raise DateTimeConversionError(
+                u"Numeric value given, but not parseable."
+            )
+        return [
+            int(value[match.start():match.end()])
+            for match in DIGITS_BYTES.finditer(value, start, end)
+        ]
 
     def _isNumeric(self, value):
         if not value or not type(value) in STRING_TYPES:
+            if value and type(value) in BUFFER_TYPES:
+                return NUMERIC_BYTES.match(value) is not None
             return False
-        for c in value:
-            if c not in self._numbers:
-                return False
-        return True
+        return NUMERIC.match(value) is not None
+
+
+# the converter used by the module level functions
+shared = IntelliDateTime()
+
+if 'zope.interface' in sys.modules:  # pragma: no cover
+    # zope.interface is in use, declare the interfaces right away thus
+    # ``providedBy`` does not depend on import order. Otherwise they are
+    # declared when ``interfaces`` is imported
+    import bda.intellidatetime.interfaces  # noqa
@@ -0,0 +1,28 @@
+class DateTimeConversionError(Exception):
+    pass
+
+
+# error codes of ``IntelliDateTime.validate`` and ``try_convert``
+EMPTY = 'empty'
+NUMERIC_LENGTH = 'numeric_length'
+DATE_PARTS = 'date_parts'
+TIME_PARTS = 'time_parts'
+YEAR_RANGE = 'year_range'
+MONTH_RANGE = 'month_range'
+DAY_RANGE = 'day_range'
+HOUR_RANGE = 'hour_range'
+MINUTE_RANGE = 'minute_range'
+SECOND_RANGE = 'second_range'
+TIME_SYNTAX = 'time_syntax'
+OFFSET_RANGE = 'offset_range'
+WALL_TIME = 'wall_time'
+
+# messages of codes, range messages are the ones of ``datetime``
+MESSAGES = {
+    EMPTY: u"Invalid date input.",
+    NUMERIC_LENGTH: u"Numeric value given, but not parseable.",
+    DATE_PARTS: u"Invalid number of parts for date.",
+    TIME_PARTS: u"Invalid number of parts for time.",
+    TIME_SYNTAX: u"Invalid time input.",
+    OFFSET_RANGE: u"Invalid UTC offset.",
+}
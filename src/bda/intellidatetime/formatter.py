@@ -0,0 +1,101 @@
+"""Formatting of datetimes to the input forms of a locale.
+
+Templates are compiled per date pattern, time pattern and form. Fields are
+rendered by lookups in tables of zero padded digits, thus formatting neither
+calls ``strftime`` nor formats integers.
+"""
+from bda.intellidatetime.errors import DateTimeConversionError
+from operator import attrgetter
+
+
+# separators of date patterns, ``.`` for any other order
+SEPARATORS = {
+    'Y M D': '-',
+    'D M Y': '.',
+    'M D Y': '/',
+}
+DEFAULT_SEPARATOR = '.'
+
+# zero padded digits by value
+PAD2 = tuple('%02d' % value for value in range(100))
+PAD4 = tuple('%04d' % value for value in range(10000))
+# two digit years by year
+SHORT = tuple(PAD2[year % 100] for year in range(10000))
+# years of unpacked dates. Years before 100 are missing, they would be read
+# back as two digit years
+YEARS = dict((year, PAD4[year]) for year in range(100, 10000))
+
+YEAR_MESSAGE = u"Years before 100 are formatted packed only."
+
+DATE_FIELDS = {'y': 'year', 'm': 'month', 'd': 'day'}
+TIME_FIELDS = {'h': 'hour', 'm': 'minute'}
+
+
+class Template(object):
+    """Compiled form of a date and a time pattern.
+
+    Dates are rendered like ``03.04.2008`` or packed like ``03042008``,
+    times are appended like ``03.04.2008 10:30``. Years before 100 are
+    rendered packed only.
+    """
+
+    def __init__(self, datepattern, timepattern, time=False, packed=False,
+                 short=False, separator=None):
+        """@param datepattern - the date pattern like ``D M Y``
+        @param timepattern - the time pattern like ``H M``
+        @param time - whether to append the time
+        @param packed - render the date without separators
+        @param short - render two digit years
+        @param separator - separator of date fields, defaults to the one of
+                           the date pattern in ``SEPARATORS``
+        """
+        if separator is None:
+            separator = SEPARATORS.get(datepattern, DEFAULT_SEPARATOR)
+        if packed:
+            separator = ''
+        fields = [DATE_FIELDS[field.lower()] for field in datepattern.split()]
+        if short:
+            year = SHORT
+        elif packed:
+            year = PAD4
+        else:
+            year = YEARS
+        tables = [year if field == 'year' else PAD2 for field in fields]
+        self.template = separator.join(['%s'] * 3)
+        if time:
+            fields += [
+                TIME_FIELDS[field.lower()] for field in timepattern.split()
+            ]
+            tables += [PAD2, PAD2]
+            self.template += ' %s:%s'
+            self.render = self._renderDatetime
+        else:
+            self.render = self._renderDate
+        self.fields = attrgetter(*fields)
+        self.tables = tuple(tables)
+
+    def _renderDate(self, value):
+        first, second, third = self.tables
+        try:
+            a, b, c = self.fields(value)
+            return self.template % (first[a], second[b], third[c])
+        except KeyError:
+            raise DateTimeConversionError(YEAR_MESSAGE)
+        except (AttributeError, TypeError, IndexError):
+            raise DateTimeConversionError(u"Invalid datetime input.")
+
+    def _renderDatetime(self, value):
+        first, second, third, fourth, fifth = self.tables
+        try:
+            a, b, c, d, e = self.fields(value)
+            return self.template % (
+                first[a],
+                second[b],
+                third[c],
+                fourth[d],
+                fifth[e]
+            )
+        except KeyError:
+            raise DateTimeConversionError(YEAR_MESSAGE)
+        except (AttributeError, TypeError, IndexError):
+            raise DateTimeConversionError(u"Invalid datetime input.")
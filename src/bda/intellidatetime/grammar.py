@@ -0,0 +1,198 @@
+"""Extended time grammar.
+
+Accepts hour, minute and second, fractional seconds, meridiem markers and
+trailing UTC offsets, e.g. ``14:05:30.123+02:00``, ``2:30 pm`` or
+``143000Z``. Input is tokenized in a single pass of a regular expression
+with disjoint alternatives, thus without backtracking. Tokens are
+classified by table lookups.
+"""
+from bda.intellidatetime.errors import DateTimeConversionError
+from bda.intellidatetime.errors import MESSAGES
+from bda.intellidatetime.errors import NUMERIC_LENGTH
+from bda.intellidatetime.errors import OFFSET_RANGE
+from bda.intellidatetime.errors import TIME_PARTS
+from bda.intellidatetime.errors import TIME_SYNTAX
+from datetime import timedelta
+from datetime import timezone
+import re
+
+
+# numbers, words, signs and decimal points. Any other character is a
+# delimiter and skipped by the scanner
+TOKENS = re.compile(r'([0-9]+)|([a-z][a-z.]*)|([+-])|([.,])', re.I)
+
+# words with meaning
+AM = 'am'
+PM = 'pm'
+UTC = 'utc'
+WORDS = {
+    'am': AM, 'a.m.': AM, 'a.m': AM,
+    'pm': PM, 'p.m.': PM, 'p.m': PM,
+    'z': UTC, 'utc': UTC, 'gmt': UTC,
+}
+# words used as delimiters like ``h`` in ``14h30``. Any other word, e.g. a
+# timezone abbreviation like ``CET``, is a syntax error
+DELIMITERS = frozenset(['h', 't', 'uhr'])
+
+# packed numeric times by length
+PACKED = {
+    1: (slice(0, 1),),
+    2: (slice(0, 2),),
+    4: (slice(0, 2), slice(2, 4)),
+    6: (slice(0, 2), slice(2, 4), slice(4, 6)),
+}
+
+# offset seconds -> ``timezone``
+ZONES = {0: timezone.utc}
+
+
+def zone(seconds):
+    """Return the fixed offset ``timezone`` of given UTC offset seconds.
+    """
+    ret = ZONES.get(seconds)
+    if ret is None:
+        ret = ZONES[seconds] = timezone(timedelta(seconds=seconds))
+    return ret
+
+
+class TimeGrammar(object):
+    """Time grammar of a time pattern.
+
+    Parsed times are ``[hour, minute, second, microsecond, tzinfo]``, where
+    tzinfo is a fixed offset ``timezone`` or None. The time pattern defines
+    the order of hour and minute, seconds always follow.
+
+    Offsets require hour and minute, thus ``10-30`` is ``10:30`` as with the
+    regular grammar.
+    """
+
+    def __init__(self, timemap):
+        """@param timemap - position of hour and minute, see
+                            ``IntelliDateTime._timeMap``
+        """
+        self.hour, self.minute = timemap
+
+    def parse(self, value):
+        """Return the parsed time.
+
+        @param value - the time string or ASCII encoded buffer
+        @raise DateTimeConversionError - if value is not parseable
+        """
+        defs, code = self.scan(value)
+        if code is not None:
+            raise DateTimeConversionError(MESSAGES[code])
+        return defs
+
+    def scan(self, value):
+        """Return ``(parsed time, None)`` or ``(None, error code)``.
+        """
+        if type(value) in (bytes, bytearray, memoryview):
+            value = bytes(value).decode('ascii', 'replace')
+        numbers = list()
+        fraction = None
+        point = False
+        meridiem = None
+        utc = False
+        sign = None
+        offset = list()
+        # point delimiting hour and minute, a differing point following the
+        # minute starts a fraction of minutes, which is not supported
+        separator = None
+        minutepoint = False
+        for token, word, plusminus, decimal in TOKENS.findall(value):
+            if token:
+                if sign is not None:
+                    offset.append(token)
+                elif utc or meridiem is not None or fraction is not None \
+                        or minutepoint:
+                    return None, TIME_SYNTAX
+                elif point:
+                    fraction = token
+                elif not numbers:
+                    slices = PACKED.get(len(token))
+                    if slices is not None:
+                        numbers = [int(token[part]) for part in slices]
+                    elif value.strip() == token:
+                        return None, NUMERIC_LENGTH
+                    else:
+                        numbers = [int(token)]
+                elif len(numbers) < 3:
+                    numbers.append(int(token))
+                else:
+                    return None, TIME_PARTS
+            elif word:
+                word = word.lower()
+                if word in DELIMITERS:
+                    continue
+                word = WORDS.get(word)
+                if word is None:
+                    return None, TIME_SYNTAX
+                if word is UTC:
+                    if utc or sign is not None:
+                        return None, TIME_SYNTAX
+                    utc = True
+                elif meridiem is not None or utc or sign is not None:
+                    return None, TIME_SYNTAX
+                else:
+                    meridiem = word
+            elif plusminus:
+                if len(numbers) < 2 and meridiem is None and not utc:
+                    # delimiter
+                    continue
+                if sign is not None:
+                    return None, TIME_SYNTAX
+                sign = 1 if plusminus == '+' else -1
+            elif sign is not None or point:
+                continue
+            elif len(numbers) == 3:
+                # decimal point of seconds
+                point = True
+            elif len(numbers) == 1:
+                separator = decimal
+            elif len(numbers) == 2 and decimal != separator:
+                minutepoint = True
+        if not numbers:
+            return None, TIME_PARTS
+        if point and fraction is None:
+            return None, TIME_SYNTAX
+        if len(numbers) == 1:
+            numbers.append(0)
+        hour = numbers[self.hour]
+        minute = numbers[self.minute]
+        if meridiem is not None:
+            if not 1 <= hour <= 12:
+                return None, TIME_SYNTAX
+            if meridiem is AM:
+                if hour == 12:
+                    hour = 0
+            elif hour != 12:
+                hour += 12
+        tzinfo = None
+        if sign is not None:
+            seconds = self._offset(offset)
+            if seconds is None:
+                return None, OFFSET_RANGE
+            tzinfo = zone(sign * seconds)
+        elif utc:
+            tzinfo = ZONES[0]
+        return [
+            hour,
+            minute,
+            numbers[2] if len(numbers) == 3 else 0,
+            int((fraction + '00000')[:6]) if fraction is not None else 0,
+            tzinfo
+        ], None
+
+    def _offset(self, parts):
+        # offset seconds of ``HH``, ``HHMM`` or ``HH MM`` or None if invalid
+        if not parts:
+            return None
+        if len(parts) == 1 and len(parts[0]) == 4:
+            parts = [parts[0][:2], parts[0][2:]]
+        if len(parts) > 2 or max(len(part) for part in parts) > 2:
+            return None
+        hours = int(parts[0])
+        minutes = int(parts[1]) if len(parts) == 2 else 0
+        if hours > 23 or minutes > 59:
+            return None
+        return hours * 3600 + minutes * 60
@@ -0,0 +1,118 @@
+"""Inference of the date pattern of a column of values.
+
+Values are scored against the date patterns one by one. Inference stops
+as soon as one pattern leads by ``margin`` failed values or after
+``sample`` values, thus it costs a bounded number of rows regardless of the
+input size.
+"""
+from bda.intellidatetime.converter import DATE_PATTERNS
+from bda.intellidatetime.converter import IntelliDateTime
+from bda.intellidatetime.converter import ORDINAL
+from bda.intellidatetime.errors import DateTimeConversionError
+import itertools
+
+
+class PatternInference(object):
+    """Incrementally score date values against date patterns.
+
+    A value counts as failed for a pattern if parsing it with this pattern
+    raises a ``DateTimeConversionError`` or results in an impossible date,
+    e.g. a month greater than 12 or a four digit year at the day position.
+    """
+
+    def __init__(self, converter=None, patterns=DATE_PATTERNS, margin=20,
+                 sample=1000):
+        """@param converter - the ``IntelliDateTime`` instance to use
+        @param patterns - the candidate date patterns. On ties the first
+                          one wins
+        @param margin - number of failed values the leading pattern must be
+                        ahead of every other pattern to stop early
+        @param sample - maximum number of values scored
+        """
+        self.converter = converter if converter is not None \
+            else IntelliDateTime()
+        self.patterns = tuple(patterns)
+        self.margin = margin
+        self.sample = sample
+        self.plans = [
+            self.converter._patternPlan(pattern, 'H M')
+            for pattern in self.patterns
+        ]
+        self.failures = [0] * len(self.patterns)
+        self.rows = 0
+        # values accepted by some but not all patterns
+        self.decisive = 0
+        self.done = False
+
+    @property
+    def pattern(self):
+        """The leading date pattern.
+        """
+        failures = self.failures
+        return self.patterns[failures.index(min(failures))]
+
+    @property
+    def scores(self):
+        """Number of failed values per pattern.
+        """
+        return dict(zip(self.patterns, self.failures))
+
+    def feed(self, date):
+        """Score a date value.
+
+        @param date - a date string
+        @return bool - whether inference is done
+        """
+        if self.done:
+            return True
+        converter = self.converter
+        failures = self.failures
+        failed = 0
+        for index, plan in enumerate(self.plans):
+            try:
+                converter._encode(
+                    converter._resolveDate(date, plan)[0] + [0, 0],
+                    None,
+                    ORDINAL
+                )
+            except DateTimeConversionError:
+                failures[index] += 1
+                failed += 1
+        self.rows += 1
+        if 0 < failed < len(self.plans):
+            self.decisive += 1
+            ranked = sorted(failures)
+            if ranked[1] - ranked[0] >= self.margin:
+                self.done = True
+        if self.rows >= self.sample:
+            self.done = True
+        return self.done
+
+    def feed_many(self, dates):
+        """Score date values until done.
+
+        @param dates - an iterable of date strings
+        @return PatternInference - self
+        """
+        for date in dates:
+            if self.feed(date):
+                break
+        return self
+
+
+def prefetch(rows, inference, value=None):
+    """Feed values of rows to inference until it is done.
+
+    @param rows - an iterable of rows
+    @param inference - a ``PatternInference``
+    @param value - callable returning the date value of a row. If None, the
+                   row is the date value
+    @return iterator - all rows including the ones scored
+    """
+    rows = iter(rows)
+    scored = list()
+    for row in rows:
+        scored.append(row)
+        if inference.feed(row if value is None else value(row)):
+            break
+    return itertools.chain(scored, rows)
@@ -0,0 +1,82 @@
+import threading
+import time
+
+
+class Instrumentation(object):
+    """Collects stage timings, input shape counters and errors of
+    conversions.
+
+    Stages are ``split``, ``date_map``, ``time_map``, ``datetime`` and
+    ``tz``. Counters are ``calls``, the input shapes ``date.numeric.<N>``,
+    ``date.parts.<N>``, ``time.numeric.<N>`` and ``time.parts.<N>`` and the
+    relative date resolutions ``now.month``, ``now.year`` and
+    ``now.century``. Errors are counted by message.
+
+    Events are aggregated in process, see ``stats``, and forwarded to
+    ``sink`` if given.
+    """
+
+    def __init__(self, sink=None, timer=time.perf_counter):
+        """@param sink - optional callable called with kind, which is one of
+                       ``timing``, ``count`` or ``error``, name and value
+                       of each event
+        @param timer - callable returning seconds
+        """
+        self.sink = sink
+        self.timer = timer
+        self._lock = threading.Lock()
+        self.reset()
+
+    def timing(self, stage, seconds):
+        with self._lock:
+            timing = self._timings.get(stage)
+            if timing is None:
+                timing = self._timings[stage] = [0, 0.0, 0.0]
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+        if self.sink is not None:
+            self.sink('timing', stage, seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+        if self.sink is not None:
+            self.sink('count', name, value)
+
+    def error(self, message):
+        with self._lock:
+            self._errors[message] = self._errors.get(message, 0) + 1
+        if self.sink is not None:
+            self.sink('error', message, 1)
+
+    def stats(self):
+        """Return the aggregated statistics.
+
+        @return dict - ``timings`` mapping stages to ``count``, ``total``,
+                       ``mean`` and ``max`` seconds, ``counters`` and
+                       ``errors`` mapping names respective messages to counts
+        """
+        with self._lock:
+            timings = dict()
+            for stage, (count, total, maximum) in self._timings.items():
+                timings[stage] = {
+                    'count': count,
+                    'total': total,
+                    'mean': total / count,
+                    'max': maximum,
+                }
+            return {
+                'timings': timings,
+                'counters': dict(self._counters),
+                'errors': dict(self._errors),
+            }
+
+    def reset(self):
+        """Discard aggregated statistics.
+        """
+        with self._lock:
+            self._timings = dict()
+            self._counters = dict()
+            self._errors = dict()
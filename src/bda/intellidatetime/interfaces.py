@@ -1,8 +1,8 @@
+from bda.intellidatetime.converter import IntelliDateTime
+from bda.intellidatetime.converter import LocalePattern
+from bda.intellidatetime.errors import DateTimeConversionError  # noqa B/C
 from zope.interface import Interface
-
-
-class DateTimeConversionError(Exception):
-    pass
+from zope.interface import classImplements
 
 
 class ILocalePattern(Interface):
@@ -42,7 +42,8 @@ class IIntelliDateTime(Interface):
     """Interface for the datetime conversion.
     """
 
-    def convert(date, time=None, tzinfo=None, locale='iso'):
+    def convert(date, time=None, tzinfo=None, locale='iso',
+                output='datetime'):
         """Convert the input to a datetime object.
 
         The convert function accepts unicode or non-unicode strings and tries
@@ -77,6 +78,8 @@ class IIntelliDateTime(Interface):
             hour, the second 2 chars as minute.
           * as limiter are all non-numeric values accepted
           * seconds are never computed and are therefor ALWAYS handled as '00'
+            unless the converter uses the extended grammar, see
+            ``grammar.TimeGrammar``
 
         Limiters can be any 1 or more character non numeric values. An input
         can look like ``  %_2008 1 abcde 5 ---`` and is still valid and with
@@ -91,11 +94,177 @@ class IIntelliDateTime(Interface):
         @param tzinfo - a tzinfo object to be considered, defaults to None. If
                         given the date and time taken as in the given timezone.
                         If the timezone is DST-aware time will be normalized
-                        for DST/non-DST.
+                        for DST/non-DST. pytz and PEP 495 timezones like
+                        zoneinfo are supported.
         @param locale - a locale name, which is used to determine the date and
                         time patterns. There exists a special locale named
                         'iso', which is default and expects the input in ISO
-                        format.
-        @return datetime - datetime.datetime object
+                        format. A date pattern like 'D M Y' is accepted as
+                        locale as well.
+        @param output - the result representation. ``datetime`` (default),
+                        ``epoch_seconds`` or ``epoch_minutes`` since
+                        1970-01-01 UTC, ``ordinal`` for the proleptic
+                        Gregorian ordinal of the wall date or ``datetime64``
+                        for a numpy ``datetime64[m]`` scalar. Integer
+                        outputs are computed without creating a datetime
+        @return datetime - datetime.datetime object or the value in the
+                           requested output representation
+        @raise DateTimeConversionError - if conversion fails
+        """
+
+    def convert_datetime(value, tzinfo=None, locale='iso',
+                         output='datetime'):
+        """Convert a combined date and time string.
+
+        The value is tokenized once. The first three numbers are the date,
+        following numbers the time, e.g. ``17.10.2026 14:05`` with locale
+        ``de``. A leading six or eight digit number is a packed date like in
+        ``20261017T1405``. Twelve digit values are a packed eight digit date
+        followed by a packed four digit time.
+
+        Results equal the ones of ``convert`` with date and time given
+        separately. A date followed by a time must be complete.
+
+        @param value - date and time as string
+        @param tzinfo - a tzinfo object, see ``convert``
+        @param locale - a locale name, see ``convert``
+        @param output - the result representation, see ``convert``
+        @return datetime - see ``convert``
         @raise DateTimeConversionError - if conversion fails
         """
+
+    def convert_many(dates, times=None, tzinfo=None, locale='iso',
+                     onerror=None, workers=None, chunksize=10000,
+                     output='datetime'):
+        """Convert a batch of inputs to datetime objects.
+
+        Each date is converted together with the time at the same position
+        as described in ``convert``. Locale dependent setup is done once per
+        batch.
+
+        A row which cannot be converted does not abort the batch. Its result
+        is ``None`` and ``onerror`` gets called with the row index and the
+        ``DateTimeConversionError`` if given.
+
+        If ``dates`` is a numpy array, a ``datetime64[m]`` array is returned,
+        where failed rows are ``NaT`` and timezone aware values are stored as
+        UTC.
+
+        For the integer outputs, see ``convert``, an ``array('q')`` is
+        returned, or an ``int64`` numpy array if ``dates`` is a numpy array.
+        Failed rows are ``-2 ** 63``, the integer value of ``NaT``. Output
+        ``datetime64`` returns a ``datetime64[m]`` numpy array sharing the
+        buffer of the integer results.
+
+        Relative input of the whole batch is resolved against the same
+        current datetime.
+
+        @param dates - an iterable or numpy array of date strings
+        @param times - an iterable or numpy array of time strings or None
+        @param tzinfo - a tzinfo object to be considered, see ``convert``
+        @param locale - a locale name, see ``convert``. If ``infer``, the
+                        date pattern is inferred from the first dates, see
+                        ``infer.PatternInference``
+        @param onerror - callback called with index and error of failed rows
+        @param workers - number of worker processes, None converts inline.
+                         Workers use a cache and packed tables sized like
+                         the ones of the converter. Pools are reused by
+                         following batches. Converters with an instrument
+                         convert inline
+        @param chunksize - number of rows per chunk sent to a worker process
+        @param output - the result representation, see ``convert``
+        @return list, array or numpy.ndarray - the converted values
+        """
+
+    def validate(date, time=None, tzinfo=None, locale='iso'):
+        """Check whether the input is convertible without converting it.
+
+        Values are range checked arithmetically, no datetime is created and
+        nothing is raised. The first error found is reported by a code of
+        ``errors``, e.g. ``errors.DAY_RANGE`` for ``30.2.2008``.
+
+        If ``tzinfo`` is given and a DST policy of the converters
+        ``localizer`` is ``tz.RAISE``, wall times in a gap or fold are
+        reported as ``errors.WALL_TIME``.
+
+        @param date - a date as string, see ``convert``
+        @param time - a time as string, see ``convert``
+        @param tzinfo - a tzinfo object, see ``convert``
+        @param locale - a locale name, see ``convert``
+        @return ConversionResult - true if valid, otherwise ``code`` and
+                                   ``message`` describe the error. The
+                                   message equals the one ``convert`` raises
+                                   with
+        """
+
+    def try_convert(date, time=None, tzinfo=None, locale='iso',
+                    output='datetime'):
+        """Convert the input like ``convert`` without raising.
+
+        @param date - a date as string, see ``convert``
+        @param time - a time as string, see ``convert``
+        @param tzinfo - a tzinfo object, see ``convert``
+        @param locale - a locale name, see ``convert``
+        @param output - the result representation, see ``convert``
+        @return ConversionResult - ``value`` is the converted value if valid,
+                                   see ``validate``
+        """
+
+    def format_datetime(value, locale='iso', time=False, packed=False,
+                        short=False, separator=None):
+        """Format a datetime to the input form of a locale.
+
+        Fields are ordered by the date and time patterns of the locale and
+        zero padded, e.g. ``03.04.2008 10:30`` with locale ``de``. The wall
+        time of aware values is formatted.
+
+        ``convert`` of a formatted date and ``convert_datetime`` of a
+        formatted date and time return the value truncated to minutes. Years
+        before 100 are formatted packed only, unpacked they would be read
+        back as two digit years. Two digit years are resolved against the
+        current century.
+
+        @param value - a datetime or a date if time is not appended
+        @param locale - a locale name, see ``convert``
+        @param time - whether to append the time
+        @param packed - omit date separators, e.g. ``03042008``
+        @param short - two digit years
+        @param separator - separator of date fields, defaults to ``-`` for
+                           ``Y M D``, ``/`` for ``M D Y`` and ``.`` otherwise
+        @return string - the formatted value
+        @raise DateTimeConversionError - if value is no date or datetime or
+                                         the year is before 100 and the date
+                                         is not packed
+        """
+
+    def format_datetimes(values, locale='iso', time=False, packed=False,
+                         short=False, separator=None, onerror=None):
+        """Format a batch of datetimes, see ``format_datetime``.
+
+        None values are formatted as None.
+
+        @param values - iterable of datetimes or numpy ``datetime64`` array
+        @param onerror - callback called with index and error of failed
+                         values, which are None in the result. Errors are
+                         raised if not given
+        @return list - the formatted values
+        """
+
+    def reference(now=None):
+        """Context manager fixing the datetime relative input gets resolved
+        against for the current thread or asyncio task.
+
+        Use it to resolve all conversions of a request or batch against the
+        same date:
+
+            with converter.reference():
+                converter.convert(...)
+
+        @param now - the reference datetime, defaults to the current one
+        """
+
+
+# Declarations are registered here and not in ``converter``, thus the
+# converter can be used without importing ``zope.interface``.
+classImplements(LocalePattern, ILocalePattern)
+classImplements(IntelliDateTime, IIntelliDateTime)
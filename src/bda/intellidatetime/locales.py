@@ -0,0 +1,253 @@
+"""Registry of date and time orders per locale.
+
+Orders of all CLDR locales are shipped in ``locales.txt``, which is loaded
+on first lookup. The file is generated by running this module with babel
+installed::
+
+    python -m bda.intellidatetime.locales
+
+Locale names are case insensitive and ``_`` equals ``-``. Unknown regional
+locales fall back to their language, ``de-AT`` to ``de``. Entries equal to
+their fallback are omitted from the data file.
+"""
+from types import MappingProxyType
+import os
+import re
+import threading
+
+
+DATA_FILE = os.path.join(os.path.dirname(__file__), 'locales.txt')
+
+DEFAULT_DATE = 'Y M D'
+DEFAULT_TIME = 'H M'
+
+# orders of ``LocalePattern.PATTERNS``, taking precedence over the data file.
+# Regional locales fall back to their language
+BUILTIN = {
+    'iso': ('Y M D', 'H M'),
+    'cs': ('D M Y', 'H M'),
+    'de': ('D M Y', 'H M'),
+    'en': ('M D Y', 'H M'),
+    'es': ('D M Y', 'H M'),
+    'fr': ('D M Y', 'H M'),
+    'it': ('D M Y', 'H M'),
+    'uk': ('D M Y', 'H M'),
+}
+
+# maximum number of memoized locale strings
+MAX_RESOLVED = 4096
+
+# CLDR pattern letters of year, month, day, hour and minute
+LETTERS = {
+    'y': 'Y', 'Y': 'Y', 'u': 'Y',
+    'M': 'M', 'L': 'M',
+    'd': 'D',
+    'H': 'H', 'h': 'H', 'K': 'H', 'k': 'H',
+    'm': 'M',
+}
+QUOTED = re.compile(r"'[^']*'")
+
+
+def normalize(locale):
+    """Return the normalized name of a locale, e.g. ``de-at`` for
+    ``de_AT``.
+    """
+    return locale.replace('_', '-').lower()
+
+
+def order(pattern, fields):
+    """Return the order of fields in a CLDR date or time pattern.
+
+    @param pattern - a CLDR pattern like ``dd.MM.yy``
+    @param fields - the fields of interest, e.g. ``YMD``
+    @return string - the order like ``D M Y`` or None if a field is missing
+    """
+    ret = list()
+    for char in QUOTED.sub('', pattern):
+        field = LETTERS.get(char)
+        if field is not None and field in fields and field not in ret:
+            ret.append(field)
+    if len(ret) != len(fields):
+        return None
+    return ' '.join(ret)
+
+
+class LocaleRegistry(object):
+    """Date and time orders per locale.
+
+    Resolved orders are memoized per locale string, thus lookups are a
+    single dict access once a locale has been seen.
+
+    The registry is thread safe. Entries and memoized orders form a snapshot
+    replaced on registration (copy on write), thus lookups take no lock.
+    Entries are read only, memoized orders are bound by ``MAX_RESOLVED``.
+    """
+
+    def __init__(self, path=DATA_FILE, entries=None):
+        """@param path - the data file, None for an empty registry
+        @param entries - optional ``{locale: (date order, time order)}``
+                         taking precedence over the data file
+        """
+        self.path = path
+        self.entries = entries
+        # ``(entries, resolved)`` loaded on first access. Entries map
+        # normalized locales, resolved memoizes locales as passed to
+        # ``(date order, time order)``
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, locale):
+        return normalize(locale) in self.snapshot()[0]
+
+    def __len__(self):
+        return len(self.snapshot()[0])
+
+    def snapshot(self):
+        """Return the current ``(entries, resolved)`` snapshot.
+
+        Snapshots must not be modified except for memoizing resolved orders.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = (MappingProxyType(self._load()), dict())
+                snapshot = self._snapshot
+        return snapshot
+
+    def date(self, locale):
+        """Return the date order of locale, see
+        ``interfaces.ILocalePattern.date``.
+        """
+        return self.resolve(locale)[0]
+
+    def time(self, locale):
+        """Return the time order of locale, see
+        ``interfaces.ILocalePattern.time``.
+        """
+        return self.resolve(locale)[1]
+
+    def resolve(self, locale):
+        """Return ``(date order, time order)`` of locale.
+
+        Falls back to the parent locale by removing trailing subtags and
+        finally to ``DEFAULT_DATE`` and ``DEFAULT_TIME``.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.snapshot()
+        entries, resolved = snapshot
+        ret = resolved.get(locale)
+        if ret is not None:
+            return ret
+        try:
+            name = normalize(locale)
+        except AttributeError:
+            # no string, e.g. None
+            name = ''
+        while True:
+            ret = entries.get(name)
+            if ret is not None or '-' not in name:
+                break
+            name = name.rsplit('-', 1)[0]
+        if ret is None:
+            ret = (DEFAULT_DATE, DEFAULT_TIME)
+        # memoized in the snapshot resolved against, a concurrent
+        # registration never gets a stale entry. Arbitrary input must not
+        # grow the memo without limit
+        if len(resolved) < MAX_RESOLVED:
+            resolved[locale] = ret
+        return ret
+
+    def register(self, locale, date, time=DEFAULT_TIME):
+        """Register or override the orders of a locale.
+
+        @param locale - the locale name
+        @param date - the date order, one of ``Y M D``, ``D M Y`` or
+                      ``M D Y``, None keeps the current one
+        @param time - the time order, one of ``H M`` or ``M H``, None keeps
+                      the current one
+        @raise ValueError - if an order is invalid
+        """
+        if date is not None and sorted(date.split(' ')) != ['D', 'M', 'Y']:
+            raise ValueError('Invalid date order {!r}'.format(date))
+        if time is not None and sorted(time.split(' ')) != ['H', 'M']:
+            raise ValueError('Invalid time order {!r}'.format(time))
+        self.snapshot()
+        with self._lock:
+            if date is None or time is None:
+                current = self.resolve(locale)
+                date = date if date is not None else current[0]
+                time = time if time is not None else current[1]
+            entries = dict(self._snapshot[0])
+            entries[normalize(locale)] = (date, time)
+            # regional locales might have resolved to this one, thus
+            # memoized orders are dropped
+            self._snapshot = (MappingProxyType(entries), dict())
+
+    def _read(self):
+        ret = dict()
+        if self.path is None:
+            return ret
+        # share the few distinct orders between entries
+        orders = dict()
+        with open(self.path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                locale, date, time = line.split()
+                key = (date, time)
+                value = orders.get(key)
+                if value is None:
+                    value = orders[key] = (' '.join(date), ' '.join(time))
+                ret[locale] = value
+        return ret
+
+    def _load(self):
+        ret = self._read()
+        if self.entries:
+            for locale, value in self.entries.items():
+                ret[normalize(locale)] = value
+        return ret
+
+
+registry = LocaleRegistry(entries=BUILTIN)
+
+
+def generate(out):
+    """Write the orders of all CLDR locales known to babel to out.
+
+    @param out - a text stream
+    """
+    from babel import Locale
+    from babel import __version__
+    from babel.localedata import locale_identifiers
+    entries = dict()
+    for identifier in locale_identifiers():
+        locale = Locale.parse(identifier)
+        date = order(locale.date_formats['short'].pattern, 'YMD')
+        time = order(locale.time_formats['short'].pattern, 'HM')
+        if date is None or time is None:
+            continue
+        entries[normalize(identifier)] = (date, time)
+    resolver = LocaleRegistry(path=None)
+    out.write('# Date and time orders of CLDR locales, generated with babel '
+              '{}\n'.format(__version__))
+    out.write('# by "python -m bda.intellidatetime.locales". Do not edit.\n')
+    # parents first, thus omitting entries equal to their fallback works
+    for name in sorted(entries, key=lambda name: (name.count('-'), name)):
+        if resolver.resolve(name) == entries[name]:
+            continue
+        resolver.register(name, *entries[name])
+        date, time = entries[name]
+        out.write('{} {} {}\n'.format(
+            name,
+            date.replace(' ', ''),
+            time.replace(' ', '')
+        ))
+
+
+if __name__ == '__main__':  # pragma: no cover
+    with open(DATA_FILE, 'w') as f:
+        generate(f)
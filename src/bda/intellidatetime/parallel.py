@@ -0,0 +1,269 @@
+"""Conversion of batches in a pool of worker processes.
+
+Workers convert chunks of input to wall clock minutes since the epoch and
+send them back as compact ``array('q')`` buffers. Timezone handling is done
+in the calling process.
+
+Workers create their own cache and packed tables sized like the ones of the
+calling converter. Instrumented converters convert inline. Pools are kept
+for reuse by number of workers and these sizes, thus caches and tables of
+the workers outlive a batch. ``shutdown`` stops them.
+"""
+from array import array
+from bda.intellidatetime.converter import DATETIME
+from bda.intellidatetime.converter import EPOCH_ORDINAL
+from bda.intellidatetime.converter import EPOCH_SECONDS
+from bda.intellidatetime.converter import IntelliDateTime
+from bda.intellidatetime.converter import NAT
+from bda.intellidatetime.converter import ORDINAL
+from bda.intellidatetime.converter import isarray
+from bda.intellidatetime.errors import DateTimeConversionError
+from bda.intellidatetime.tables import PackedTables
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from datetime import timedelta
+import itertools
+import os
+import threading
+
+
+EPOCH = datetime(1970, 1, 1)
+
+# per worker converter
+_converter = None
+
+# reusable pools by process id, number of workers and initializer arguments
+_pools = dict()
+_lock = threading.Lock()
+
+
+def _initialize(cachesize, tablesize):
+    global _converter
+    _converter = IntelliDateTime(
+        cache=cachesize,
+        tables=PackedTables(tablesize) if tablesize is not None else None
+    )
+
+
+def _pool(workers, initargs):
+    # the process id is part of the key, pools are not inherited by forks
+    key = (os.getpid(), workers, initargs)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ProcessPoolExecutor(
+                workers,
+                initializer=_initialize,
+                initargs=initargs
+            )
+    return key, pool
+
+
+def _discard(key, pool):
+    with _lock:
+        if _pools.get(key) is pool:
+            del _pools[key]
+    pool.shutdown(wait=False)
+
+
+def shutdown():
+    """Shut down the worker pools kept for reuse.
+    """
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+
+def _convert_chunk(dates, times, patterns, now):
+    converter = _converter
+    plan = converter._patternPlan(*patterns)
+    minutes = array('q')
+    errors = list()
+    if times is None:
+        times = itertools.repeat(None)
+    with converter.reference(now):
+        for index, (date, time) in enumerate(zip(dates, times)):
+            try:
+                dt = converter._convertPlanned(date, time, None, plan)
+            except DateTimeConversionError as e:
+                minutes.append(NAT)
+                errors.append((index, str(e)))
+                continue
+            minutes.append(
+                (dt.toordinal() - EPOCH_ORDINAL) * 1440
+                + dt.hour * 60
+                + dt.minute
+            )
+    return minutes, errors
+
+
+def _chunks(dates, times, chunksize):
+    dates = iter(dates)
+    if times is not None:
+        times = iter(times)
+    while True:
+        chunk = list(itertools.islice(dates, chunksize))
+        if not chunk:
+            return
+        if times is None:
+            yield chunk, None
+        else:
+            yield chunk, list(itertools.islice(times, len(chunk)))
+
+
+def convert_minutes(converter, dates, times=None, locale='iso', onerror=None,
+                    workers=2, chunksize=10000):
+    """Convert a batch to wall clock minutes since the epoch in a pool of
+    worker processes.
+
+    @param converter - the ``IntelliDateTime`` instance the locale patterns
+                       and the reference datetime are taken from
+    @param dates - an iterable of date strings
+    @param times - an iterable of time strings or None
+    @param locale - a locale name
+    @param onerror - callback called with index and error of failed rows
+    @param workers - number of worker processes
+    @param chunksize - number of rows per chunk sent to a worker
+    @return array - ``array('q')`` of minutes, failed rows are ``NAT``
+    """
+    patterns = (converter.pattern.date(locale), converter.pattern.time(locale))
+    now = converter._now()
+    cache = converter.cache
+    tables = converter.tables
+    initargs = (
+        cache.maxsize if cache is not None else None,
+        tables.packed.maxsize if tables is not None else None
+    )
+    ret = array('q')
+    pending = deque()
+
+    def collect():
+        offset, future = pending.popleft()
+        minutes, errors = future.result()
+        ret.extend(minutes)
+        if onerror is not None:
+            for index, message in errors:
+                onerror(offset + index, DateTimeConversionError(message))
+
+    key, pool = _pool(workers, initargs)
+    try:
+        offset = 0
+        for chunk_dates, chunk_times in _chunks(dates, times, chunksize):
+            # limit number of chunks in flight
+            if len(pending) >= workers * 2:
+                collect()
+            pending.append((offset, pool.submit(
+                _convert_chunk,
+                chunk_dates,
+                chunk_times,
+                patterns,
+                now
+            )))
+            offset += len(chunk_dates)
+        while pending:
+            collect()
+    except BrokenProcessPool:
+        _discard(key, pool)
+        raise
+    finally:
+        for offset, future in pending:
+            future.cancel()
+    return ret
+
+
+def _compact(converter, minutes, tzinfo, output, onerror):
+    # turn wall clock minutes into the requested output in place, rows not
+    # representable in tzinfo are set to ``NAT``
+    if output not in (EPOCH_SECONDS, ORDINAL) and not tzinfo:
+        # epoch minutes, ``datetime64`` is encoded as epoch minutes as well
+        return minutes
+    localizer = converter.localizer
+    for index, value in enumerate(minutes):
+        if value == NAT:
+            continue
+        if output == ORDINAL:
+            minutes[index] = value // 1440 + EPOCH_ORDINAL
+            continue
+        seconds = value * 60
+        if tzinfo:
+            year = datetime.fromordinal(value // 1440 + EPOCH_ORDINAL).year
+            try:
+                seconds -= localizer.wall_offset(year, seconds, tzinfo)
+            except DateTimeConversionError as e:
+                minutes[index] = NAT
+                if onerror is not None:
+                    onerror(index, e)
+                continue
+        minutes[index] = seconds if output == EPOCH_SECONDS else seconds // 60
+    return minutes
+
+
+def convert_many(converter, dates, times=None, tzinfo=None, locale='iso',
+                 onerror=None, workers=2, chunksize=10000, output=DATETIME):
+    """See ``interfaces.IIntelliDateTime.convert_many``.
+    """
+    # parse errors of the workers and timezone errors of the calling process
+    # are reported merged in row order like inline conversion does
+    errors = dict()
+    ret = _convert_many(
+        converter,
+        dates,
+        times,
+        tzinfo,
+        locale,
+        errors.__setitem__,
+        workers,
+        chunksize,
+        output
+    )
+    if onerror is not None:
+        for index in sorted(errors):
+            onerror(index, errors[index])
+    return ret
+
+
+def _convert_many(converter, dates, times, tzinfo, locale, onerror, workers,
+                  chunksize, output):
+    as_array = isarray(dates)
+    if as_array:
+        dates = dates.tolist()
+    if isarray(times):
+        times = times.tolist()
+    minutes = convert_minutes(
+        converter,
+        dates,
+        times,
+        locale=locale,
+        onerror=onerror,
+        workers=workers,
+        chunksize=chunksize
+    )
+    if output != DATETIME:
+        return converter._compactResult(
+            _compact(converter, minutes, tzinfo, output, onerror),
+            as_array,
+            output
+        )
+    if as_array and not tzinfo:
+        import numpy
+        return numpy.frombuffer(minutes, dtype='int64').view('datetime64[m]')
+    ret = list()
+    for index, value in enumerate(minutes):
+        if value == NAT:
+            ret.append(None)
+            continue
+        dt = EPOCH + timedelta(minutes=value)
+        if tzinfo:
+            try:
+                dt = converter._localize(dt, tzinfo)
+            except DateTimeConversionError as e:
+                onerror(index, e)
+                dt = None
+        ret.append(dt)
+    if as_array:
+        return converter._datetime64(ret)
+    return ret
@@ -0,0 +1,95 @@
+"""Conversion of fixed-width records in buffers.
+
+Date and time fields are parsed in place from ASCII encoded ``bytes``,
+``bytearray``, ``memoryview`` or ``mmap`` buffers. Neither the records nor
+the fields are copied or decoded.
+"""
+from array import array
+from bda.intellidatetime.converter import DATETIME
+from bda.intellidatetime.converter import IntelliDateTime
+from bda.intellidatetime.converter import NAT
+from bda.intellidatetime.errors import DateTimeConversionError
+
+
+def convert_records(buffer, recordsize, date, time=None, tzinfo=None,
+                    locale='iso', onerror=None, output=DATETIME, offset=0,
+                    count=None, converter=None):
+    """Convert date and time fields of fixed-width records.
+
+    Fields are parsed like ``str`` values passed to
+    ``IntelliDateTime.convert``. Relative input of all records is resolved
+    against the same current datetime.
+
+    @param buffer - the records as ``bytes``, ``bytearray``, ``memoryview``
+                    or ``mmap``
+    @param recordsize - size of a record in bytes including separators like
+                        newlines
+    @param date - ``(offset, length)`` of the date field within a record
+    @param time - ``(offset, length)`` of the time field within a record or
+                  None
+    @param tzinfo - a tzinfo object, see ``IntelliDateTime.convert``
+    @param locale - a locale name, see ``IntelliDateTime.convert``
+    @param onerror - callback called with index and error of failed records
+    @param output - the result representation, see
+                    ``IntelliDateTime.convert_many``
+    @param offset - offset of the first record in buffer
+    @param count - number of records, defaults to all complete records
+    @param converter - the ``IntelliDateTime`` instance to use
+    @return list or array - the converted values, see
+                            ``IntelliDateTime.convert_many``
+    """
+    if converter is None:
+        converter = IntelliDateTime()
+    converter._checkOutput(output)
+    if count is None:
+        count = (len(buffer) - offset) // recordsize
+    plan = converter._plan(locale)
+    compact = output != DATETIME
+    if compact:
+        ret = array('q', [NAT]) * count
+    else:
+        ret = [None] * count
+    split = converter._splitBuffer
+    view = memoryview(buffer)
+    datestart, datesize = date
+    if time is not None:
+        timestart, timesize = time
+    with converter.reference():
+        for index in range(count):
+            record = offset + index * recordsize
+            try:
+                start = record + datestart
+                datedefs = converter._mapDate(
+                    split(view, start, start + datesize),
+                    plan
+                )[0]
+                if time is None:
+                    timedefs = [0, 0]
+                else:
+                    start = record + timestart
+                    if plan.grammar is not None:
+                        timedefs = plan.grammar.parse(
+                            view[start:start + timesize]
+                        )
+                    else:
+                        timedefs = converter._mapTime(
+                            split(view, start, start + timesize),
+                            plan
+                        )
+                if compact:
+                    ret[index] = converter._encode(
+                        datedefs + timedefs,
+                        tzinfo,
+                        output
+                    )
+                else:
+                    ret[index] = converter._datetime(
+                        datedefs + timedefs,
+                        tzinfo
+                    )
+            except DateTimeConversionError as e:
+                if onerror is not None:
+                    onerror(index, e)
+    if compact:
+        return converter._compactResult(ret, False, output)
+    return ret
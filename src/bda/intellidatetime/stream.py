@@ -0,0 +1,292 @@
+"""Streaming conversion of CSV or line oriented input.
+
+Rows are read lazily and converted in chunks through
+``IntelliDateTime.convert_many``, thus memory usage is constant regardless
+of input size.
+"""
+from bda.intellidatetime.converter import INFER
+from bda.intellidatetime.converter import IntelliDateTime
+import argparse
+import csv
+import io
+import itertools
+import sys
+
+
+BUFFER_SIZE = 1 << 16
+
+# reason of CSV rows with more fields than the header. ``csv.DictReader``
+# collects the surplus fields under the key None
+RAGGED = 'More fields than in the header.'
+
+
+def read_csv(stream, delimiter=',', header=True):
+    """Lazily read CSV rows.
+
+    @param stream - a text stream
+    @param delimiter - the CSV delimiter
+    @param header - whether the first row contains field names. If so, rows
+                    are dicts, otherwise lists
+    @return iterator - the rows
+    """
+    if header:
+        return csv.DictReader(stream, delimiter=delimiter)
+    return csv.reader(stream, delimiter=delimiter)
+
+
+def read_lines(stream):
+    """Lazily read lines without line endings.
+
+    @param stream - a text stream
+    @return iterator - the lines
+    """
+    for line in stream:
+        yield line.rstrip('\r\n')
+
+
+def _field(row, field):
+    if field is None:
+        return row
+    try:
+        return row[field]
+    except (KeyError, IndexError):
+        return None
+
+
+def convert_stream(rows, date_field=None, time_field=None, locale='iso',
+                   tzinfo=None, onerror=None, chunksize=1000,
+                   converter=None):
+    """Lazily convert date and time values of rows.
+
+    @param rows - iterable of rows. A row is a dict, a list or a string
+    @param date_field - key or index of the date value in a row. If None,
+                        the row itself is the date value
+    @param time_field - key or index of the time value in a row or None
+    @param locale - a locale name, see ``IntelliDateTime.convert``. If
+                    ``infer``, the date pattern is inferred from the first
+                    rows, see ``infer.PatternInference``
+    @param tzinfo - a tzinfo object, see ``IntelliDateTime.convert``
+    @param onerror - callback called with row and error of rejected rows.
+                     If None, rejected rows are skipped
+    @param chunksize - number of rows converted at once
+    @param converter - the ``IntelliDateTime`` instance to use
+    @return iterator - ``(row, datetime)`` tuples of converted rows
+    """
+    if converter is None:
+        converter = IntelliDateTime()
+    if locale == INFER:
+        from bda.intellidatetime.infer import PatternInference
+        from bda.intellidatetime.infer import prefetch
+        inference = PatternInference(converter)
+        rows = prefetch(
+            rows,
+            inference,
+            value=lambda row: _field(row, date_field)
+        )
+        locale = inference.pattern
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, chunksize))
+        if not chunk:
+            return
+        dates = [_field(row, date_field) for row in chunk]
+        times = None
+        if time_field is not None:
+            times = [_field(row, time_field) for row in chunk]
+        errors = dict()
+        values = converter.convert_many(
+            dates,
+            times,
+            tzinfo=tzinfo,
+            locale=locale,
+            onerror=errors.__setitem__
+        )
+        for index, row in enumerate(chunk):
+            if index in errors:
+                if onerror is not None:
+                    onerror(row, errors[index])
+                continue
+            yield row, values[index]
+
+
+def _timezone(name):
+    try:
+        from zoneinfo import ZoneInfo
+    except ImportError:
+        import pytz
+        return pytz.timezone(name)
+    return ZoneInfo(name)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m bda.intellidatetime',
+        description=(
+            'Convert date and time values of CSV or line oriented input to '
+            'ISO timestamps.'
+        )
+    )
+    parser.add_argument(
+        'input', nargs='?', default='-',
+        help='input file, defaults to stdin'
+    )
+    parser.add_argument(
+        '-o', '--output', default='-',
+        help='output file, defaults to stdout'
+    )
+    parser.add_argument(
+        '-r', '--rejects', default=None,
+        help='file rejected rows are written to unchanged. If not given, '
+             'rejected rows are reported on stderr and the exit status is 1'
+    )
+    parser.add_argument(
+        '-f', '--format', choices=['csv', 'lines'], default='csv',
+        help='input format, defaults to csv'
+    )
+    parser.add_argument(
+        '-d', '--date-field', default=None,
+        help='name of the CSV date column, or its index with --no-header. '
+             'Defaults to the first column'
+    )
+    parser.add_argument(
+        '-t', '--time-field', default=None,
+        help='name of the CSV time column, or its index with --no-header'
+    )
+    parser.add_argument(
+        '-l', '--locale', default='iso',
+        help='locale defining the date and time patterns, defaults to iso. '
+             '"infer" infers the date pattern from the first rows'
+    )
+    parser.add_argument(
+        '-z', '--timezone', default=None,
+        help='timezone name the input is given in'
+    )
+    parser.add_argument(
+        '--delimiter', default=',',
+        help='CSV delimiter, defaults to ","'
+    )
+    parser.add_argument(
+        '--no-header', dest='header', action='store_false',
+        help='CSV input has no header row'
+    )
+    parser.add_argument(
+        '--encoding', default='utf-8',
+        help='encoding of input and output, defaults to utf-8'
+    )
+    parser.add_argument(
+        '--chunksize', type=int, default=1000,
+        help='number of rows converted at once, defaults to 1000'
+    )
+    return parser
+
+
+def _open(path, mode, encoding):
+    if path == '-':
+        stream = sys.stdin if mode == 'r' else sys.stdout
+        return io.open(
+            stream.fileno(),
+            mode,
+            buffering=BUFFER_SIZE,
+            encoding=encoding,
+            newline='',
+            closefd=False
+        )
+    return io.open(
+        path,
+        mode,
+        buffering=BUFFER_SIZE,
+        encoding=encoding,
+        newline=''
+    )
+
+
+def main(argv=None):
+    args = _parser().parse_args(argv)
+    tzinfo = _timezone(args.timezone) if args.timezone else None
+    date_field = args.date_field
+    time_field = args.time_field
+    if args.format == 'csv' and not args.header:
+        date_field = int(date_field) if date_field is not None else 0
+        if time_field is not None:
+            time_field = int(time_field)
+    infile = _open(args.input, 'r', args.encoding)
+    outfile = _open(args.output, 'w', args.encoding)
+    rejectfile = None
+    if args.rejects:
+        rejectfile = _open(args.rejects, 'w', args.encoding)
+    try:
+        if args.format == 'lines':
+            rows = read_lines(infile)
+            date_field = time_field = None
+
+            def write(row, dt):
+                outfile.write(dt.isoformat() + '\n')
+
+            def reject(row, error):
+                rejectfile.write(row + '\n')
+        else:
+            rows = read_csv(infile, args.delimiter, args.header)
+            if args.header:
+                fieldnames = rows.fieldnames or []
+                if date_field is None and fieldnames:
+                    date_field = fieldnames[0]
+                writer = csv.DictWriter(
+                    outfile,
+                    fieldnames,
+                    delimiter=args.delimiter
+                )
+                writer.writeheader()
+                if rejectfile is not None:
+                    rejects = csv.writer(rejectfile, delimiter=args.delimiter)
+                    rejects.writerow(fieldnames)
+
+                def reject(row, error):
+                    # rows are written unchanged, including surplus fields
+                    rejects.writerow(
+                        [row.get(name) for name in fieldnames] +
+                        row.get(None, [])
+                    )
+            else:
+                writer = csv.writer(outfile, delimiter=args.delimiter)
+                if rejectfile is not None:
+                    rejects = csv.writer(rejectfile, delimiter=args.delimiter)
+
+                def reject(row, error):
+                    rejects.writerow(row)
+
+            def write(row, dt):
+                row[date_field] = dt.isoformat()
+                writer.writerow(row)
+
+        rejected = [0]
+
+        def onerror(row, error):
+            rejected[0] += 1
+            if rejectfile is None:
+                sys.stderr.write('Rejected %r: %s\n' % (row, error))
+            else:
+                reject(row, error)
+
+        for row, dt in convert_stream(
+            rows,
+            date_field,
+            time_field,
+            locale=args.locale,
+            tzinfo=tzinfo,
+            onerror=onerror,
+            chunksize=args.chunksize
+        ):
+            if type(row) is dict and None in row:
+                onerror(row, RAGGED)
+                continue
+            write(row, dt)
+    finally:
+        infile.close()
+        outfile.close()
+        if rejectfile is not None:
+            rejectfile.close()
+    if not rejected[0]:
+        return 0
+    sys.stderr.write('Rejected rows: %d\n' % rejected[0])
+    # rejected rows are lost unless written to a rejects file
+    return 0 if rejectfile is not None else 1
@@ -0,0 +1,124 @@
+"""Lookup tables for packed numeric input.
+
+Packed four digit times and dates are looked up in tables built once per
+pattern. Packed six and eight digit dates are kept in a bounded LRU cache
+once parsed. Tables and cache only contain valid values. Any other input
+takes the regular parsing path, thus error messages are unchanged.
+"""
+from bda.intellidatetime.cache import CENTURY
+from bda.intellidatetime.cache import ConversionCache
+from bda.intellidatetime.cache import YEAR
+from bda.intellidatetime.cache import stamp
+from bda.intellidatetime.converter import DAYS_IN_MONTH
+from bda.intellidatetime.converter import NUMERIC
+from bda.intellidatetime.converter import month_range
+from bda.intellidatetime.errors import DateTimeConversionError
+
+
+class PackedTables(object):
+    """Lookup tables for packed numeric dates and times.
+
+    Values returned by ``date`` and ``time`` are shared and must not be
+    modified.
+    """
+
+    def __init__(self, maxsize=65536):
+        """@param maxsize - maximum number of cached six and eight digit
+                         dates
+        """
+        self.packed = ConversionCache(maxsize=maxsize)
+        # hour index -> {'HHMM': [hour, minute]}
+        self._times = dict()
+        # whether day is given before month -> {'DDMM': (month, day)}
+        self._dates = dict()
+
+    def time(self, value, plan):
+        """Return ``[hour, minute]`` of a valid packed four digit time or
+        None.
+
+        @param value - the time string
+        @param plan - the ``ParsePlan`` of the locale
+        """
+        table = self._times.get(plan.hour)
+        if table is None:
+            table = self._times[plan.hour] = self._timeTable(plan.hour)
+        return table.get(value)
+
+    def date(self, value, plan, now):
+        """Return ``(defs, stamp)`` of a valid packed four, six or eight
+        digit date or None, see ``IntelliDateTime._resolveDate``.
+
+        @param value - the date string
+        @param plan - the ``ParsePlan`` of the locale
+        @param now - callable returning the current datetime
+        """
+        size = len(value)
+        if size == 4:
+            table = self._dates.get(plan.daymonth)
+            if table is None:
+                table = self._dates[plan.daymonth] = self._dateTable(
+                    plan.daymonth
+                )
+            entry = table.get(value)
+            if entry is None:
+                return None
+            dt = now()
+            return [dt.year, entry[0], entry[1]], stamp(YEAR, dt)
+        if size != 6 and size != 8:
+            return None
+        key = (value, plan.slices)
+        entry = self.packed.get(key, now)
+        if entry is None:
+            entry = self._parse(value, plan, now)
+            if entry is None:
+                return None
+            self.packed.set(key, entry, entry[1])
+        return entry
+
+    def _timeTable(self, hour):
+        table = dict()
+        for first in range(100):
+            for second in range(100):
+                if hour == 0:
+                    defs = [first, second]
+                else:
+                    defs = [second, first]
+                if defs[0] < 24 and defs[1] < 60:
+                    table['%02i%02i' % (first, second)] = defs
+        return table
+
+    def _dateTable(self, daymonth):
+        table = dict()
+        for first in range(100):
+            for second in range(100):
+                if daymonth:
+                    month, day = second, first
+                else:
+                    month, day = first, second
+                if 1 <= month <= 12 and 1 <= day <= DAYS_IN_MONTH[month]:
+                    table['%02i%02i' % (first, second)] = (month, day)
+        return table
+
+    def _parse(self, value, plan, now):
+        if NUMERIC.match(value) is None:
+            return None
+        valid = None
+        if len(value) == 8:
+            (ys, ye), (ms, me), (ds, de) = plan.slices
+            year = int(value[ys:ye])
+            month = int(value[ms:me])
+            day = int(value[ds:de])
+        else:
+            parts = [int(value[:2]), int(value[2:4]), int(value[4:])]
+            dt = now()
+            year = int('%s%02i' % (str(dt.year)[:2], parts[plan.year]))
+            month = parts[plan.month]
+            day = parts[plan.day]
+            valid = stamp(CENTURY, dt)
+        try:
+            length = month_range(year, month)[1]
+        except DateTimeConversionError:
+            return None
+        if not 1 <= day <= length:
+            return None
+        return [year, month, day], valid
@@ -1,13 +1,70 @@
+from array import array
+from bda.intellidatetime import CachedClock
+from bda.intellidatetime import ConversionCache
 from bda.intellidatetime import DateTimeConversionError
 from bda.intellidatetime import IIntelliDateTime
+from bda.intellidatetime import Instrumentation
 from bda.intellidatetime import IntelliDateTime
 from bda.intellidatetime import LocalePattern
+from bda.intellidatetime import PackedTables
+from bda.intellidatetime import aio
+from bda.intellidatetime import benchmarks
 from bda.intellidatetime import convert
+from bda.intellidatetime import convert_datetime
+from bda.intellidatetime import convert_many
+from bda.intellidatetime import converter
+from bda.intellidatetime import errors
+from bda.intellidatetime import format_datetimes
+from bda.intellidatetime import formatter
+from bda.intellidatetime import infer
+from bda.intellidatetime import locales
+from bda.intellidatetime import records
+from bda.intellidatetime import shared
+from bda.intellidatetime import stream
+from bda.intellidatetime import try_convert
+from bda.intellidatetime import tz
+from bda.intellidatetime import validate
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
 from zope.interface.verify import verifyObject
+import asyncio
+import contextlib
+import io
+import mmap
+import operator
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
 
 
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+try:
+    import pytz
+except ImportError:  # pragma: no cover
+    pytz = None
+
+try:
+    import babel
+except ImportError:  # pragma: no cover
+    babel = None
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # pragma: no cover
+    ZoneInfo = None
+
+
 class TestIntellidatetime(unittest.TestCase):
 
     def expect_error(self, exc, func, *args, **kw):
@@ -30,6 +87,42 @@ class TestIntellidatetime(unittest.TestCase):
         converter = IntelliDateTime()
         self.assertTrue(verifyObject(IIntelliDateTime, converter))
 
+    def test_lazy_import(self):
+        import bda.intellidatetime
+        self.assertTrue('IntelliDateTime' in dir(bda.intellidatetime))
+        self.assertRaises(
+            AttributeError,
+            getattr, bda.intellidatetime, 'inexistent'
+        )
+        code = (
+            'import sys\n'
+            'import bda.intellidatetime as m\n'
+            'm.convert("1.1.2008", "10:00", locale="de")\n'
+            'assert "zope.interface" not in sys.modules\n'
+            'assert "numpy" not in sys.modules\n'
+            'assert m.IIntelliDateTime.implementedBy(m.IntelliDateTime)\n'
+        )
+        subprocess.check_call([sys.executable, '-c', code])
+        # Interfaces are declared if zope.interface is in use already
+        code = (
+            'import sys\n'
+            'import zope.interface\n'
+            'from bda.intellidatetime.converter import IntelliDateTime\n'
+            'from bda.intellidatetime.converter import LocalePattern\n'
+            'assert "bda.intellidatetime.interfaces" in sys.modules\n'
+            'names = [\n'
+            '    iface.__name__ for iface in\n'
+            '    zope.interface.providedBy(IntelliDateTime())\n'
+            ']\n'
+            'assert names == ["IIntelliDateTime"], names\n'
+            'names = [\n'
+            '    iface.__name__ for iface in\n'
+            '    zope.interface.providedBy(LocalePattern())\n'
+            ']\n'
+            'assert names == ["ILocalePattern"], names\n'
+        )
+        subprocess.check_call([sys.executable, '-c', code])
+
     def test_converter_is_numeric(self):
         converter = IntelliDateTime()
         self.assertFalse(converter._isNumeric(None))
@@ -38,6 +131,8 @@ class TestIntellidatetime(unittest.TestCase):
         self.assertFalse(converter._isNumeric('1 2 3'))
         self.assertFalse(converter._isNumeric(''))
         self.assertTrue(converter._isNumeric('1234567890'))
+        self.assertFalse(converter._isNumeric('1234\n'))
+        self.assertFalse(converter._isNumeric(u'\u0663'))
 
     def test_converter_split_value(self):
         converter = IntelliDateTime()
@@ -99,6 +194,60 @@ class TestIntellidatetime(unittest.TestCase):
         )
         self.assertEqual(converter._splitValue('1___4AEIOU2008'), [1, 4, 2008])
         self.assertEqual(converter._splitValue('aa123 _ bb789ll  '), [123, 789])
+        self.assertEqual(
+            converter._splitValue('  %_2008 1 abcde 5 ---'),
+            [2008, 1, 5]
+        )
+        # Only ASCII digits are numeric
+        self.assertEqual(converter._splitValue(u'1\u0663 2'), [1, 2])
+        # Long noisy input
+        noise = 'x' * 10000
+        self.assertEqual(
+            converter._splitValue(noise + '2008' + noise + '1 5' + noise),
+            [2008, 1, 5]
+        )
+
+    def test_converter_split_buffer(self):
+        converter = IntelliDateTime()
+        for value in [b' 1.2.2008 ', bytearray(b'1.2.2008'),
+                      memoryview(b'x1.2.2008x')[1:-1]]:
+            self.assertEqual(converter._splitValue(value), [1, 2, 2008])
+            self.assertTrue(converter._isNumeric(value) is False)
+        self.assertEqual(converter._splitValue(b'0101'), [1, 1])
+        self.assertEqual(converter._splitValue(b'010101'), [1, 1, 1])
+        # eight digits are returned as integer instead of string
+        self.assertEqual(converter._splitValue(b'01012008'), 1012008)
+        self.assertTrue(converter._isNumeric(b'01012008'))
+        # slices of a buffer
+        self.assertEqual(
+            converter._splitBuffer(b'1.2.2008|0101', 9, 13),
+            [1, 1]
+        )
+        self.assertEqual(converter._splitValue(b'   '), [])
+        for value in [b'', b'000', b'00000']:
+            with self.assertRaises(DateTimeConversionError) as expected:
+                converter._splitValue(value.decode('ascii'))
+            with self.assertRaises(DateTimeConversionError) as error:
+                converter._splitValue(value)
+            self.assertEqual(str(error.exception), str(expected.exception))
+        # buffers convert like strings
+        for date, time in [('1.2.08', '10:30'), ('01022008', '1030'),
+                           ('0102', None), ('1.2.', '10')]:
+            self.assertEqual(
+                converter.convert(
+                    date.encode('ascii'),
+                    time.encode('ascii') if time else None,
+                    locale='de'
+                ),
+                converter.convert(date, time, locale='de')
+            )
+        self.assertEqual(
+            converter.convert_many(
+                [b'20080201', bytearray(b'2008-02-02')],
+                output='ordinal'
+            ),
+            array('q', [733073, 733074])
+        )
 
     def test_converter_time_map(self):
         converter = IntelliDateTime()
@@ -146,6 +295,34 @@ class TestIntellidatetime(unittest.TestCase):
             [2008, 2, 1]
         )
 
+    def test_converter_plan(self):
+        converter = IntelliDateTime()
+        plan = converter._plan('de')
+        self.assertEqual(plan.datemap, [2, 1, 0])
+        self.assertEqual(plan.slices, ((4, 8), (2, 4), (0, 2)))
+        self.assertTrue(plan.daymonth)
+        self.assertEqual(plan.timemap, [0, 1])
+        # Plans are cached per pattern
+        self.assertTrue(converter._plan('de') is plan)
+        self.assertTrue(converter._plan('cs') is plan)
+        self.assertFalse(converter._plan('en') is plan)
+        # Changes of locale patterns are considered
+        snapshot = locales.registry.snapshot()
+        LocalePattern.register('xx', 'D M Y')
+        try:
+            self.assertTrue(converter._plan('xx') is plan)
+            self.assertEqual(
+                converter.convert('01022008', locale='xx'),
+                datetime(2008, 2, 1, 0, 0)
+            )
+            LocalePattern.register('xx', 'M D Y')
+            self.assertEqual(
+                converter.convert('01022008', locale='xx'),
+                datetime(2008, 1, 2, 0, 0)
+            )
+        finally:
+            locales.registry._snapshot = snapshot
+
     def test_converter_parse_date(self):
         converter = IntelliDateTime()
         err = self.expect_error(
@@ -222,12 +399,1956 @@ class TestIntellidatetime(unittest.TestCase):
         )
         self.assertEqual(str(err), 'day is out of range for month')
 
+    def test_conversion_cache(self):
+        cache = ConversionCache(maxsize=2)
+        now = datetime(2026, 10, 17)
+        self.assertTrue(cache.get('a', lambda: now) is None)
+        cache.set('a', 1)
+        cache.set('b', 2, ('month', 2026, 10))
+        self.assertEqual(cache.get('a', lambda: now), 1)
+        # 'b' is least recently used
+        cache.set('c', 3, ('century', 20))
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.get('b', lambda: now) is None)
+        self.assertEqual(cache.get('c', lambda: now), 3)
+        self.assertEqual(
+            (cache.hits, cache.misses, cache.evictions, cache.expirations),
+            (2, 2, 1, 0)
+        )
+        # Relative entries expire when their scope rolls over
+        cache.set('b', 2, ('month', 2026, 10))
+        self.assertEqual(cache.get('b', lambda: datetime(2026, 10, 31)), 2)
+        self.assertTrue(cache.get('b', lambda: datetime(2026, 11, 1)) is None)
+        cache.set('y', 4, ('year', 2026))
+        self.assertEqual(cache.get('y', lambda: datetime(2026, 12, 31)), 4)
+        self.assertTrue(cache.get('y', lambda: datetime(2027, 1, 1)) is None)
+        self.assertEqual(cache.get('c', lambda: datetime(2099, 12, 31)), 3)
+        self.assertTrue(cache.get('c', lambda: datetime(2100, 1, 1)) is None)
+        self.assertEqual(cache.expirations, 3)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_converter_cache(self):
+        converter = IntelliDateTime(cache=10)
+        self.assertEqual(converter.cache.maxsize, 10)
+        cache = converter.cache
+        for i in range(3):
+            self.assertEqual(
+                converter.convert('1.1.08', '10:30', locale='de'),
+                datetime(2008, 1, 1, 10, 30)
+            )
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+        # Locale is considered
+        self.assertEqual(
+            converter.convert('1.2.08', locale='en'),
+            datetime(2008, 1, 2, 0, 0)
+        )
+        self.assertEqual(
+            converter.convert('1.2.08', locale='de'),
+            datetime(2008, 2, 1, 0, 0)
+        )
+        # Relative input is stamped with the scope it depends on
+        now = datetime.now()
+        converter.convert('1', locale='de')
+        converter.convert('1.2', locale='de')
+        converter.convert('1.2.2008', locale='de')
+        stamps = sorted(
+            valid for _, valid in cache._data.values() if valid
+        )
+        self.assertEqual(stamps, [
+            ('century', now.year // 100),
+            ('century', now.year // 100),
+            ('century', now.year // 100),
+            ('month', now.year, now.month),
+            ('year', now.year)
+        ])
+        # Errors are not cached
+        for i in range(2):
+            self.expect_error(
+                DateTimeConversionError,
+                converter.convert,
+                '35.1.08',
+                locale='de'
+            )
+        self.assertEqual(len(cache), 6)
+        # Unhashable input bypasses the cache
+        self.expect_error(DateTimeConversionError, converter.convert, [])
+        cache = IntelliDateTime(cache=ConversionCache(maxsize=5)).cache
+        self.assertEqual(cache.maxsize, 5)
+
+    def test_packed_tables(self):
+        tables = PackedTables(maxsize=2)
+        now = [datetime(2008, 5, 20)]
+        converter = IntelliDateTime(clock=lambda: now[0], tables=tables)
+        plain = IntelliDateTime(clock=lambda: now[0])
+        plan = converter._plan('de')
+        self.assertEqual(tables.time('1030', plan), [10, 30])
+        self.assertEqual(tables.time('2460', plan), None)
+        self.assertEqual(tables.time('10:30', plan), None)
+        self.assertEqual(
+            tables.date('2902', plan, converter._now),
+            ([2008, 2, 29], ('year', 2008))
+        )
+        self.assertEqual(tables.date('0113', plan, converter._now), None)
+        self.assertEqual(
+            tables.date('01022008', plan, converter._now),
+            ([2008, 2, 1], None)
+        )
+        self.assertEqual(tables.date('29022007', plan, converter._now), None)
+        self.assertEqual(
+            tables.date('010208', plan, converter._now),
+            ([2008, 2, 1], ('century', 20))
+        )
+        self.assertEqual(len(tables.packed), 2)
+        tables.date('010209', plan, converter._now)
+        self.assertEqual(len(tables.packed), 2)
+        self.assertEqual(tables.packed.evictions, 1)
+        # patterns are respected
+        self.assertEqual(
+            tables.date('0201', converter._plan('en'), converter._now)[0],
+            [2008, 2, 1]
+        )
+        self.assertEqual(
+            tables.date('20080201', converter._plan('iso'), converter._now),
+            ([2008, 2, 1], None)
+        )
+        # results and errors equal the ones of the regular path
+        for date, time in [('0102', '1030'), ('010208', '2400'),
+                           ('01022008', None), ('3102', None),
+                           ('2902', '0000'), ('320108', None),
+                           (' 0102 ', '1030'), ('01.02.2008', '10:30')]:
+            for locale in ['de', 'en', 'iso']:
+                for output in ['datetime', 'epoch_minutes']:
+                    try:
+                        expected = plain.convert(
+                            date, time, locale=locale, output=output
+                        )
+                    except DateTimeConversionError as e:
+                        expected = str(e)
+                    try:
+                        result = converter.convert(
+                            date, time, locale=locale, output=output
+                        )
+                    except DateTimeConversionError as e:
+                        result = str(e)
+                    self.assertEqual(result, expected)
+        # six digit dates expire with the century
+        converter.convert('010208', locale='de')
+        now[0] = datetime(2108, 5, 20)
+        self.assertEqual(
+            converter.convert('010208', locale='de'),
+            datetime(2108, 2, 1)
+        )
+
+    def test_converter_clock(self):
+        calls = list()
+
+        def clock():
+            calls.append(None)
+            return datetime(2026, 10, 17, 12, 0)
+
+        converter = IntelliDateTime(clock=clock)
+        self.assertEqual(
+            converter.convert('5', locale='de'),
+            datetime(2026, 10, 5, 0, 0)
+        )
+        self.assertEqual(
+            converter.convert('5.1', locale='de'),
+            datetime(2026, 1, 5, 0, 0)
+        )
+        self.assertEqual(
+            converter.convert('5.1.8', locale='de'),
+            datetime(2008, 1, 5, 0, 0)
+        )
+        self.assertEqual(len(calls), 3)
+        # Absolute input does not need the clock
+        converter.convert('5.1.2008', locale='de')
+        self.assertEqual(len(calls), 3)
+        # Fixed reference
+        with converter.reference(datetime(1999, 12, 31)) as now:
+            self.assertEqual(now, datetime(1999, 12, 31))
+            self.assertEqual(
+                converter.convert('5', locale='de'),
+                datetime(1999, 12, 5, 0, 0)
+            )
+            self.assertEqual(
+                converter.convert('5.1.8', locale='de'),
+                datetime(1908, 1, 5, 0, 0)
+            )
+            # Nested reference defaults to the outer one
+            with converter.reference() as now:
+                self.assertEqual(now, datetime(1999, 12, 31))
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(
+            converter.convert('5', locale='de'),
+            datetime(2026, 10, 5, 0, 0)
+        )
+        # The clock is called once per batch
+        del calls[:]
+        converter.convert_many(['1', '2', '3.4'], locale='de')
+        self.assertEqual(len(calls), 1)
+
+    def test_reference_tasks(self):
+        # References of interleaved asyncio tasks of one thread are separate
+        converter = IntelliDateTime(clock=lambda: datetime(2026, 10, 17))
+
+        async def task(now):
+            with converter.reference(now):
+                await asyncio.sleep(0)
+                first = converter.convert('5', locale='de')
+                await asyncio.sleep(0)
+                return first, converter.convert('5', locale='de')
+
+        async def run():
+            return await asyncio.gather(
+                task(datetime(1999, 12, 31)),
+                task(datetime(2008, 2, 1))
+            )
+
+        self.assertEqual(asyncio.run(run()), [
+            (datetime(1999, 12, 5), datetime(1999, 12, 5)),
+            (datetime(2008, 2, 5), datetime(2008, 2, 5))
+        ])
+        self.assertEqual(
+            converter.convert('5', locale='de'),
+            datetime(2026, 10, 5)
+        )
+
+    def test_cached_clock(self):
+        ticks = [0.0]
+        clock = CachedClock(
+            resolution=1.0,
+            source=lambda: datetime(2026, 10, 17, 0, 0, int(ticks[0])),
+            monotonic=lambda: ticks[0]
+        )
+        self.assertEqual(clock(), datetime(2026, 10, 17, 0, 0, 0))
+        ticks[0] = 0.5
+        self.assertEqual(clock(), datetime(2026, 10, 17, 0, 0, 0))
+        ticks[0] = 1.0
+        self.assertEqual(clock(), datetime(2026, 10, 17, 0, 0, 1))
+        # Fetched datetimes are not reused beyond midnight
+        start = datetime(2026, 10, 31, 23, 59, 59, 500000)
+        clock = CachedClock(
+            resolution=60.0,
+            source=lambda: start + timedelta(seconds=ticks[0]),
+            monotonic=lambda: ticks[0]
+        )
+        ticks[0] = 0.0
+        self.assertEqual(clock(), start)
+        ticks[0] = 0.4
+        self.assertEqual(clock(), start)
+        ticks[0] = 0.5
+        self.assertEqual(clock(), datetime(2026, 11, 1))
+        converter = IntelliDateTime(clock=clock)
+        self.assertEqual(
+            converter.convert('5', locale='de'),
+            datetime(2026, 11, 5, 0, 0)
+        )
+        converter = IntelliDateTime(clock=CachedClock())
+        self.assertEqual(
+            converter.convert('5', locale='de'),
+            datetime(datetime.now().year, datetime.now().month, 5, 0, 0)
+        )
+
+    def test_converter_instrumentation(self):
+        events = list()
+        instrument = Instrumentation(
+            sink=lambda kind, name, value: events.append((kind, name))
+        )
+        converter = IntelliDateTime(
+            clock=lambda: datetime(2008, 5, 20),
+            instrument=instrument
+        )
+        self.assertEqual(
+            converter.convert('1.1.2008', '10:00', locale='de'),
+            datetime(2008, 1, 1, 10, 0)
+        )
+        converter.convert('20080101', '1000')
+        converter.convert('1.', locale='de')
+        self.assertRaises(
+            DateTimeConversionError,
+            converter.convert, '31.2.2008', locale='de'
+        )
+        self.assertRaises(DateTimeConversionError, converter.convert, None)
+        stats = converter.stats()
+        self.assertEqual(stats['counters'], {
+            'calls': 5,
+            'date.parts.3': 2,
+            'date.numeric.8': 1,
+            'date.parts.1': 1,
+            'now.month': 1,
+            'time.parts.2': 1,
+            'time.numeric.4': 1,
+        })
+        self.assertEqual(stats['errors'], {
+            'day is out of range for month': 1,
+            'Invalid date input.': 1,
+        })
+        self.assertEqual(
+            sorted(stats['timings']),
+            ['date_map', 'datetime', 'split', 'time_map']
+        )
+        split = stats['timings']['split']
+        self.assertEqual(split['count'], 6)
+        self.assertEqual(split['mean'], split['total'] / 6)
+        self.assertTrue(split['max'] <= split['total'])
+        self.assertFalse('cache' in stats)
+        self.assertEqual(events[0], ('count', 'calls'))
+        self.assertTrue(('error', 'Invalid date input.') in events)
+
+        converter.convert('1.1.2008', locale='de', tzinfo=timezone.utc)
+        self.assertEqual(instrument.stats()['timings']['tz']['count'], 1)
+        instrument.reset()
+        self.assertEqual(
+            instrument.stats(),
+            {'timings': {}, 'counters': {}, 'errors': {}}
+        )
+
+        # cache hits do not reach the instrumentation
+        converter = IntelliDateTime(cache=10, instrument=Instrumentation())
+        converter.convert('2008-01-01')
+        converter.convert('2008-01-01')
+        stats = converter.stats()
+        self.assertEqual(stats['counters']['calls'], 1)
+        self.assertEqual(stats['cache'], {
+            'size': 1,
+            'hits': 1,
+            'misses': 1,
+            'evictions': 0,
+            'expirations': 0,
+        })
+        self.assertEqual(IntelliDateTime().stats(), {})
+
     def test_convert(self):
         self.assertEqual(
             convert('1.1.08', locale='de'),
             datetime(2008, 1, 1, 0, 0)
         )
 
+    def test_converter_convert_many(self):
+        converter = IntelliDateTime()
+        self.assertEqual(
+            converter.convert_many(
+                ['1.1.08', '0102', '02022008'],
+                ['10:30', None, '1015'],
+                locale='de'
+            ),
+            [
+                datetime(2008, 1, 1, 10, 30),
+                datetime(datetime.now().year, 2, 1, 0, 0),
+                datetime(2008, 2, 2, 10, 15)
+            ]
+        )
+        # Times are optional
+        self.assertEqual(
+            converter.convert_many(['20080201', '2008 2 2']),
+            [datetime(2008, 2, 1, 0, 0), datetime(2008, 2, 2, 0, 0)]
+        )
+        # Failing rows do not abort the batch
+        errors = list()
+        self.assertEqual(
+            converter.convert_many(
+                ['1.1.08', '35.1.08', '', '3.1.08'],
+                locale='de',
+                onerror=lambda index, e: errors.append((index, str(e)))
+            ),
+            [
+                datetime(2008, 1, 1, 0, 0),
+                None,
+                None,
+                datetime(2008, 1, 3, 0, 0)
+            ]
+        )
+        self.assertEqual(errors, [
+            (1, 'day is out of range for month'),
+            (2, 'Invalid date input.')
+        ])
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_converter_convert_many_numpy(self):
+        converter = IntelliDateTime()
+        result = converter.convert_many(
+            numpy.array(['1.1.08', '35.1.08', '02022008']),
+            numpy.array(['10:30', '', '1015']),
+            locale='de'
+        )
+        self.assertEqual(result.dtype, numpy.dtype('datetime64[m]'))
+        self.assertEqual(
+            result[0],
+            numpy.datetime64('2008-01-01T10:30')
+        )
+        self.assertTrue(numpy.isnat(result[1]))
+        self.assertEqual(
+            result[2],
+            numpy.datetime64('2008-02-02T10:15')
+        )
+
+    def test_converter_convert_many_workers(self):
+        converter = IntelliDateTime()
+        dates = ['1.1.08', '35.1.08', '0102', '', '02022008'] * 3
+        times = ['10:30', None, '1015', None, '1'] * 3
+        errors = list()
+        result = converter.convert_many(
+            dates,
+            times,
+            locale='de',
+            onerror=lambda index, e: errors.append((index, e)),
+            workers=2,
+            chunksize=4
+        )
+        self.assertEqual(
+            result,
+            converter.convert_many(dates, times, locale='de')
+        )
+        self.assertEqual([(index, str(e)) for index, e in errors], [
+            (1, 'day is out of range for month'),
+            (3, 'Invalid date input.'),
+            (6, 'day is out of range for month'),
+            (8, 'Invalid date input.'),
+            (11, 'day is out of range for month'),
+            (13, 'Invalid date input.')
+        ])
+        self.assertTrue(isinstance(errors[0][1], DateTimeConversionError))
+        # The reference datetime of the calling process is used
+        with converter.reference(datetime(1999, 12, 31)):
+            self.assertEqual(
+                converter.convert_many(['1'], locale='de', workers=2),
+                [datetime(1999, 12, 1, 0, 0)]
+            )
+        if numpy is not None:
+            result = converter.convert_many(
+                numpy.array(dates),
+                numpy.array([t or '' for t in times]),
+                locale='de',
+                workers=2,
+                chunksize=4
+            )
+            self.assertEqual(result.dtype, numpy.dtype('datetime64[m]'))
+            self.assertEqual(
+                result[0],
+                numpy.datetime64('2008-01-01T10:30')
+            )
+            self.assertTrue(numpy.isnat(result[1]))
+        # instrumented converters convert inline
+        converter = IntelliDateTime(instrument=Instrumentation())
+        converter.convert_many(dates, times, locale='de', workers=2)
+        self.assertEqual(converter.stats()['counters']['calls'], 15)
+
+    def test_converter_convert_many_workers_pool(self):
+        from bda.intellidatetime import parallel
+        parallel.shutdown()
+        converter = IntelliDateTime(cache=16)
+        converter.convert_many(['1.1.08'], locale='de', workers=2)
+        pools = list(parallel._pools.values())
+        self.assertEqual(len(pools), 1)
+        # Batches reuse the pool and thus the caches of the workers
+        converter.convert_many(['2.1.08'], locale='de', workers=2)
+        self.assertEqual(list(parallel._pools.values()), pools)
+        # Pools are kept per number of workers and cache sizes
+        IntelliDateTime().convert_many(['1.1.08'], locale='de', workers=2)
+        self.assertEqual(len(parallel._pools), 2)
+        parallel.shutdown()
+        self.assertEqual(parallel._pools, {})
+        self.assertEqual(
+            converter.convert_many(['1.1.08'], locale='de', workers=2),
+            [datetime(2008, 1, 1, 0, 0)]
+        )
+        parallel.shutdown()
+
+    @unittest.skipIf(ZoneInfo is None, 'zoneinfo not available')
+    def test_converter_convert_many_workers_wall_time(self):
+        converter = IntelliDateTime(localizer=tz.Localizer(gap=tz.RAISE))
+        tzinfo = ZoneInfo('Europe/Vienna')
+        errors = list()
+        self.assertEqual(
+            converter.convert_many(
+                ['30.3.2008', '1.1.2008'],
+                ['2:30', '1:00'],
+                tzinfo,
+                'de',
+                onerror=lambda index, e: errors.append((index, str(e))),
+                workers=2
+            ),
+            [None, datetime(2008, 1, 1, 1, 0, tzinfo=tzinfo)]
+        )
+        self.assertEqual(errors, [(0, 'Nonexistent time in timezone.')])
+        # Errors of workers and timezone errors are reported in row order
+        del errors[:]
+        for output in ['datetime', 'epoch_minutes']:
+            converter.convert_many(
+                ['30.3.2008', 'foo', '30.3.2008'],
+                ['2:30', None, '2:30'],
+                tzinfo,
+                'de',
+                onerror=lambda index, e: errors.append((index, str(e))),
+                workers=2,
+                chunksize=1,
+                output=output
+            )
+        self.assertEqual(errors, [
+            (0, 'Nonexistent time in timezone.'),
+            (1, 'Invalid number of parts for date.'),
+            (2, 'Nonexistent time in timezone.')
+        ] * 2)
+        del errors[:]
+        minutes = (datetime(2008, 1, 1) - datetime(1970, 1, 1)).days * 1440
+        for output in ['epoch_minutes', 'epoch_seconds']:
+            self.assertEqual(
+                converter.convert_many(
+                    ['30.3.2008', '1.1.2008'],
+                    ['2:30', '1:00'],
+                    tzinfo,
+                    'de',
+                    onerror=lambda index, e: errors.append(index),
+                    workers=2,
+                    output=output
+                ),
+                converter.convert_many(
+                    ['30.3.2008', '1.1.2008'],
+                    ['2:30', '1:00'],
+                    tzinfo,
+                    'de',
+                    onerror=lambda index, e: errors.append(index),
+                    output=output
+                )
+            )
+        self.assertEqual(errors, [0, 0, 0, 0])
+        self.assertEqual(
+            converter.convert_many(
+                ['30.3.2008', '1.1.2008'],
+                ['2:30', '1:00'],
+                tzinfo,
+                'de',
+                workers=2,
+                output='epoch_minutes'
+            ),
+            array('q', [-2 ** 63, minutes])
+        )
+
+    def test_converter_output(self):
+        converter = IntelliDateTime()
+        dt = datetime(2008, 2, 29, 10, 30)
+        seconds = (dt - datetime(1970, 1, 1)).days * 86400 + 37800
+        self.assertEqual(
+            converter.convert('29.2.2008', '10:30', locale='de',
+                              output='epoch_seconds'),
+            seconds
+        )
+        self.assertEqual(
+            converter.convert('29.2.2008', '10:30', locale='de',
+                              output='epoch_minutes'),
+            seconds // 60
+        )
+        self.assertEqual(
+            converter.convert('29.2.2008', '10:30', locale='de',
+                              output='ordinal'),
+            dt.toordinal()
+        )
+        self.assertEqual(
+            convert('1969-12-31', '23:59', output='epoch_seconds'),
+            -60
+        )
+        # aware values are UTC based, ordinals are of the wall date
+        tzinfo = timezone(timedelta(hours=2))
+        self.assertEqual(
+            converter.convert('2008-02-29', '10:30', tzinfo,
+                              output='epoch_seconds'),
+            seconds - 7200
+        )
+        self.assertEqual(
+            converter.convert('2008-02-29', '00:30', tzinfo,
+                              output='ordinal'),
+            dt.toordinal()
+        )
+        # errors are the ones of datetime
+        for date, time in [('29.2.2007', None), ('1.13.2008', None),
+                           ('1.1.10000', None), ('1.1.2008', '24:00'),
+                           ('1.1.2008', '10:60'), ('0.1.2008', None)]:
+            for output in ['epoch_seconds', 'ordinal']:
+                with self.assertRaises(DateTimeConversionError) as expected:
+                    converter.convert(date, time, locale='de')
+                with self.assertRaises(DateTimeConversionError) as error:
+                    converter.convert(date, time, locale='de', output=output)
+                self.assertEqual(
+                    str(error.exception),
+                    str(expected.exception)
+                )
+        self.assertRaises(
+            ValueError,
+            converter.convert, '1.1.2008', output='unknown'
+        )
+        # batches are ``array('q')`` and failed rows are ``NAT``
+        errors = list()
+        result = converter.convert_many(
+            ['1.1.1970', '35.1.08', '2.1.1970'],
+            ['00:01', None, None],
+            locale='de',
+            onerror=lambda index, e: errors.append(index),
+            output='epoch_minutes'
+        )
+        self.assertEqual(result, array('q', [1, -2 ** 63, 1440]))
+        self.assertEqual(errors, [1])
+        self.assertEqual(
+            converter.convert_many(
+                iter(['1.1.1970', '2.1.1970']),
+                locale='de',
+                output='ordinal',
+                workers=2
+            ),
+            array('q', [719163, 719164])
+        )
+        self.assertEqual(
+            converter.convert_many(
+                ['1.1.1970', '', '2.1.1970'],
+                ['01:00'] * 3,
+                tzinfo=tzinfo,
+                locale='de',
+                output='epoch_seconds',
+                workers=2
+            ),
+            array('q', [-3600, -2 ** 63, 82800])
+        )
+        # cached results are kept per output
+        converter = IntelliDateTime(cache=10)
+        converter.convert('1970-01-02')
+        self.assertEqual(
+            converter.convert('1970-01-02', output='epoch_minutes'),
+            1440
+        )
+        self.assertEqual(converter.convert('1970-01-02', output='ordinal'),
+                         719164)
+
+    @unittest.skipIf(numpy is None, 'numpy not installed')
+    def test_converter_output_numpy(self):
+        converter = IntelliDateTime()
+        self.assertEqual(
+            converter.convert('2008-01-01', '10:30', output='datetime64'),
+            numpy.datetime64('2008-01-01T10:30')
+        )
+        result = converter.convert_many(
+            ['2008-01-01', '', '2008-01-02'],
+            output='datetime64'
+        )
+        self.assertEqual(result.dtype, numpy.dtype('datetime64[m]'))
+        self.assertEqual(
+            result.tolist(),
+            [datetime(2008, 1, 1), None, datetime(2008, 1, 2)]
+        )
+        result = converter.convert_many(
+            numpy.array(['1970-01-01', '1970-01-02']),
+            output='epoch_seconds'
+        )
+        self.assertEqual(result.dtype, numpy.dtype('int64'))
+        self.assertEqual(result.tolist(), [0, 86400])
+
+    def test_convert_many(self):
+        self.assertEqual(
+            convert_many(['1.1.08'], locale='de'),
+            [datetime(2008, 1, 1, 0, 0)]
+        )
+
+    def test_converter_convert_datetime(self):
+        converter = IntelliDateTime(clock=lambda: datetime(2026, 2, 1))
+        for value, locale, expected in [
+                ('17.10.2026 14:05', 'de', datetime(2026, 10, 17, 14, 5)),
+                ('10/17/26 2', 'en', datetime(2026, 10, 17, 2, 0)),
+                ('2026-10-17T1405', 'iso', datetime(2026, 10, 17, 14, 5)),
+                ('20261017T14:05', 'iso', datetime(2026, 10, 17, 14, 5)),
+                ('171026 1405', 'de', datetime(2026, 10, 17, 14, 5)),
+                ('202610171405', 'iso', datetime(2026, 10, 17, 14, 5)),
+                ('171020261405', 'de', datetime(2026, 10, 17, 14, 5)),
+                (b' 17.10.2026 14:05 ', 'de', datetime(2026, 10, 17, 14, 5)),
+                # without time
+                ('17.10.2026', 'de', datetime(2026, 10, 17, 0, 0)),
+                ('20261017', 'iso', datetime(2026, 10, 17, 0, 0)),
+                ('17.10.', 'de', datetime(2026, 10, 17, 0, 0))]:
+            self.assertEqual(
+                converter.convert_datetime(value, locale=locale),
+                expected
+            )
+        # errors are the ones of ``convert``
+        for value, date, time in [
+                ('', '', None),
+                ('17.10.2026 14:05:30', '17.10.2026', '14:05:30'),
+                ('17.10.2026 123', '17.10.2026', '123'),
+                ('31.2.2026 14:05', '31.2.2026', '14:05'),
+                ('17.10.2026 24:00', '17.10.2026', '24:00'),
+                ('1710202614', '1710202614', None)]:
+            with self.assertRaises(DateTimeConversionError) as expected:
+                converter.convert(date, time, locale='de')
+            with self.assertRaises(DateTimeConversionError) as error:
+                converter.convert_datetime(value, locale='de')
+            self.assertEqual(str(error.exception), str(expected.exception))
+        tzinfo = timezone(timedelta(hours=2))
+        self.assertEqual(
+            convert_datetime('2026-10-17 14:05', tzinfo,
+                             output='epoch_minutes'),
+            convert('2026-10-17', '14:05', tzinfo, output='epoch_minutes')
+        )
+        # extended grammar
+        converter = IntelliDateTime(extended=True, cache=10)
+        for value, locale in [('2026-10-17T14:05:30.5+02:00', 'iso'),
+                              ('20261017T140530.5+0200', 'iso'),
+                              ('17.10.2026 2:05:30.5 pm +2', 'de')]:
+            self.assertEqual(
+                converter.convert_datetime(value, locale=locale),
+                datetime(2026, 10, 17, 14, 5, 30, 500000, tzinfo)
+            )
+        self.assertEqual(
+            converter.convert_datetime('20261017140530'),
+            datetime(2026, 10, 17, 14, 5, 30)
+        )
+        self.assertEqual(converter.cache.misses, 4)
+        self.assertEqual(
+            converter.convert_datetime('20261017140530'),
+            datetime(2026, 10, 17, 14, 5, 30)
+        )
+        self.assertEqual(converter.cache.hits, 1)
+
+    def test_converter_validate(self):
+        converter = IntelliDateTime(clock=lambda: datetime(2007, 2, 1))
+        result = converter.validate('29.2.2008', '10:30', locale='de')
+        self.assertTrue(result)
+        self.assertEqual(result.code, None)
+        self.assertEqual(result.message, None)
+        self.assertEqual(result.value, None)
+        for date, time, code in [
+                (None, None, errors.EMPTY),
+                ('', '10:30', errors.EMPTY),
+                (object(), None, errors.EMPTY),
+                ('123', None, errors.NUMERIC_LENGTH),
+                ('1.1.2008', '123', errors.NUMERIC_LENGTH),
+                ('1.1.2008.1', None, errors.DATE_PARTS),
+                ('   ', None, errors.DATE_PARTS),
+                ('1.1.2008', '1:2:3', errors.TIME_PARTS),
+                ('1.1.2008', '01012008', errors.TIME_PARTS),
+                ('1.1.10000', None, errors.YEAR_RANGE),
+                ('1.1.' + '9' * 30, None, errors.YEAR_RANGE),
+                ('1.13.2008', None, errors.MONTH_RANGE),
+                ('29.2.2007', None, errors.DAY_RANGE),
+                # the year is resolved against the clock
+                ('29.2.', None, errors.DAY_RANGE),
+                ('1.1.2008', '24:00', errors.HOUR_RANGE),
+                ('1.1.2008', '10:60', errors.MINUTE_RANGE)]:
+            result = converter.validate(date, time, locale='de')
+            self.assertFalse(result)
+            self.assertEqual(result.code, code)
+            # messages are the ones ``convert`` raises with
+            with self.assertRaises(DateTimeConversionError) as error:
+                converter.convert(date, time, locale='de')
+            self.assertEqual(result.message, str(error.exception))
+            self.assertEqual(
+                converter.try_convert(date, time, locale='de').code,
+                code
+            )
+        self.assertEqual(
+            repr(converter.validate('29.2.2007', locale='de')),
+            '<ConversionResult day_range: day is out of range for month>'
+        )
+        self.assertEqual(validate('2008-01-32').code, errors.DAY_RANGE)
+
+    def test_converter_try_convert(self):
+        converter = IntelliDateTime()
+        result = converter.try_convert('29.2.2008', '10:30', locale='de')
+        self.assertTrue(result)
+        self.assertEqual(result.value, datetime(2008, 2, 29, 10, 30))
+        self.assertEqual(
+            repr(result),
+            '<ConversionResult datetime.datetime(2008, 2, 29, 10, 30)>'
+        )
+        self.assertEqual(
+            converter.try_convert('29.2.2008', locale='de',
+                                  output='ordinal').value,
+            datetime(2008, 2, 29).toordinal()
+        )
+        tzinfo = timezone(timedelta(hours=2))
+        self.assertEqual(
+            try_convert('2008-02-29', '10:30', tzinfo).value,
+            datetime(2008, 2, 29, 10, 30, tzinfo=tzinfo)
+        )
+        result = try_convert('2008-02-30')
+        self.assertEqual(result.value, None)
+        self.assertEqual(result.code, errors.DAY_RANGE)
+        with self.assertRaises(ValueError):
+            converter.try_convert('2008-02-29', output='foo')
+        # huge numbers are conversion errors
+        with self.assertRaises(DateTimeConversionError):
+            converter.convert('1.1.' + '9' * 30, locale='de')
+        with self.assertRaises(DateTimeConversionError):
+            converter.convert('1.1.' + '9' * 30, locale='de',
+                              output='ordinal')
+
+    def test_converter_format(self):
+        intelli = IntelliDateTime()
+        dt = datetime(2008, 4, 3, 10, 30)
+        self.assertEqual(intelli.format_datetime(dt), '2008-04-03')
+        self.assertEqual(intelli.format_datetime(dt, 'de'), '03.04.2008')
+        self.assertEqual(intelli.format_datetime(dt, 'en'), '04/03/2008')
+        self.assertEqual(
+            intelli.format_datetime(dt, 'de', time=True),
+            '03.04.2008 10:30'
+        )
+        self.assertEqual(
+            intelli.format_datetime(dt, 'de', packed=True),
+            '03042008'
+        )
+        self.assertEqual(
+            intelli.format_datetime(dt, 'de', packed=True, short=True),
+            '030408'
+        )
+        self.assertEqual(
+            intelli.format_datetime(
+                dt,
+                'de',
+                separator='/',
+                short=True,
+                time=True
+            ),
+            '03/04/08 10:30'
+        )
+        # years before 100 would be read back as two digit years
+        self.assertEqual(
+            intelli.format_datetime(datetime(12, 1, 2), 'de', packed=True),
+            '02010012'
+        )
+        with self.assertRaises(DateTimeConversionError) as error:
+            intelli.format_datetime(datetime(12, 1, 2), 'de')
+        self.assertEqual(
+            str(error.exception),
+            'Years before 100 are formatted packed only.'
+        )
+        self.assertEqual(
+            intelli.format_datetime(datetime(100, 1, 2), 'de'),
+            '02.01.0100'
+        )
+        # dates are formatted as well, patterns may be given as locale
+        self.assertEqual(
+            intelli.format_datetime(dt.date(), 'M D Y'),
+            '04/03/2008'
+        )
+        self.assertEqual(converter.format_datetime(dt, 'de-AT'), '03.04.2008')
+        self.assertEqual(
+            formatter.Template('D M Y', 'M H', time=True).render(dt),
+            '03.04.2008 30:10'
+        )
+        # templates are compiled once per form
+        self.assertTrue(
+            intelli._template('de', False, False, False, None)
+            is intelli._template('de-de', False, False, False, None)
+        )
+        for value in [None, '2008-04-03', 20080403]:
+            self.assertRaises(
+                DateTimeConversionError,
+                intelli.format_datetime, value, 'de'
+            )
+        self.assertRaises(
+            DateTimeConversionError,
+            intelli.format_datetime, dt.date(), time=True
+        )
+
+    def test_converter_format_datetimes(self):
+        values = [datetime(2008, 4, 3, 10, 30), None, datetime(2009, 1, 2)]
+        self.assertEqual(
+            format_datetimes(values, 'de', time=True),
+            ['03.04.2008 10:30', None, '02.01.2009 00:00']
+        )
+        self.assertEqual(
+            format_datetimes(iter(values), 'en', packed=True),
+            ['04032008', None, '01022009']
+        )
+        self.assertRaises(
+            DateTimeConversionError,
+            format_datetimes, values + ['2008'], 'de'
+        )
+        failures = list()
+        self.assertEqual(
+            format_datetimes(
+                values + ['2008'],
+                onerror=lambda index, e: failures.append(index)
+            ),
+            ['2008-04-03', None, '2009-01-02', None]
+        )
+        self.assertEqual(failures, [3])
+        if numpy is not None:
+            self.assertEqual(
+                format_datetimes(
+                    numpy.array(
+                        ['2008-04-03T10:30', 'NaT'],
+                        dtype='datetime64[ns]'
+                    ),
+                    'de',
+                    time=True
+                ),
+                ['03.04.2008 10:30', None]
+            )
+
+    def test_converter_format_roundtrip(self):
+        now = datetime(2026, 10, 17)
+        intelli = IntelliDateTime(clock=lambda: now)
+        rnd = random.Random(23)
+        first = datetime(100, 1, 1).toordinal()
+        last = datetime(9999, 12, 31).toordinal()
+        century = datetime(2000, 1, 1).toordinal()
+        for locale in ['iso', 'de', 'en', 'ja', 'hu', 'D M Y', 'M D Y']:
+            for _ in range(500):
+                dt = datetime.fromordinal(rnd.randint(first, last)).replace(
+                    hour=rnd.randint(0, 23),
+                    minute=rnd.randint(0, 59)
+                )
+                for packed in [False, True]:
+                    self.assertEqual(
+                        intelli.convert(
+                            intelli.format_datetime(dt, locale, packed=packed),
+                            locale=locale
+                        ),
+                        dt.replace(hour=0, minute=0)
+                    )
+                    self.assertEqual(
+                        intelli.convert_datetime(
+                            intelli.format_datetime(
+                                dt,
+                                locale,
+                                time=True,
+                                packed=packed
+                            ),
+                            locale=locale
+                        ),
+                        dt
+                    )
+                # years before 100 round trip packed
+                dt = datetime.fromordinal(rnd.randint(1, first - 1))
+                self.assertEqual(
+                    intelli.convert(
+                        intelli.format_datetime(dt, locale, packed=True),
+                        locale=locale
+                    ),
+                    dt
+                )
+                # two digit years are resolved against the current century
+                dt = datetime.fromordinal(
+                    rnd.randint(century, century + 36524)
+                )
+                for packed in [False, True]:
+                    self.assertEqual(
+                        intelli.convert(
+                            intelli.format_datetime(
+                                dt,
+                                locale,
+                                packed=packed,
+                                short=True
+                            ),
+                            locale=locale
+                        ),
+                        dt
+                    )
+
+    def test_converter_extended(self):
+        converter = IntelliDateTime(extended=True)
+        utc = timezone.utc
+        plus2 = timezone(timedelta(hours=2))
+        for time, expected in [
+                # regular grammar
+                ('10:30', datetime(2008, 1, 1, 10, 30)),
+                ('1030', datetime(2008, 1, 1, 10, 30)),
+                ('10', datetime(2008, 1, 1, 10, 0)),
+                ('10-30', datetime(2008, 1, 1, 10, 30)),
+                ('010h', datetime(2008, 1, 1, 10, 0)),
+                ('14:05 Uhr', datetime(2008, 1, 1, 14, 5)),
+                ('14.05.30', datetime(2008, 1, 1, 14, 5, 30)),
+                # seconds and fractions
+                ('10:30:15', datetime(2008, 1, 1, 10, 30, 15)),
+                ('103015', datetime(2008, 1, 1, 10, 30, 15)),
+                ('10.30.15,5', datetime(2008, 1, 1, 10, 30, 15, 500000)),
+                ('10:30:15.1234567', datetime(2008, 1, 1, 10, 30, 15, 123456)),
+                # meridiem
+                ('2pm', datetime(2008, 1, 1, 14, 0)),
+                ('2:30 P.M.', datetime(2008, 1, 1, 14, 30)),
+                ('12 am', datetime(2008, 1, 1, 0, 0)),
+                ('12:15 pm', datetime(2008, 1, 1, 12, 15)),
+                # offsets
+                ('14:05:30.123+02:00',
+                 datetime(2008, 1, 1, 14, 5, 30, 123000, plus2)),
+                ('1405+0200', datetime(2008, 1, 1, 14, 5, tzinfo=plus2)),
+                ('14:05 +2', datetime(2008, 1, 1, 14, 5, tzinfo=plus2)),
+                ('2pm -05:30', datetime(
+                    2008, 1, 1, 14, 0,
+                    tzinfo=timezone(-timedelta(hours=5, minutes=30))
+                )),
+                ('143000Z', datetime(2008, 1, 1, 14, 30, tzinfo=utc)),
+                ('14:30 UTC+2', datetime(2008, 1, 1, 14, 30, tzinfo=plus2)),
+                (b'14:30:01Z', datetime(2008, 1, 1, 14, 30, 1, tzinfo=utc))]:
+            self.assertEqual(
+                converter.convert('1.1.2008', time, locale='de'),
+                expected
+            )
+            self.assertEqual(
+                converter.try_convert('1.1.2008', time, locale='de').value,
+                expected
+            )
+        for time, code in [
+                ('13pm', errors.TIME_SYNTAX),
+                ('2pm 30', errors.TIME_SYNTAX),
+                ('10:30:15.', errors.TIME_SYNTAX),
+                # fractions of minutes are no seconds
+                ('14:05.5', errors.TIME_SYNTAX),
+                ('1405.5', errors.TIME_SYNTAX),
+                # unknown words like timezone abbreviations are not skipped
+                ('14:05 CET', errors.TIME_SYNTAX),
+                ('14:05 foo', errors.TIME_SYNTAX),
+                ('14:30 Z 5', errors.TIME_SYNTAX),
+                ('14:30+', errors.OFFSET_RANGE),
+                ('14:30+24', errors.OFFSET_RANGE),
+                ('14:30+02:00:00', errors.OFFSET_RANGE),
+                ('123', errors.NUMERIC_LENGTH),
+                ('1:2:3:4', errors.TIME_PARTS),
+                ('10:30:60', errors.SECOND_RANGE),
+                ('24:00:00', errors.HOUR_RANGE)]:
+            result = converter.validate('1.1.2008', time, locale='de')
+            self.assertEqual(result.code, code)
+            with self.assertRaises(DateTimeConversionError) as error:
+                converter.convert('1.1.2008', time, locale='de')
+            self.assertEqual(result.message, str(error.exception))
+        # the regular grammar is the default
+        with self.assertRaises(DateTimeConversionError):
+            convert('1.1.2008', '10:30:15', locale='de')
+        # given offsets are converted to tzinfo
+        self.assertEqual(
+            converter.convert('2008-01-01', '14:00+02:00', utc),
+            datetime(2008, 1, 1, 12, 0, tzinfo=utc)
+        )
+        seconds = (datetime(2008, 1, 1) - datetime(1970, 1, 1)).days * 86400
+        self.assertEqual(
+            converter.convert('2008-01-01', '14:00:30+02:00',
+                              output='epoch_seconds'),
+            seconds + 12 * 3600 + 30
+        )
+        self.assertEqual(
+            converter.convert_many(
+                ['2008-01-01', '2008-01-01'],
+                ['14:00:30', '10:30:15 pm'],
+                output='epoch_seconds',
+                workers=2
+            ),
+            array('q', [seconds + 14 * 3600 + 30, seconds + 22 * 3600 + 1815])
+        )
+        self.assertEqual(
+            records.convert_records(
+                b'2008-01-01 2:30:15pm', 20, (0, 10), (11, 9),
+                converter=converter
+            ),
+            [datetime(2008, 1, 1, 14, 30, 15)]
+        )
+
+    @unittest.skipIf(ZoneInfo is None, 'zoneinfo not available')
+    def test_converter_validate_wall_time(self):
+        tzinfo = ZoneInfo('Europe/Vienna')
+        self.assertTrue(validate('2008-03-30', '2:30', tzinfo))
+        converter = IntelliDateTime(localizer=tz.Localizer(gap=tz.RAISE))
+        result = converter.validate('2008-03-30', '2:30', tzinfo)
+        self.assertEqual(result.code, errors.WALL_TIME)
+        self.assertEqual(result.message, 'Nonexistent time in timezone.')
+        self.assertTrue(converter.validate('2008-10-26', '2:30', tzinfo))
+
+
+class TestLocales(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_order(self):
+        self.assertEqual(locales.order('dd.MM.yy', 'YMD'), 'D M Y')
+        self.assertEqual(locales.order('M/d/yy', 'YMD'), 'M D Y')
+        self.assertEqual(locales.order("d 'de' MMMM y", 'YMD'), 'D M Y')
+        self.assertEqual(locales.order('y. MM. dd.', 'YMD'), 'Y M D')
+        self.assertEqual(locales.order('h:mm a', 'HM'), 'H M')
+        self.assertEqual(locales.order('MMMM y', 'YMD'), None)
+
+    def test_registry(self):
+        registry = locales.LocaleRegistry()
+        self.assertTrue(len(registry) > 300)
+        self.assertTrue('de' in registry)
+        self.assertEqual(registry.resolve('de'), ('D M Y', 'H M'))
+        # region fallback, case and separator insensitive
+        self.assertEqual(registry.date('de-AT'), 'D M Y')
+        self.assertEqual(registry.date('de_at'), 'D M Y')
+        self.assertEqual(registry.date('en-US'), 'M D Y')
+        self.assertEqual(registry.date('en-GB'), 'D M Y')
+        self.assertEqual(registry.date('pt-BR'), 'D M Y')
+        self.assertEqual(registry.date('ja-JP'), 'Y M D')
+        self.assertEqual(registry.date('zh-Hant-TW'), 'Y M D')
+        self.assertEqual(registry.resolve('xx-YY'), ('Y M D', 'H M'))
+        self.assertEqual(registry.resolve(None), ('Y M D', 'H M'))
+        # memoized per locale string
+        entries, resolved = registry.snapshot()
+        self.assertTrue(resolved['de_at'] is registry.resolve('de'))
+        registry.register('de-AT', 'Y M D', 'M H')
+        # registration replaces the snapshot
+        self.assertEqual(entries.get('de-at'), None)
+        self.assertEqual(resolved['de_at'], ('D M Y', 'H M'))
+        self.assertFalse(registry.snapshot()[0] is entries)
+        self.assertEqual(registry.resolve('de_at'), ('Y M D', 'M H'))
+        self.assertEqual(registry.resolve('de-at-vienna'), ('Y M D', 'M H'))
+        self.assertEqual(registry.resolve('de'), ('D M Y', 'H M'))
+        self.assertRaises(ValueError, registry.register, 'xx', 'Y M')
+        self.assertRaises(ValueError, registry.register, 'xx', 'Y M D', 'H')
+        empty = locales.LocaleRegistry(path=None)
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(empty.date('de'), 'Y M D')
+        # the memo of locale strings is bound
+        for index in range(locales.MAX_RESOLVED + 10):
+            empty.resolve('x-{}'.format(index))
+        self.assertEqual(len(empty.snapshot()[1]), locales.MAX_RESOLVED)
+        self.assertEqual(empty.resolve('x-5000'), ('Y M D', 'H M'))
+        # entries take precedence over the data file
+        registry = locales.LocaleRegistry(entries={'DE': ('Y M D', 'M H')})
+        self.assertEqual(registry.resolve('de-AT'), ('Y M D', 'M H'))
+
+    def test_locale_pattern(self):
+        pattern = LocalePattern()
+        self.assertEqual(pattern.date('pt-BR'), 'D M Y')
+        self.assertEqual(pattern.date('en-US'), 'M D Y')
+        self.assertEqual(pattern.date('uk'), 'D M Y')
+        self.assertEqual(pattern.date('iso'), 'Y M D')
+        self.assertEqual(pattern.date('ISO'), 'Y M D')
+        # built-in patterns are looked up in the registry
+        for locale, date in LocalePattern.PATTERNS['date'].items():
+            self.assertEqual(locales.registry.date(locale), date)
+        self.assertRaises(
+            TypeError,
+            operator.setitem, LocalePattern.PATTERNS['date'], 'xx', 'D M Y'
+        )
+        snapshot = locales.registry.snapshot()
+        try:
+            # registered patterns apply to all spellings and regions
+            locales.registry.register('de', 'M D Y')
+            for locale in ['de', 'DE', 'de_AT', 'de-at', 'de-LI']:
+                self.assertEqual(pattern.date(locale), 'M D Y')
+        finally:
+            locales.registry._snapshot = snapshot
+        self.assertEqual(pattern.date('de'), 'D M Y')
+        self.assertEqual(
+            convert('2/1/2008', locale='en-US'),
+            datetime(2008, 2, 1)
+        )
+        self.assertEqual(
+            convert('2/1/2008', locale='pt-BR'),
+            datetime(2008, 1, 2)
+        )
+
+    @unittest.skipIf(babel is None, 'babel not installed')
+    def test_generate(self):
+        out = io.StringIO()
+        locales.generate(out)
+        path = os.path.join(self.tempdir, 'locales.txt')
+        with open(path, 'w') as f:
+            f.write(out.getvalue())
+        registry = locales.LocaleRegistry(path=path)
+        self.assertEqual(registry.date('en'), 'M D Y')
+        self.assertEqual(registry.date('de-AT'), 'D M Y')
+        self.assertEqual(registry.date('ja'), 'Y M D')
+        # entries equal to their fallback are omitted
+        self.assertFalse('de-at' in registry)
+
+
+class TestInfer(unittest.TestCase):
+
+    def test_inference(self):
+        dates = ['%02i.%02i.2008' % (day, month)
+                 for day in range(1, 29) for month in range(1, 13)]
+        inference = infer.PatternInference(margin=5)
+        self.assertEqual(inference.pattern, 'Y M D')
+        self.assertFalse(inference.feed('01.02.2008'))
+        self.assertEqual(inference.decisive, 1)
+        self.assertEqual(
+            inference.scores,
+            {'Y M D': 1, 'D M Y': 0, 'M D Y': 0}
+        )
+        # early termination
+        inference.feed_many(dates)
+        self.assertTrue(inference.done)
+        self.assertEqual(inference.pattern, 'D M Y')
+        self.assertEqual(inference.rows, 150)
+        self.assertTrue(inference.feed('garbage'))
+        self.assertEqual(inference.rows, 150)
+        # ambiguous values are scored up to sample, ties prefer the first
+        # pattern
+        inference = infer.PatternInference(
+            patterns=['M D Y', 'D M Y'],
+            sample=10
+        ).feed_many(['01.02.2008'] * 20)
+        self.assertEqual(inference.rows, 10)
+        self.assertEqual(inference.decisive, 0)
+        self.assertEqual(inference.pattern, 'M D Y')
+        # values failing for all patterns do not count
+        inference = infer.PatternInference(margin=2).feed_many(
+            ['', '1.1.1.1', None, '2008-13-13', '2008-01-13', '2008-01-14']
+        )
+        self.assertEqual(inference.pattern, 'Y M D')
+        self.assertEqual(inference.decisive, 2)
+
+    def test_prefetch(self):
+        inference = infer.PatternInference(margin=1)
+        rows = iter([('13.1.2008',), ('x',), ('y',)])
+        rows = infer.prefetch(rows, inference, value=lambda row: row[0])
+        self.assertEqual(inference.pattern, 'D M Y')
+        self.assertEqual(inference.rows, 1)
+        self.assertEqual(list(rows), [('13.1.2008',), ('x',), ('y',)])
+
+    def test_convert_many(self):
+        self.assertEqual(LocalePattern().date('M D Y'), 'M D Y')
+        self.assertEqual(LocalePattern().time('M D Y'), 'H M')
+        dates = ['01.02.2008', '13.02.2008', '14.02.2008']
+        expected = [
+            datetime(2008, 2, 1),
+            datetime(2008, 2, 13),
+            datetime(2008, 2, 14)
+        ]
+        self.assertEqual(convert_many(dates, locale='infer'), expected)
+        self.assertEqual(convert_many(iter(dates), locale='infer'), expected)
+        self.assertEqual(
+            convert_many(iter(dates), locale='infer', output='ordinal'),
+            array('q', [dt.toordinal() for dt in expected])
+        )
+        if numpy is not None:
+            self.assertEqual(
+                convert_many(numpy.array(dates), locale='infer').tolist(),
+                expected
+            )
+
+    def test_convert_stream(self):
+        rows = [{'date': '%i/13/2008' % month} for month in range(1, 13)]
+        result = list(stream.convert_stream(
+            iter(rows),
+            'date',
+            locale='infer'
+        ))
+        self.assertEqual(len(result), 12)
+        self.assertEqual(result[0], (rows[0], datetime(2008, 1, 13)))
+
+
+class TestRecords(unittest.TestCase):
+
+    data = (
+        b'01.02.2008 1030\n'
+        b'03022008   0915\n'
+        b'35.01.2008 1030\n'
+        b'  29.2.08  2359\n'
+    )
+
+    def test_convert_records(self):
+        errors = list()
+        self.assertEqual(
+            records.convert_records(
+                self.data, 16, (0, 10), (11, 4), locale='de',
+                onerror=lambda index, e: errors.append((index, str(e)))
+            ),
+            [
+                datetime(2008, 2, 1, 10, 30),
+                datetime(2008, 2, 3, 9, 15),
+                None,
+                datetime(2008, 2, 29, 23, 59)
+            ]
+        )
+        self.assertEqual(errors, [(2, 'day is out of range for month')])
+        # without time, offset and count
+        self.assertEqual(
+            records.convert_records(
+                bytearray(self.data), 16, (0, 10), locale='de',
+                offset=16, count=1
+            ),
+            [datetime(2008, 2, 3, 0, 0)]
+        )
+        self.assertEqual(
+            records.convert_records(
+                memoryview(self.data), 16, (0, 10), (11, 4), locale='de',
+                output='epoch_minutes'
+            ),
+            array('q', [
+                int((datetime(2008, 2, 1, 10, 30) -
+                     datetime(1970, 1, 1)).total_seconds()) // 60,
+                int((datetime(2008, 2, 3, 9, 15) -
+                     datetime(1970, 1, 1)).total_seconds()) // 60,
+                -2 ** 63,
+                int((datetime(2008, 2, 29, 23, 59) -
+                     datetime(1970, 1, 1)).total_seconds()) // 60,
+            ])
+        )
+        with self.assertRaises(ValueError):
+            records.convert_records(self.data, 16, (0, 10), output='foo')
+
+    def test_convert_records_mmap(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(self.data)
+            f.flush()
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self.assertEqual(
+                    records.convert_records(
+                        buffer, 16, (0, 10), (11, 4), locale='de',
+                        output='ordinal'
+                    ),
+                    array('q', [733073, 733075, -2 ** 63, 733101])
+                )
+            finally:
+                buffer.close()
+
+
+class TestTimezone(unittest.TestCase):
+
+    def check_vienna(self, vienna):
+        converter = IntelliDateTime()
+
+        def convert(date, time):
+            dt = converter.convert(date, time, vienna)
+            return dt.replace(tzinfo=None), dt.utcoffset(), dt.tzname()
+
+        hour = timedelta(hours=1)
+        self.assertEqual(
+            convert('2008-1-1', '10:00'),
+            (datetime(2008, 1, 1, 10, 0), hour, 'CET')
+        )
+        self.assertEqual(
+            convert('2008-7-1', '10:00')[1:],
+            (2 * hour, 'CEST')
+        )
+        # Wall time is kept around transitions
+        self.assertEqual(convert('2008-3-30', '1:59')[1:], (hour, 'CET'))
+        self.assertEqual(convert('2008-3-30', '3:00')[1:], (2 * hour, 'CEST'))
+        self.assertEqual(convert('2008-10-26', '1:59')[1:], (2 * hour, 'CEST'))
+        self.assertEqual(convert('2008-10-26', '3:00')[1:], (hour, 'CET'))
+        # Default policy uses the offset after the transition for gaps and
+        # folds
+        dt, offset, name = convert('2008-3-30', '2:30')
+        self.assertEqual((dt.hour, dt.minute, offset), (2, 30, 2 * hour))
+        dt, offset, name = convert('2008-10-26', '2:30')
+        self.assertEqual((dt.hour, dt.minute, offset), (2, 30, hour))
+        # Configured policies
+        converter = IntelliDateTime(
+            localizer=tz.Localizer(gap=tz.EARLIER, fold=tz.EARLIER)
+        )
+        self.assertEqual(
+            converter.convert('2008-3-30', '2:30', vienna).utcoffset(),
+            hour
+        )
+        self.assertEqual(
+            converter.convert('2008-10-26', '2:30', vienna).utcoffset(),
+            2 * hour
+        )
+        converter = IntelliDateTime(
+            localizer=tz.Localizer(gap=tz.RAISE, fold=tz.RAISE)
+        )
+        err = self.expect_error(
+            converter.convert,
+            '2008-3-30', '2:30', vienna
+        )
+        self.assertEqual(str(err), 'Nonexistent time in timezone.')
+        err = self.expect_error(
+            converter.convert,
+            '2008-10-26', '2:30', vienna
+        )
+        self.assertEqual(str(err), 'Ambiguous time in timezone.')
+        self.assertEqual(
+            converter.convert('2008-10-26', '3:00', vienna).utcoffset(),
+            hour
+        )
+
+    def expect_error(self, func, *args):
+        try:
+            func(*args)
+        except DateTimeConversionError as e:
+            return e
+        raise Exception('Expected DateTimeConversionError')
+
+    @unittest.skipIf(pytz is None, 'pytz not installed')
+    def test_pytz(self):
+        self.check_vienna(pytz.timezone('Europe/Vienna'))
+
+    @unittest.skipIf(ZoneInfo is None, 'zoneinfo not available')
+    def test_zoneinfo(self):
+        self.check_vienna(ZoneInfo('Europe/Vienna'))
+
+    def test_fixed_offset(self):
+        converter = IntelliDateTime()
+        self.assertEqual(
+            converter.convert('2008-1-1', '10:00', timezone.utc),
+            datetime(2008, 1, 1, 10, 0, tzinfo=timezone.utc)
+        )
+        offset = timezone(timedelta(hours=-5))
+        self.assertEqual(
+            converter.convert('2008-1-1', '10:00', offset).utcoffset(),
+            timedelta(hours=-5)
+        )
+
+    @unittest.skipIf(ZoneInfo is None, 'zoneinfo not available')
+    def test_transition_table_eviction(self):
+        localizer = tz.Localizer(maxsize=2)
+        vienna = ZoneInfo('Europe/Vienna')
+        first = localizer.table(vienna, 2000)
+        second = localizer.table(vienna, 2001)
+        # Lookups keep tables recently used
+        self.assertTrue(localizer.table(vienna, 2000) is first)
+        localizer.table(vienna, 2002)
+        self.assertEqual(len(localizer), 2)
+        self.assertEqual(localizer.evictions, 1)
+        self.assertTrue(localizer.table(vienna, 2000) is first)
+        # The least recently used table got evicted and is computed again
+        self.assertFalse(localizer.table(vienna, 2001) is second)
+        self.assertEqual(localizer.evictions, 2)
+        # Offsets of evicted years stay correct
+        self.assertEqual(
+            localizer.offset(datetime(2001, 7, 1), vienna),
+            7200
+        )
+
+    @unittest.skipIf(ZoneInfo is None, 'zoneinfo not available')
+    def test_transition_table(self):
+        localizer = tz.Localizer()
+        vienna = ZoneInfo('Europe/Vienna')
+        table = localizer.table(vienna, 2008)
+        self.assertTrue(localizer.table(vienna, 2008) is table)
+        self.assertEqual(len(table.transitions), 2)
+        # Wall clock gap and fold
+        gap, fold = table.transitions
+        self.assertEqual(
+            gap[:2],
+            (
+                tz.wall_seconds(datetime(2008, 3, 30, 2, 0)),
+                tz.wall_seconds(datetime(2008, 3, 30, 3, 0))
+            )
+        )
+        self.assertEqual(
+            fold[:2],
+            (
+                tz.wall_seconds(datetime(2008, 10, 26, 2, 0)),
+                tz.wall_seconds(datetime(2008, 10, 26, 3, 0))
+            )
+        )
+        self.assertEqual(
+            localizer.offset(datetime(2008, 7, 1), vienna),
+            7200
+        )
+        # Years without transitions
+        self.assertEqual(localizer.table(vienna, 1960).transitions, [])
+        self.assertEqual(
+            localizer.table(ZoneInfo('UTC'), 1).transitions,
+            []
+        )
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def test_convert_stream(self):
+        rows = [
+            {'date': '1.1.08', 'time': '10:30'},
+            {'date': '35.1.08', 'time': ''},
+            {'time': '10:30'},
+            {'date': '02022008', 'time': '1015'}
+        ]
+        rejected = list()
+        result = stream.convert_stream(
+            iter(rows),
+            'date',
+            'time',
+            locale='de',
+            onerror=lambda row, e: rejected.append((row, str(e))),
+            chunksize=3
+        )
+        # Conversion is lazy
+        self.assertEqual(rejected, [])
+        self.assertEqual(list(result), [
+            (rows[0], datetime(2008, 1, 1, 10, 30)),
+            (rows[3], datetime(2008, 2, 2, 10, 15))
+        ])
+        self.assertEqual(rejected, [
+            (rows[1], 'day is out of range for month'),
+            (rows[2], 'Invalid date input.')
+        ])
+        # Rows as lists
+        self.assertEqual(
+            list(stream.convert_stream([['x', '20080201']], 1)),
+            [(['x', '20080201'], datetime(2008, 2, 1, 0, 0))]
+        )
+        # Rows as strings, rejected rows are skipped without callback
+        self.assertEqual(
+            list(stream.convert_stream(['20080201', 'foo'])),
+            [('20080201', datetime(2008, 2, 1, 0, 0))]
+        )
+        self.assertEqual(
+            list(stream.read_lines(io.StringIO(u'a\r\nb\n'))),
+            [u'a', u'b']
+        )
+
+    def write_file(self, name, data):
+        path = os.path.join(self.tempdir, name)
+        with io.open(path, 'w', newline='') as f:
+            f.write(data)
+        return path
+
+    def read_file(self, name):
+        with io.open(os.path.join(self.tempdir, name), newline='') as f:
+            return f.read()
+
+    def test_main_csv(self):
+        path = self.write_file(
+            'in.csv',
+            u'date;time;name\r\n'
+            u'1.1.08;10:30;a\r\n'
+            u'35.1.08;;b\r\n'
+            u'02022008;1015;c\r\n'
+        )
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = stream.main([
+                path,
+                '-o', os.path.join(self.tempdir, 'out.csv'),
+                '-r', os.path.join(self.tempdir, 'rejects.csv'),
+                '-t', 'time',
+                '-l', 'de',
+                '--delimiter', ';'
+            ])
+        # Rejected rows are saved, only their number is reported
+        self.assertEqual(status, 0)
+        self.assertEqual(stderr.getvalue(), 'Rejected rows: 1\n')
+        self.assertEqual(
+            self.read_file('out.csv'),
+            u'date;time;name\r\n'
+            u'2008-01-01T10:30:00;10:30;a\r\n'
+            u'2008-02-02T10:15:00;1015;c\r\n'
+        )
+        self.assertEqual(
+            self.read_file('rejects.csv'),
+            u'date;time;name\r\n35.1.08;;b\r\n'
+        )
+
+    def test_main_csv_ragged(self):
+        # Rows with more fields than the header are rejected unchanged
+        path = self.write_file(
+            'in.csv',
+            u'date,name\r\n'
+            u'20080101,a\r\n'
+            u'20080102,b,extra\r\n'
+            u'20080103,c\r\n'
+        )
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = stream.main([
+                path,
+                '-o', os.path.join(self.tempdir, 'out.csv'),
+                '-r', os.path.join(self.tempdir, 'rejects.csv')
+            ])
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            self.read_file('out.csv'),
+            u'date,name\r\n'
+            u'2008-01-01T00:00:00,a\r\n'
+            u'2008-01-03T00:00:00,c\r\n'
+        )
+        self.assertEqual(
+            self.read_file('rejects.csv'),
+            u'date,name\r\n20080102,b,extra\r\n'
+        )
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = stream.main([
+                path,
+                '-o', os.path.join(self.tempdir, 'out.csv')
+            ])
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            stderr.getvalue(),
+            "Rejected {'date': '20080102', 'name': 'b', None: ['extra']}: "
+            "More fields than in the header.\n"
+            "Rejected rows: 1\n"
+        )
+
+    def test_main_csv_no_header(self):
+        path = self.write_file('in.csv', u'x,1.1.08\r\ny,foo\r\n')
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = stream.main([
+                path,
+                '-o', os.path.join(self.tempdir, 'out.csv'),
+                '-d', '1',
+                '-l', 'de',
+                '--no-header'
+            ])
+        self.assertEqual(
+            self.read_file('out.csv'),
+            u'x,2008-01-01T00:00:00\r\n'
+        )
+        # Without rejects file, rejected rows are reported and fail the run
+        self.assertEqual(status, 1)
+        self.assertEqual(
+            stderr.getvalue(),
+            "Rejected ['y', 'foo']: Invalid number of parts for date.\n"
+            "Rejected rows: 1\n"
+        )
+
+    def test_main_lines(self):
+        path = self.write_file('in.txt', u'20080101\nfoo\n2008-2-3\n')
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            stream.main([
+                path,
+                '-f', 'lines',
+                '-o', os.path.join(self.tempdir, 'out.txt'),
+                '-r', os.path.join(self.tempdir, 'rejects.txt')
+            ])
+        self.assertEqual(
+            self.read_file('out.txt'),
+            u'2008-01-01T00:00:00\n2008-02-03T00:00:00\n'
+        )
+        self.assertEqual(self.read_file('rejects.txt'), u'foo\n')
+
+
+class TestAio(unittest.TestCase):
+
+    def test_convert(self):
+        async def run():
+            async with aio.AsyncConverter(window=0.01) as converter:
+                results = await asyncio.gather(
+                    converter.convert('1.1.2008', '10:30', locale='de'),
+                    converter.convert('35.1.2008', locale='de'),
+                    converter.convert('2008-01-02'),
+                    converter.convert(
+                        '2008-01-02',
+                        output='epoch_minutes'
+                    ),
+                    return_exceptions=True
+                )
+                # one batch per locale, timezone and output
+                self.assertEqual(converter.batches, 3)
+                self.assertEqual(converter.pending, 0)
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual(results[0], datetime(2008, 1, 1, 10, 30))
+        self.assertTrue(isinstance(results[1], DateTimeConversionError))
+        self.assertEqual(str(results[1]), 'day is out of range for month')
+        self.assertEqual(results[2], datetime(2008, 1, 2))
+        self.assertEqual(results[3], 13880 * 1440)
+
+    def test_batchsize(self):
+        async def run():
+            converter = aio.AsyncConverter(window=10, batchsize=4)
+            results = await asyncio.gather(*[
+                converter.convert('%i.1.2008' % day, locale='de')
+                for day in range(1, 9)
+            ])
+            self.assertEqual(converter.batches, 2)
+            with self.assertRaises(ValueError):
+                await converter.convert('1.1.2008', output='unknown')
+            return results
+
+        self.assertEqual(
+            asyncio.run(run()),
+            [datetime(2008, 1, day) for day in range(1, 9)]
+        )
+
+    def test_executor(self):
+        async def run():
+            with ThreadPoolExecutor(2) as executor:
+                async with aio.AsyncConverter(
+                    executor=executor,
+                    batchsize=3
+                ) as converter:
+                    return await asyncio.gather(
+                        *[
+                            converter.convert(date, locale='de')
+                            for date in ['1.1.08', '', '3.1.08', '4.1.08']
+                        ],
+                        return_exceptions=True
+                    )
+
+        results = asyncio.run(run())
+        self.assertEqual(results[0], datetime(2008, 1, 1))
+        self.assertEqual(str(results[1]), 'Invalid date input.')
+        self.assertEqual(results[3], datetime(2008, 1, 4))
+
+    def test_limit(self):
+        async def run():
+            converter = aio.AsyncConverter(window=0.001, limit=3)
+            tasks = [
+                asyncio.ensure_future(
+                    converter.convert('%i.1.2008' % day, locale='de')
+                )
+                for day in range(1, 11)
+            ]
+            await asyncio.sleep(0)
+            # calls beyond the limit wait for a slot
+            self.assertEqual(converter.pending, 3)
+            tasks[4].cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            self.assertEqual(converter._active, 0)
+            return results
+
+        results = asyncio.run(run())
+        self.assertTrue(isinstance(results[4], asyncio.CancelledError))
+        del results[4]
+        self.assertEqual(
+            results,
+            [datetime(2008, 1, day) for day in range(1, 11) if day != 5]
+        )
+
+
+class TestThreads(unittest.TestCase):
+
+    def setUp(self):
+        self.snapshot = locales.registry.snapshot()
+
+    def tearDown(self):
+        locales.registry._snapshot = self.snapshot
+
+    def test_shared(self):
+        self.assertTrue(isinstance(shared, IntelliDateTime))
+        self.assertEqual(shared.cache, None)
+        with shared.reference(datetime(2008, 2, 1)):
+            # module level functions use the shared converter
+            self.assertEqual(convert('3', locale='de'), datetime(2008, 2, 3))
+
+    def test_locale_pattern_register(self):
+        entries = locales.registry.snapshot()[0]
+        LocalePattern.register('xx', 'M D Y')
+        # copy on write
+        self.assertFalse(locales.registry.snapshot()[0] is entries)
+        self.assertFalse('xx' in entries)
+        self.assertRaises(TypeError, operator.setitem, entries, 'xx', None)
+        self.assertEqual(LocalePattern().date('xx'), 'M D Y')
+        self.assertEqual(LocalePattern().time('xx'), 'H M')
+        LocalePattern.register('xx', time='M H')
+        self.assertEqual(LocalePattern().date('xx'), 'M D Y')
+        self.assertEqual(LocalePattern().time('xx'), 'M H')
+        self.assertEqual(
+            convert('1.2.2008', '30:10', locale='xx'),
+            datetime(2008, 1, 2, 10, 30)
+        )
+        # patterns are validated
+        self.assertRaises(ValueError, LocalePattern.register, 'zz', 'bogus')
+        self.assertRaises(
+            ValueError,
+            LocalePattern.register, 'zz', time='H H'
+        )
+        self.assertEqual(
+            convert('2008-01-02', locale='zz'),
+            datetime(2008, 1, 2)
+        )
+
+    def test_concurrent(self):
+        expected = {
+            'D M Y': datetime(2008, 2, 1, 10, 30),
+            'M D Y': datetime(2008, 1, 2, 10, 30),
+        }
+        failures = list()
+        stop = threading.Event()
+
+        def register():
+            index = 0
+            while not stop.is_set():
+                pattern = ['D M Y', 'M D Y'][index % 2]
+                locales.registry.register('x-thread', pattern)
+                LocalePattern.register('x-thread-pattern', pattern)
+                index += 1
+
+        def run():
+            try:
+                for _ in range(2000):
+                    self.assertEqual(
+                        convert('1.2.2008', '10:30', locale='de'),
+                        expected['D M Y']
+                    )
+                    self.assertEqual(
+                        convert_datetime('1.2.2008 10:30', locale='en'),
+                        expected['M D Y']
+                    )
+                    self.assertEqual(
+                        validate('29.2.2007', locale='de').code,
+                        errors.DAY_RANGE
+                    )
+                    for locale in ['x-thread', 'x-thread-pattern']:
+                        self.assertTrue(convert(
+                            '1.2.2008', '10:30', locale=locale
+                        ) in expected.values())
+            except Exception as e:
+                failures.append(e)
+
+        registrar = threading.Thread(target=register)
+        registrar.start()
+        threads = [threading.Thread(target=run) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stop.set()
+        registrar.join()
+        self.assertEqual(failures, [])
+
+    @unittest.skipIf(
+        benchmarks.gil_enabled() or os.cpu_count() < 4,
+        'scaling requires free-threaded Python and 4 cores'
+    )
+    def test_scaling(self):  # pragma: no cover
+        rates = dict(benchmarks.bench_threads(calls=20000, max_threads=4))
+        # no locks on the read path, throughput scales linearly
+        self.assertTrue(rates[4] > 0.7 * 4 * rates[1], rates)
+
+
+class TestSpeedups(unittest.TestCase):
+
+    @unittest.skipIf(converter.native is None, 'accelerator not built')
+    def test_equivalence(self):
+        native = converter.native
+        intelli = IntelliDateTime(clock=lambda: datetime(2008, 2, 1))
+        values = [
+            '', ' ', '3', '3.4', '3.4.8', '3.4.108', '3.4.2008', '2008-4-3',
+            '20080403', '03042008', '080403', '0804', '123', '123456789',
+            '\u3000 3.4.2008\xa0', '31.4.2008', '29.2.2007', '1.2.3.4',
+            '0.0.0', '1.1.99999999', '10:30', '1030', '25', '10h30m',
+        ]
+        for locale in ['iso', 'de', 'en']:
+            plan = intelli._plan(locale)
+            for date in values:
+                for time in [None, ''] + values:
+                    try:
+                        expected = intelli._convertParsed(
+                            date,
+                            time,
+                            None,
+                            plan
+                        )
+                    except DateTimeConversionError as e:
+                        with self.assertRaises(DateTimeConversionError) as c:
+                            native.convert(
+                                date,
+                                time,
+                                plan.params,
+                                intelli._now
+                            )
+                        self.assertEqual(str(c.exception), str(e))
+                        continue
+                    self.assertEqual(
+                        native.convert(date, time, plan.params, intelli._now),
+                        expected
+                    )
+                    self.assertEqual(
+                        native.parse(date, time, plan.params, intelli._now),
+                        list(expected.timetuple()[:5])
+                    )
+        # buffers and numbers with more than 16 digits are left to the pure
+        # Python implementation
+        plan = intelli._plan('iso')
+        for date in [b'2008-04-03', '1.2.12345678901234567', None]:
+            self.assertTrue(native.convert(
+                date,
+                None,
+                plan.params,
+                intelli._now
+            ) is NotImplemented)
+        self.assertRaises(
+            DateTimeConversionError,
+            intelli.convert, '1.2.12345678901234567', locale='de'
+        )
+        failures = list()
+        self.assertEqual(
+            intelli.convert_many(
+                ['3.4.2008', '31.4.2008', b'3.4.2008', '3', 12],
+                ['10:30', None, '10:30', '1', None],
+                locale='de',
+                onerror=lambda index, e: failures.append(index)
+            ),
+            [
+                datetime(2008, 4, 3, 10, 30),
+                None,
+                datetime(2008, 4, 3, 10, 30),
+                datetime(2008, 2, 3, 1),
+                None,
+            ]
+        )
+        self.assertEqual(failures, [1, 4])
+
+    def test_pure(self):
+        code = (
+            'from bda.intellidatetime import converter\n'
+            'from datetime import datetime\n'
+            'assert converter.native is None\n'
+            'plan = converter.ParsePlan([0, 1, 2], [], [0, 1])\n'
+            'assert plan.params is None\n'
+            'assert converter.convert("3.4.2008", locale="de") == '
+            'datetime(2008, 4, 3)\n'
+        )
+        env = dict(os.environ, BDA_INTELLIDATETIME_PURE='1')
+        subprocess.check_call([sys.executable, '-c', code], env=env)
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_corpus(self):
+        converter = IntelliDateTime()
+        for pattern, locale in [('Y M D', 'iso'), ('D M Y', 'de'),
+                                ('M D Y', 'en')]:
+            for shape in benchmarks.DATE_SHAPES:
+                dates = benchmarks.date_corpus(pattern, shape, size=20)
+                self.assertEqual(len(dates), 20)
+                # corpora are reproducible
+                self.assertEqual(
+                    dates,
+                    benchmarks.date_corpus(pattern, shape, size=20)
+                )
+                for date in dates:
+                    converter.convert(date, locale=locale)
+        for shape in benchmarks.TIME_SHAPES:
+            for time in benchmarks.time_corpus(shape, size=20):
+                converter.convert('1', time)
+
+    def test_suite(self):
+        names = [case.name for case in benchmarks.cases()]
+        self.assertTrue('_splitValue/noisy' in names)
+        self.assertTrue('convert/uk/packed6/hour/naive' in names)
+        results = benchmarks.run_suite(
+            ['_splitDate/*'],
+            min_time=0.001,
+            samples=10,
+            allocations=5
+        )
+        self.assertEqual(
+            sorted(results['results']),
+            ['_splitDate/DMY', '_splitDate/MDY', '_splitDate/YMD']
+        )
+        result = results['results']['_splitDate/DMY']
+        self.assertEqual(
+            sorted(result),
+            ['alloc', 'ops', 'p50', 'p90', 'p99']
+        )
+        self.assertTrue(result['ops'] > 0)
+        self.assertTrue(result['p50'] <= result['p99'])
+        baseline = {'results': {
+            '_splitDate/DMY': dict(result, ops=result['ops'] * 2),
+            '_splitDate/MDY': results['results']['_splitDate/MDY']
+        }}
+        comparison = benchmarks.compare(baseline, results, threshold=0.1)
+        self.assertEqual(
+            [(name, regressed) for name, _, _, _, regressed in comparison],
+            [('_splitDate/DMY', True), ('_splitDate/MDY', False)]
+        )
+
+    def test_import(self):
+        results = benchmarks.bench_import(repeat=1)
+        self.assertEqual(
+            [scenario for scenario, _, _ in results],
+            ['import', 'convert', 'interfaces']
+        )
+        modules = dict((scenario, n) for scenario, _, n in results)
+        self.assertTrue(modules['convert'] < modules['interfaces'])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,218 @@
+"""Localization of naive datetimes.
+
+Supports ``pytz`` timezones as well as tzinfo implementations following
+PEP 495 like ``zoneinfo.ZoneInfo``. UTC offset transitions are computed once
+per timezone and year and cached, thus localizing a naive datetime is a
+binary search over the transitions of its year.
+"""
+from bda.intellidatetime.errors import DateTimeConversionError
+from bisect import bisect_right
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from datetime import tzinfo as basetzinfo
+import threading
+
+
+# Policies for wall times falling into a DST gap or fold. ``EARLIER`` uses
+# the UTC offset in effect before the transition, ``LATER`` the one after
+# the transition and ``RAISE`` raises a ``DateTimeConversionError``.
+EARLIER = 'earlier'
+LATER = 'later'
+RAISE = 'raise'
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+# transitions are searched by sampling the UTC offset in this interval
+SAMPLE_INTERVAL = 6 * 3600
+
+MIN_DATETIME = datetime(1, 1, 2)
+MAX_DATETIME = datetime(9999, 12, 30)
+
+
+class UTC(basetzinfo):
+
+    def utcoffset(self, dt):
+        return timedelta(0)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def tzname(self, dt):
+        return 'UTC'
+
+
+utc = UTC()
+
+
+def _seconds(delta):
+    return delta.days * 86400 + delta.seconds
+
+
+def wall_seconds(dt):
+    """Return the wall clock seconds since the epoch of a datetime.
+    """
+    return (
+        (dt.toordinal() - EPOCH_ORDINAL) * 86400
+        + dt.hour * 3600
+        + dt.minute * 60
+        + dt.second
+    )
+
+
+class TransitionTable(object):
+    """UTC offset transitions of a timezone affecting the wall times of one
+    year.
+    """
+
+    def __init__(self, tzinfo, year):
+        self.tzinfo = tzinfo
+        start = max(
+            wall_seconds(datetime(year, 1, 1)) - 2 * 86400,
+            wall_seconds(MIN_DATETIME)
+        )
+        end = min(
+            wall_seconds(datetime(year, 12, 31)) + 3 * 86400,
+            wall_seconds(MAX_DATETIME)
+        )
+        self.initial = before = self._info(start)
+        # per transition ``(wall start, wall end, info before, info after)``
+        # where wall start to wall end is the gap or fold the transition
+        # causes
+        self.transitions = list()
+        sample = start
+        while sample < end:
+            following = min(sample + SAMPLE_INTERVAL, end)
+            after = self._info(following)
+            if after != before:
+                self._bisect(sample, following, before, after)
+            sample = following
+            before = after
+        self.starts = [transition[0] for transition in self.transitions]
+
+    def _info(self, seconds):
+        # ``(offset seconds, tzinfo to attach)`` in effect at given UTC time
+        dt = (EPOCH + timedelta(seconds=seconds)).replace(tzinfo=utc)
+        dt = dt.astimezone(self.tzinfo)
+        return (_seconds(dt.utcoffset()), dt.tzinfo)
+
+    def _bisect(self, low, high, before, after):
+        # find first second ``after`` is in effect
+        while high - low > 1:
+            middle = (low + high) // 2
+            info = self._info(middle)
+            if info == before:
+                low = middle
+            elif info == after:
+                high = middle
+            else:
+                # more than one transition between samples
+                self._bisect(low, middle, before, info)
+                before = info
+                low = middle
+        first, second = before[0], after[0]
+        self.transitions.append((
+            high + min(first, second),
+            high + max(first, second),
+            before,
+            after
+        ))
+
+    def lookup(self, wall, gap=LATER, fold=LATER):
+        """Return ``(offset seconds, tzinfo to attach, fold)`` for given wall
+        clock seconds since the epoch.
+        """
+        index = bisect_right(self.starts, wall) - 1
+        if index < 0:
+            return self.initial + (0,)
+        start, end, before, after = self.transitions[index]
+        if wall >= end:
+            return after + (0,)
+        if after[0] > before[0]:
+            policy = gap
+            message = u"Nonexistent time in timezone."
+        else:
+            policy = fold
+            message = u"Ambiguous time in timezone."
+        if policy == EARLIER:
+            return before + (0,)
+        if policy == LATER:
+            return after + (1,)
+        raise DateTimeConversionError(message)
+
+
+class Localizer(object):
+    """Attach timezones to naive datetimes keeping the wall time.
+
+    Transition tables are cached per timezone and year in a bounded LRU
+    cache, years come from the input.
+    """
+
+    def __init__(self, gap=LATER, fold=LATER, maxsize=1024):
+        """@param gap - policy for wall times skipped by a transition
+        @param fold - policy for wall times repeated by a transition
+        @param maxsize - maximum number of cached transition tables
+        """
+        self.gap = gap
+        self.fold = fold
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._tables = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._tables)
+
+    def table(self, tzinfo, year):
+        """Return the ``TransitionTable`` of given timezone and year.
+        """
+        key = (tzinfo, year)
+        tables = self._tables
+        with self._lock:
+            table = tables.get(key)
+            if table is not None:
+                tables.move_to_end(key)
+                return table
+        # computed without holding the lock, concurrent misses compute equal
+        # tables
+        table = TransitionTable(tzinfo, year)
+        with self._lock:
+            tables[key] = table
+            while len(tables) > self.maxsize:
+                tables.popitem(last=False)
+                self.evictions += 1
+        return table
+
+    def offset(self, dt, tzinfo):
+        """Return the UTC offset in seconds of a naive datetime taken as wall
+        time in given timezone.
+        """
+        return self.wall_offset(dt.year, wall_seconds(dt), tzinfo)
+
+    def wall_offset(self, year, wall, tzinfo):
+        """Return the UTC offset in seconds of wall clock seconds since the
+        epoch in given timezone.
+
+        @param year - the year of the wall time
+        @param wall - wall clock seconds since the epoch
+        @param tzinfo - the timezone
+        """
+        return self.table(tzinfo, year).lookup(wall, self.gap, self.fold)[0]
+
+    def localize(self, dt, tzinfo):
+        """Return the naive datetime as wall time in given timezone.
+
+        @raise DateTimeConversionError - if the wall time falls into a gap or
+                                         fold and the policy is ``RAISE``
+        """
+        offset, attach, fold = self.table(tzinfo, dt.year).lookup(
+            wall_seconds(dt),
+            self.gap,
+            self.fold
+        )
+        dt = dt.replace(tzinfo=attach)
+        if fold and attach is tzinfo:
+            # PEP 495 timezone
+            dt = dt.replace(fold=1)
+        return dt